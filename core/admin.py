@@ -1,7 +1,28 @@
+import csv
+import json
+import os
+from itertools import chain
+
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from unfold.admin import ModelAdmin, TabularInline, StackedInline
-from .models import ServiceCategory, ProductExample, CustomerInquiry, QuoteRequest, PricingTier, SiteConfiguration, SocialMediaLink, CarouselImage
+from .models import ServiceCategory, ProductExample, CustomerInquiry, QuoteRequest, QuoteLineItem, PricingTier, SiteConfiguration, SocialMediaLink, CarouselImage, OutboundEmail, InquiryRollup, AdminJob
+from . import bulk
+from .icons import render_icon
+from .quotes import recompute_quotes, reprice
+from .rollups import dashboard
+from .search import IndexedSearchMixin
 
 
 class ProductExampleInline(TabularInline):
@@ -18,39 +39,135 @@ class ServiceCategoryAdmin(ModelAdmin):
     search_fields = ['name', 'description']
     inlines = [ProductExampleInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(product_count=Count('products'))
+
     def icon_preview(self, obj):
-        return format_html('<i data-feather="{}"></i> {}', obj.icon_class, obj.icon_class)
+        return format_html('{} {}', render_icon(obj.icon_class, width='18', height='18'), obj.icon_class)
     icon_preview.short_description = 'Icon'
 
     def product_count(self, obj):
-        return obj.products.count()
+        return obj.product_count
     product_count.short_description = 'Products'
+    product_count.admin_order_field = 'product_count'
 
 
 @admin.register(ProductExample)
-class ProductExampleAdmin(ModelAdmin):
+class ProductExampleAdmin(IndexedSearchMixin, ModelAdmin):
     list_display = ['title', 'category', 'starting_price', 'is_featured', 'is_active']
     list_filter = ['category', 'is_featured', 'is_active']
     list_editable = ['is_featured', 'is_active']
+    list_select_related = ['category']
     search_fields = ['title', 'description']
 
 
+class QuoteRequestForm(forms.ModelForm):
+    """A price set by hand takes the quote off automatic pricing."""
+
+    class Meta:
+        model = QuoteRequest
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if 'estimated_price' in self.changed_data and 'auto_priced' not in self.changed_data:
+            cleaned_data['auto_priced'] = False
+        return cleaned_data
+
+
 class QuoteRequestInline(StackedInline):
     model = QuoteRequest
+    form = QuoteRequestForm
     extra = 0
     readonly_fields = ['created_at', 'updated_at']
 
 
+class QuoteLineItemInline(TabularInline):
+    model = QuoteLineItem
+    extra = 0
+    fields = ['product', 'quantity', 'unit_price', 'total']
+    readonly_fields = ['unit_price', 'total']
+    raw_id_fields = ['product']
+
+
+class _Echo:
+    """File-like object for csv.writer that hands back each line, for streaming."""
+
+    def write(self, value):
+        return value
+
+
+class InquiryBulkActionsMixin:
+    """
+    Set-based status changes and CSV export of the selected inquiries (see
+    core.bulk), run in the request or, for large selections, queued as an
+    admin job. inquiries() maps a selection of the admin's model to inquiries.
+    """
+
+    def inquiries(self, queryset):
+        return queryset
+
+    def has_inquiry_change_permission(self, request):
+        return request.user.has_perm('core.change_customerinquiry')
+
+    def has_inquiry_view_permission(self, request):
+        return request.user.has_perm('core.view_customerinquiry') or self.has_inquiry_change_permission(request)
+
+    def run_in_background(self, request):
+        return (
+            request.POST.get('select_across') == '1'
+            or len(request.POST.getlist(ACTION_CHECKBOX_NAME)) > settings.ADMIN_BULK_SYNC_LIMIT
+        )
+
+    def queue_job(self, request, action, queryset, **params):
+        job = bulk.queue(action, self.inquiries(queryset), request.user, **params)
+        self.message_user(request, format_html(
+            '{} inquiries queued as <a href="{}" class="underline">admin job #{}</a>; its progress is shown there.',
+            job.total, reverse('admin:core_adminjob_changelist'), job.pk,
+        ))
+
+    def set_status(self, request, queryset, status):
+        if self.run_in_background(request):
+            return self.queue_job(request, 'set_status', queryset, status=status)
+        updated = bulk.set_status(self.inquiries(queryset), status, request.user)
+        label = dict(CustomerInquiry.STATUS_CHOICES)[status]
+        self.message_user(request, f'{updated} inquiry(ies) marked "{label}".')
+
+    @admin.action(description='Mark inquiries as contacted', permissions=['inquiry_change'])
+    def mark_contacted(self, request, queryset):
+        self.set_status(request, queryset, 'contacted')
+
+    @admin.action(description='Mark inquiries as quote sent', permissions=['inquiry_change'])
+    def mark_quoted(self, request, queryset):
+        self.set_status(request, queryset, 'quoted')
+
+    @admin.action(description='Mark inquiries as closed', permissions=['inquiry_change'])
+    def mark_closed(self, request, queryset):
+        self.set_status(request, queryset, 'closed')
+
+    @admin.action(description='Export inquiries to CSV', permissions=['inquiry_view'])
+    def export_csv(self, request, queryset):
+        if self.run_in_background(request):
+            return self.queue_job(request, 'export', queryset)
+        writer = csv.writer(_Echo())
+        rows = (writer.writerow(row) for row in chain([bulk.EXPORT_HEADER], bulk.export_rows(self.inquiries(queryset))))
+        response = StreamingHttpResponse(rows, content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="inquiries-{timezone.now():%Y%m%d-%H%M}.csv"'
+        return response
+
+
 @admin.register(CustomerInquiry)
-class CustomerInquiryAdmin(ModelAdmin):
+class CustomerInquiryAdmin(InquiryBulkActionsMixin, IndexedSearchMixin, ModelAdmin):
     list_display = ['name', 'phone', 'email', 'service_needed', 'status', 'submitted_on', 'whatsapp_action']
     list_display_links = ['name', 'phone', 'email', 'service_needed', 'submitted_on']
     list_filter = ['status', 'service_needed', 'submitted_on']
     search_fields = ['name', 'email', 'phone', 'company', 'message']
     readonly_fields = ['submitted_on', 'whatsapp_link_display']
     list_editable = ['status']
+    list_select_related = ['service_needed']
     date_hierarchy = 'submitted_on'
     inlines = [QuoteRequestInline]
+    actions = ['mark_contacted', 'mark_quoted', 'mark_closed', 'export_csv']
 
     fieldsets = (
         ('Customer Info', {
@@ -89,12 +206,31 @@ class CustomerInquiryAdmin(ModelAdmin):
 
 
 @admin.register(QuoteRequest)
-class QuoteRequestAdmin(ModelAdmin):
-    list_display = ['inquiry', 'estimated_price', 'follow_up_date', 'created_at']
+class QuoteRequestAdmin(InquiryBulkActionsMixin, ModelAdmin):
+    form = QuoteRequestForm
+    list_display = ['inquiry', 'estimated_price', 'auto_priced', 'follow_up_date', 'created_at']
     list_display_links = ['inquiry', 'estimated_price', 'follow_up_date', 'created_at']
-    list_filter = ['follow_up_date', 'created_at']
+    list_filter = ['auto_priced', 'follow_up_date', 'created_at']
+    list_select_related = ['inquiry']
     search_fields = ['inquiry__name', 'inquiry__email', 'notes']
     readonly_fields = ['created_at', 'updated_at']
+    inlines = [QuoteLineItemInline]
+    actions = ['recompute_estimates', 'mark_quoted', 'mark_closed', 'export_csv']
+
+    def inquiries(self, queryset):
+        return CustomerInquiry.objects.filter(quote__in=queryset.values('pk'))
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        quote = form.instance
+        # Price edited lines, unless the quote's price was set by hand.
+        if any(formset.has_changed() for formset in formsets) and (quote.auto_priced or quote.estimated_price is None):
+            reprice(quote)
+
+    @admin.action(description='Recompute estimates of selected open quotes', permissions=['change'])
+    def recompute_estimates(self, request, queryset):
+        updated = recompute_quotes(queryset)
+        self.message_user(request, f'{updated} open quote(s) re-priced from current prices and tiers.')
 
 
 @admin.register(PricingTier)
@@ -139,6 +275,136 @@ class CarouselImageAdmin(ModelAdmin):
     title_preview.short_description = "Slide"
 
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(ModelAdmin):
+    list_display = ['subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['subject', 'recipients']
+    readonly_fields = ['subject', 'body', 'from_email', 'recipients', 'attempts', 'last_error', 'created_at', 'sent_at']
+    fields = ['subject', 'recipients', 'from_email', 'body', 'status', 'attempts', 'next_attempt_at', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected emails now')
+    def retry_now(self, request, queryset):
+        updated = queryset.filter(status__in=['pending', 'failed']).update(status='pending', next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} email(s) queued for retry.')
+
+
+@admin.register(AdminJob)
+class AdminJobAdmin(ModelAdmin):
+    """Queued bulk actions and their progress; the changelist refreshes itself while any is unfinished."""
+    list_display = ['__str__', 'status', 'progress', 'user', 'created_at', 'finished_at', 'download']
+    list_filter = ['status', 'action', 'created_at']
+    list_select_related = ['user']
+    readonly_fields = ['action', 'params', 'user', 'status', 'progress', 'error', 'created_at', 'started_at', 'finished_at', 'download']
+    fields = readonly_fields
+    actions = ['run_again']
+    list_before_template = 'admin/core/adminjob_refresh.html'
+
+    def get_queryset(self, request):
+        # The id lists are only read by process_admin_jobs.
+        return super().get_queryset(request).defer('object_ids')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            'jobs_unfinished': AdminJob.objects.filter(status__in=['pending', 'running']).exists(),
+            **(extra_context or {}),
+        }
+        return super().changelist_view(request, extra_context)
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view), name='core_adminjob_download'),
+            *super().get_urls(),
+        ]
+
+    def download_view(self, request, pk):
+        job = get_object_or_404(AdminJob, pk=pk)
+        if not (self.has_view_permission(request, job) and request.user.has_perm('core.view_customerinquiry')):
+            raise PermissionDenied
+        if not job.result:
+            raise Http404('This job has no export.')
+        return FileResponse(job.result.open('rb'), as_attachment=True, filename=os.path.basename(job.result.name))
+
+    @admin.display(description='Progress')
+    def progress(self, obj):
+        return render_to_string('unfold/components/progress.html', {
+            'value': obj.percent, 'description': f'{obj.processed:,} / {obj.total:,}',
+        })
+
+    @admin.display(description='Export')
+    def download(self, obj):
+        if not obj.result:
+            return '-'
+        return format_html('<a href="{}" class="underline">Download CSV</a>', reverse('admin:core_adminjob_download', args=[obj.pk]))
+
+    def has_inquiry_change_permission(self, request):
+        # Jobs change inquiries under the identity of the user who queued them.
+        return request.user.has_perm('core.change_customerinquiry')
+
+    @admin.action(description='Run selected jobs again', permissions=['inquiry_change'])
+    def run_again(self, request, queryset):
+        updated = queryset.exclude(status='running').update(status='pending', processed=0, error='', finished_at=None)
+        self.message_user(request, f'{updated} job(s) queued again.')
+
+
+@admin.register(InquiryRollup)
+class InquiryRollupAdmin(ModelAdmin):
+    """Inquiry analytics dashboard in place of a changelist; reads rollups only."""
+    PERIODS = [7, 30, 90, 365]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        try:
+            days = int(request.GET.get('days', 30))
+        except ValueError:
+            days = 30
+        if days not in self.PERIODS:
+            days = 30
+        stats = dashboard(days)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Inquiry Analytics',
+            'opts': self.model._meta,
+            'days': days,
+            'period_options': self.PERIODS,
+            'stats': stats,
+            'conversion': round(100 * stats['closed'] / stats['total']) if stats['total'] else 0,
+            'chart': json.dumps({
+                'labels': [day.strftime('%d %b') for day, _ in stats['per_day']],
+                'datasets': [{'label': 'Inquiries', 'data': [count for _, count in stats['per_day']]}],
+            }),
+            'services_table': {
+                'headers': ['Service', 'Inquiries', 'Closed', 'Priced quotes', 'Quote value (KSh)'],
+                'rows': [
+                    [name, row['inquiries'], row['closed'], row['quotes'], f"{row['quote_value']:,.0f}"]
+                    for name, row in stats['services']
+                ],
+            },
+            **(extra_context or {}),
+        }
+        request.current_app = self.admin_site.name
+        return TemplateResponse(request, 'admin/core/inquiry_analytics.html', context)
+
 
 # Re-register User and Group to use Unfold
 from django.contrib.auth.models import User, Group
@@ -0,0 +1,121 @@
+"""
+Front-end asset build.
+
+build_assets (run before collectstatic, wherever Node is available) writes
+three files, which are committed like the rest of the static files:
+
+* core/static/core/css/site.css: Tailwind compiled ahead of time with the
+  project config (tailwind.config.js), holding only the classes the
+  templates and scripts use, minified. It replaces the Play CDN, which
+  compiled CSS in the visitor's browser and held up first paint.
+* core/static_src/critical.css: the same, for only the classes of the page
+  header and the home page hero (CRITICAL_CONTENT). In DEFERRED_LOADING
+  mode the home page inlines it, with styles.css, and loads site.css
+  without blocking rendering.
+* core/static_src/feather-icons.json: the Feather icon registry (see
+  core.icons), copied from the installed feather-icons package.
+
+collectstatic then content-hashes the stylesheet through
+CompressedManifestStorage (core.storage). Until the first build,
+{% stylesheets %} falls back to the CDN.
+"""
+import json
+import shlex
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from .icons import REGISTRY_FILE, clear_icon_cache
+
+
+TAILWIND_CSS = 'core/css/site.css'
+STYLES_CSS = 'core/css/styles.css'
+
+CORE_DIR = Path(__file__).resolve().parent
+STATIC_DIR = CORE_DIR / 'static'
+TAILWIND_CONFIG = settings.BASE_DIR / 'tailwind.config.js'
+TAILWIND_INPUT = CORE_DIR / 'static_src' / 'tailwind.css'
+CRITICAL_CSS = CORE_DIR / 'static_src' / 'critical.css'
+# Templates of what is above the fold on a first visit to the home page.
+CRITICAL_CONTENT = ('templates/base.html', 'templates/core/partials/hero.html')
+FEATHER_ICONS_JSON = settings.BASE_DIR / 'node_modules' / 'feather-icons' / 'dist' / 'icons.json'
+
+
+class AssetError(Exception):
+    pass
+
+
+def _tailwind(command, output, *arguments):
+    command = shlex.split(command or settings.TAILWIND_COMMAND)
+    try:
+        subprocess.run(
+            [*command, '--config', str(TAILWIND_CONFIG), '--input', str(TAILWIND_INPUT),
+             '--output', str(output), '--minify', *arguments],
+            check=True, capture_output=True, text=True,
+        )
+    except FileNotFoundError:
+        raise AssetError(f'Tailwind CLI not found: {command[0]} (run npm install, or set TAILWIND_COMMAND)') from None
+    except subprocess.CalledProcessError as exc:
+        raise AssetError(f'Tailwind CLI failed: {exc.stderr.strip()}') from None
+    return output
+
+
+def build_css(command=None):
+    """Run the Tailwind CLI (TAILWIND_COMMAND) to write the purged, minified stylesheet."""
+    return _tailwind(command, STATIC_DIR / TAILWIND_CSS)
+
+
+def build_critical_css(command=None):
+    """Write the stylesheet for CRITICAL_CONTENT only, for inlining."""
+    content = ','.join(str(CORE_DIR / path) for path in CRITICAL_CONTENT)
+    return _tailwind(command, CRITICAL_CSS, '--content', content)
+
+
+def update_icon_registry(source=FEATHER_ICONS_JSON):
+    """Replace the icon registry with feather-icons' icons.json. Returns (path, number of icons)."""
+    try:
+        icons = json.loads(Path(source).read_text())
+    except FileNotFoundError:
+        raise AssetError(f'{source} not found (run npm install)') from None
+    except ValueError as exc:
+        raise AssetError(f'{source} is not valid JSON: {exc}') from None
+    if not isinstance(icons, dict) or not all(isinstance(body, str) for body in icons.values()):
+        raise AssetError(f'{source} is not a Feather icons.json ({{name: SVG contents}})')
+    REGISTRY_FILE.write_text(json.dumps(icons, indent=2, sort_keys=True) + '\n')
+    clear_icon_cache()
+    return REGISTRY_FILE, len(icons)
+
+
+_built = {}
+
+
+def built_asset_url(path):
+    """
+    URL of a build_assets output, or None if it has not been built. Found
+    in STATIC_ROOT after collectstatic, otherwise in the app's static dir.
+    The answer is remembered unless DEBUG is on.
+    """
+    if settings.DEBUG or path not in _built:
+        _built[path] = staticfiles_storage.exists(path) or bool(finders.find(path))
+    return staticfiles_storage.url(path) if _built[path] else None
+
+
+_critical = {}
+
+
+def critical_css():
+    """
+    The CSS to inline for above-the-fold content: the critical Tailwind
+    build followed by styles.css, or '' if it has not been built. Read once
+    unless DEBUG is on.
+    """
+    if settings.DEBUG or 'css' not in _critical:
+        styles = finders.find(STYLES_CSS)
+        try:
+            _critical['css'] = CRITICAL_CSS.read_text() + '\n' + Path(styles).read_text()
+        except (FileNotFoundError, TypeError):
+            _critical['css'] = ''
+    return _critical['css']
@@ -0,0 +1,174 @@
+"""
+Async versions of the read-only catalog views, for ASGI deployments.
+
+With ASYNC_VIEWS on, core/urls.py routes index, products, service_detail and
+calculate_price here instead of core.views. The pages are the same templates
+with the same {% cache %} fragments and conditional GETs; what changes is
+how their data is loaded. The sync views hand the template lazy querysets,
+which run one after another as the template reaches fragments that have to
+be re-rendered. These views look the fragments up first and load the data
+of the missing ones through the async ORM together, with asyncio.gather,
+before rendering.
+
+Django 4.2's async ORM still runs each query in the request's worker thread,
+so gathered queries go to the database back to back rather than in
+parallel; the gain is that the event loop is free to serve other requests
+while they run. Cache lookups and template rendering are sync code and run
+in that thread too (sync_to_async).
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import SITE, SERVICES, PRODUCTS, PRICING, CAROUSEL, get_generations
+from .forms import CustomerInquiryForm
+from .models import PricingTier, ServiceCategory
+from .pricing import aget_pricing_table
+from .ratelimit import rate_limit
+from .views import (
+    _active_service, _index_context, _index_has_form, _price_params, _price_response, _product_page,
+    catalog_validators,
+)
+
+
+def async_catalog_condition(*namespaces, vary_on_csrf=False):
+    """catalog_condition() for async views: the validators are computed in a thread."""
+    etag_func, modified_func = catalog_validators(namespaces, vary_on_csrf)
+
+    def validators(request, *args, **kwargs):
+        return (
+            quote_etag(etag_func(request, *args, **kwargs)),
+            int(modified_func(request, *args, **kwargs).timestamp()),
+        )
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            etag, modified = await sync_to_async(validators)(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(modified)
+                response.headers.setdefault('ETag', etag)
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapped
+    return decorator
+
+
+def _fragment_cache():
+    # The {% cache %} tag's own choice of backend.
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def _missing_fragments(fragments, *vary_on):
+    """
+    Names of the {% cache %} fragments ({name: namespaces}) that are not
+    cached, keyed as the templates key them: vary_on, then the namespaces'
+    generations.
+    """
+    generations = get_generations(*{namespace for namespaces in fragments.values() for namespace in namespaces})
+    keys = {
+        name: make_template_fragment_key(name, [*vary_on, *(generations[namespace] for namespace in namespaces)])
+        for name, namespaces in fragments.items()
+    }
+    found = _fragment_cache().get_many(keys.values())
+    return {name for name, key in keys.items() if key not in found}
+
+
+async def _fetch(queryset):
+    return [row async for row in queryset]
+
+
+async def _load(context, names):
+    """Replace the querysets context[name] for names with their rows, all queries in flight together."""
+    names = list(names)
+    for name, rows in zip(names, await asyncio.gather(*(_fetch(context[name]) for name in names))):
+        context[name] = rows
+
+
+_render = sync_to_async(render)
+
+# The fragments of each page, {name: namespaces the key varies on}, and the
+# context entries each one uses. Both must match the templates; an entry
+# whose fragment is wrongly taken as cached is still loaded, lazily, by the
+# template.
+INDEX_FRAGMENTS = {
+    'hero': (CAROUSEL,),
+    'services': (SERVICES,),
+    'featured_products': (PRODUCTS,),
+    'index_estimate_modal': (SERVICES, PRODUCTS, PRICING),
+}
+INDEX_FRAGMENT_CONTEXT = {
+    'hero': ('carousel_slides',),
+    'services': ('services',),
+    'featured_products': ('products',),
+    'index_estimate_modal': ('products', 'pricing_tiers'),
+}
+SERVICE_FRAGMENTS = {'service_detail': (SERVICES, PRODUCTS, PRICING)}
+PRODUCTS_FRAGMENTS = {'products_page': (SERVICES, PRODUCTS)}
+
+
+@async_catalog_condition(SITE, SERVICES, PRODUCTS, PRICING, CAROUSEL, vary_on_csrf=_index_has_form)
+async def index(request):
+    """Home page with services and featured products."""
+    context = _index_context(CustomerInquiryForm())
+    fragments = INDEX_FRAGMENTS
+    if context['defer_fragments']:
+        # The estimate modal is fetched from estimate_modal_fragment instead.
+        fragments = {name: namespaces for name, namespaces in fragments.items() if name != 'index_estimate_modal'}
+    missing = await sync_to_async(_missing_fragments)(fragments)
+    await _load(context, {name for fragment in missing for name in INDEX_FRAGMENT_CONTEXT[fragment]})
+    return await _render(request, 'core/index.html', context)
+
+
+@async_catalog_condition(SITE, SERVICES, PRODUCTS, PRICING)
+async def service_detail(request, slug):
+    """Detail page for a service category."""
+    service = await sync_to_async(_active_service)(slug)
+    if service is None:
+        raise Http404('No ServiceCategory matches the given query.')
+    context = {
+        'service': service,
+        'products': service.products.filter(is_active=True),
+        'pricing_tiers': PricingTier.objects.filter(is_active=True),
+    }
+    if await sync_to_async(_missing_fragments)(SERVICE_FRAGMENTS, slug):
+        await _load(context, ['products', 'pricing_tiers'])
+    return await _render(request, 'core/service_detail.html', context)
+
+
+@async_catalog_condition(SITE, SERVICES, PRODUCTS)
+async def products(request):
+    """Product listing; the first page is rendered here, the rest comes from list_products."""
+    context = {
+        'categories': ServiceCategory.objects.filter(is_active=True),
+        'products': _product_page(),
+    }
+    if await sync_to_async(_missing_fragments)(PRODUCTS_FRAGMENTS):
+        categories, _ = await asyncio.gather(_fetch(context['categories']), context['products'].afetch())
+        context['categories'] = categories
+    return await _render(request, 'core/products.html', context)
+
+
+@rate_limit('calculate_price')
+@async_catalog_condition(SERVICES, PRODUCTS, PRICING)
+async def calculate_price(request):
+    """API endpoint to calculate price based on quantity and product."""
+    try:
+        product_id, qty = _price_params(request)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return _price_response(await aget_pricing_table(), product_id, qty)
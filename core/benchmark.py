@@ -0,0 +1,399 @@
+"""
+Latency and load benchmarks for the public endpoints.
+
+run_benchmarks() measures each endpoint in two passes against whatever data
+is in the database (the benchmark command seeds a throwaway test database
+with core.testing.seed_catalog):
+
+* a single-threaded profiling pass recording queries and memory allocated
+  per request, with tracemalloc running;
+* a timed pass firing requests from concurrent test clients, reporting
+  p50/p95/p99 latency and throughput, with tracemalloc off. Clients are
+  WSGI threads, or with asgi=True tasks on an event loop going through the
+  ASGI handler, which is how ASYNC_VIEWS deployments are compared with
+  WSGI ones.
+
+Results are plain dicts so the command can write them to a JSON baseline and
+compare() can diff two runs.
+
+benchmark_indexes() times the hot querysets behind those pages and the admin
+with the catalog indexes in place and again with them dropped, alongside
+each query plan. Run it against MySQL for production plans: Django filters
+boolean columns on SQLite as a bare column rather than "= 1", so SQLite
+cannot use the indexes that start with is_active.
+"""
+import asyncio
+import math
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    CarouselImage, CustomerInquiry, PricingTier, ProductExample, ServiceCategory, SocialMediaLink,
+)
+from .pagination import encode_cursor
+from .testing import reset_caches
+from .views import PRODUCT_ORDERING, PRODUCT_PAGE_SIZE
+
+
+Endpoint = namedtuple('Endpoint', 'name method path data')
+
+INQUIRY_DATA = {
+    'name': 'Benchmark Customer', 'phone': '0712345678', 'email': 'benchmark@example.com',
+    'message': 'Synthetic inquiry submitted by the benchmark suite.',
+}
+
+# Metrics where a higher value in the current run is a regression.
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'allocated_kb')
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """
+    Run the block against an empty test database (created like the test
+    runner does, so the real database is never touched), with DEBUG off.
+    """
+    if connection.vendor == 'sqlite':
+        # SQLite's default in-memory test database cannot take writes
+        # from concurrent connections; a file database waits on its lock.
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.gettempdir(), 'printhive_benchmark.sqlite3')
+
+    setup_test_environment(debug=False)
+    old_config = setup_databases(verbosity=0, interactive=False, keepdb=keepdb)
+    try:
+        if keepdb:
+            call_command('flush', interactive=False, verbosity=0)
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def default_endpoints():
+    """One Endpoint per URL in core/urls.py, using the first active category's data."""
+    category = ServiceCategory.objects.filter(is_active=True).order_by('order', 'name').first()
+    product_ids = list(
+        ProductExample.objects.filter(category=category, is_active=True).values_list('id', flat=True)[:50]
+    )
+    return [
+        Endpoint('index', 'get', reverse('core:index'), None),
+        Endpoint('products', 'get', reverse('core:products'), None),
+        Endpoint('list_products', 'get', reverse('core:list_products'), {'category': category.slug}),
+        # A page deep into the whole listing: keyset pages should cost the same as the first.
+        Endpoint('list_products_deep', 'get', reverse('core:list_products'), {'cursor': _deep_cursor()}),
+        Endpoint('service_detail', 'get', reverse('core:service_detail', args=[category.slug]), None),
+        Endpoint('calculate_price', 'get', reverse('core:calculate_price'), {'product_id': product_ids[0], 'qty': 250}),
+        Endpoint('calculate_prices', 'get', reverse('core:calculate_prices'), {
+            'product_ids': ','.join(map(str, product_ids)),
+        }),
+        Endpoint('submit_inquiry', 'post', reverse('core:submit_inquiry'), dict(INQUIRY_DATA, service_needed=category.pk)),
+        Endpoint('inquiry_success', 'get', reverse('core:inquiry_success'), None),
+    ]
+
+
+def _deep_cursor():
+    listing = ProductExample.objects.filter(is_active=True, is_featured=True).order_by(*PRODUCT_ORDERING)
+    row = listing[max(0, listing.count() - PRODUCT_PAGE_SIZE - 1)]
+    return encode_cursor(row, PRODUCT_ORDERING)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _send(client, endpoint):
+    return getattr(client, endpoint.method)(endpoint.path, endpoint.data)
+
+
+def _is_error(response):
+    return response.status_code >= 400
+
+
+def profile_endpoint(endpoint, iterations=5):
+    """Median queries and KB allocated per request, measured one request at a time."""
+    client = Client(raise_request_exception=False)
+    queries, allocated, errors = [], [], 0
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            with CaptureQueriesContext(connection) as captured:
+                response = _send(client, endpoint)
+            allocated.append(tracemalloc.get_traced_memory()[1] - before)
+            queries.append(len(captured))
+            errors += _is_error(response)
+    finally:
+        tracemalloc.stop()
+    return {
+        'queries': statistics.median(queries),
+        'allocated_kb': round(statistics.median(allocated) / 1024, 1),
+        'profile_errors': errors,
+    }
+
+
+def _shares(requests, concurrency):
+    shares = [requests // concurrency + (index < requests % concurrency) for index in range(concurrency)]
+    return [share for share in shares if share]
+
+
+def _timing_results(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+def time_endpoint(endpoint, requests=200, concurrency=8):
+    """Latency percentiles (ms) and throughput with concurrency clients sharing requests."""
+    def worker(count):
+        client = Client(raise_request_exception=False)
+        latencies, errors = [], 0
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                response = _send(client, endpoint)
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += _is_error(response)
+        finally:
+            connections.close_all()
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(worker, _shares(requests, concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for outcome in outcomes for latency in outcome[0]]
+    return _timing_results(latencies, sum(outcome[1] for outcome in outcomes), elapsed)
+
+
+def time_endpoint_asgi(endpoint, requests=200, concurrency=8):
+    """
+    time_endpoint() through Django's ASGI request handler: concurrency
+    client tasks on one event loop, each request in its own thread-sensitive
+    context (so its sync code and queries get a worker thread of their own)
+    as under an ASGI server.
+    """
+    async def send(client):
+        async with ThreadSensitiveContext():
+            start = time.perf_counter()
+            response = await getattr(client, endpoint.method)(endpoint.path, endpoint.data)
+            latency = (time.perf_counter() - start) * 1000
+            # What the server's request_finished handling does, untimed.
+            await sync_to_async(connections.close_all)()
+        return latency, _is_error(response)
+
+    async def worker(count):
+        client = AsyncClient(raise_request_exception=False)
+        return [await send(client) for _ in range(count)]
+
+    async def run():
+        return await asyncio.gather(*(worker(share) for share in _shares(requests, concurrency)))
+
+    start = time.perf_counter()
+    outcomes = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    samples = [sample for outcome in outcomes for sample in outcome]
+    return _timing_results([latency for latency, _ in samples], sum(error for _, error in samples), elapsed)
+
+
+# Every benchmark request comes from one address; rate limiting would turn
+# most of them into 429s.
+@override_settings(RATE_LIMIT_ENABLED=False)
+def run_benchmarks(endpoints, requests=200, concurrency=8, warmup=5, profile_iterations=5, stdout=None, asgi=False):
+    """
+    Benchmark each endpoint from cold caches: warmup requests first, then
+    the profiling and timed passes. asgi times requests through the ASGI
+    handler instead of WSGI threads; queries and allocations are profiled
+    through the test client either way. Returns {endpoint name: metrics}.
+    """
+    results = {}
+    for endpoint in endpoints:
+        if stdout:
+            stdout.write(f'Benchmarking {endpoint.name} ...')
+        reset_caches()
+        client = Client(raise_request_exception=False)
+        for _ in range(warmup):
+            _send(client, endpoint)
+        results[endpoint.name] = {
+            **profile_endpoint(endpoint, profile_iterations),
+            **(time_endpoint_asgi if asgi else time_endpoint)(endpoint, requests, concurrency),
+        }
+    return results
+
+
+def compare(baseline, current, threshold=10.0, metrics=COMPARED_METRICS):
+    """
+    Diff two result dicts on metrics. Returns (endpoint, metric, old, new,
+    change %, regressed) rows; a metric regresses when it grows by more
+    than threshold percent, or at all for query counts.
+    """
+    rows = []
+    for name, values in current.items():
+        old_values = baseline.get(name)
+        if old_values is None:
+            continue
+        for metric in metrics:
+            old, new = old_values.get(metric), values.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else (0.0 if new == old else math.inf)
+            limit = 0 if metric == 'queries' else threshold
+            rows.append((name, metric, old, new, round(change, 1), change > limit))
+    return rows
+
+
+# Models whose Meta.indexes serve the catalog and admin querysets below.
+INDEXED_MODELS = (ServiceCategory, ProductExample, CustomerInquiry, PricingTier, CarouselImage, SocialMediaLink)
+
+
+def index_querysets():
+    """(name, queryset) pairs mirroring the hot queries in views.py and admin.py."""
+    category = ServiceCategory.objects.order_by('order', 'name').first()
+    month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    changelist = CustomerInquiry.objects.select_related('service_needed').order_by('-submitted_on', '-pk')
+    return [
+        ('index featured products', ProductExample.objects.filter(is_active=True, is_featured=True)[:6]),
+        ('products page', ProductExample.objects.filter(is_active=True, is_featured=True).select_related('category')
+            .order_by(*PRODUCT_ORDERING)[:PRODUCT_PAGE_SIZE + 1]),
+        ('service products', category.products.filter(is_active=True)),
+        ('active services', ServiceCategory.objects.filter(is_active=True)),
+        ('active pricing tiers', PricingTier.objects.filter(is_active=True)),
+        ('inquiry changelist', changelist[:100]),
+        ('inquiry changelist status=new', changelist.filter(status='new')[:100]),
+        ('inquiry changelist this month', changelist.filter(submitted_on__gte=month_start)[:100]),
+    ]
+
+
+def analyze_tables():
+    """Refresh planner statistics after bulk loading."""
+    tables = [model._meta.db_table for model in INDEXED_MODELS]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
+        elif connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE ' + ', '.join(connection.ops.quote_name(table) for table in tables))
+        elif connection.vendor == 'postgresql':
+            cursor.execute('ANALYZE')
+
+
+def time_queryset(queryset, runs=20):
+    """Median wall time (ms) of evaluating a fresh clone of queryset."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def _measure(querysets, runs):
+    return {name: {'ms': time_queryset(queryset, runs), 'plan': queryset.explain()} for name, queryset in querysets}
+
+
+def benchmark_indexes(runs=20):
+    """
+    Time and explain index_querysets() with the catalog indexes, then with
+    them dropped. The indexes are restored afterwards. Returns
+    {query name: {'with': {ms, plan}, 'without': {ms, plan}}}.
+    """
+    analyze_tables()
+    querysets = index_querysets()
+    with_indexes = _measure(querysets, runs)
+
+    indexes = [(model, index) for model in INDEXED_MODELS for index in model._meta.indexes]
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    try:
+        analyze_tables()
+        without_indexes = _measure(querysets, runs)
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+    return {name: {'with': with_indexes[name], 'without': without_indexes[name]} for name, _ in querysets}
+
+
+def _time_calls(function, iterations):
+    """(p50, p99) microseconds per call of function()."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return round(percentile(timings, 50), 1), round(percentile(timings, 99), 1)
+
+
+def benchmark_rate_limiter(iterations=5000):
+    """
+    Per-request cost of core.ratelimit: a bucket hit on each cache backend
+    it can use (allowed and refused), the process-local fallback, and the
+    rate_limit decorator around a trivial view against the undecorated
+    view. Returns {name: {'p50_us', 'p99_us'}}.
+    """
+    from django.core.cache.backends.filebased import FileBasedCache
+    from django.core.cache.backends.locmem import LocMemCache
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from .ratelimit import TokenBucket, rate_limit
+
+    cache_dir = tempfile.mkdtemp(prefix='printhive-ratelimit-')
+    backends = {
+        'default cache': TokenBucket(),
+        'locmem cache': TokenBucket(LocMemCache('benchmark-ratelimit', {})),
+        'file cache': TokenBucket(FileBasedCache(cache_dir, {})),
+    }
+    results = {}
+    try:
+        for name, bucket in backends.items():
+            allowed = _time_calls(lambda: bucket.hit('benchmark:allowed', 10 ** 9, 1), iterations)
+            bucket.hit('benchmark:refused', 1, 10 ** 9)
+            refused = _time_calls(lambda: bucket.hit('benchmark:refused', 1, 10 ** 9), iterations)
+            results[f'{name} allowed'] = allowed
+            results[f'{name} refused'] = refused
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    local = TokenBucket()
+    results['local fallback allowed'] = _time_calls(
+        lambda: local._hit_local('benchmark:allowed', 10 ** 9, 1, int(time.time() * 1000)), iterations,
+    )
+
+    def view(request):
+        return HttpResponse('ok')
+
+    request = RequestFactory().get('/')
+    limited = rate_limit('benchmark')(view)
+    with override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMITS={'benchmark': f'{10 ** 9}/s'}):
+        bare = _time_calls(lambda: view(request), iterations)
+        decorated = _time_calls(lambda: limited(request), iterations)
+    results['view without limiter'] = bare
+    results['view with limiter'] = decorated
+    return {name: {'p50_us': p50, 'p99_us': p99} for name, (p50, p99) in results.items()}
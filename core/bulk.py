@@ -0,0 +1,167 @@
+"""
+Bulk admin actions on inquiries.
+
+set_status() changes the status of any number of inquiries with one UPDATE
+and records the change in each one's admin history with one bulk_create of
+LogEntry rows, where list_editable saves, and logs, row by row. The update
+bypasses signals, so it moves the inquiries between rollups itself
+(rollups.statuses_changing); the search index holds no statuses.
+
+Selections of more than ADMIN_BULK_SYNC_LIMIT inquiries, or "select all"
+across pages, are queued as an AdminJob holding the inquiry ids. The
+process_admin_jobs command runs queued jobs BATCH_SIZE inquiries at a time,
+one transaction per batch, and records progress after each batch for the
+admin to show. A failed job keeps the batches it finished; running it
+again is safe, as set_status() skips inquiries already in the status.
+"""
+import csv
+import json
+import logging
+import tempfile
+
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import capfirst
+
+from . import rollups
+from .models import AdminJob, CustomerInquiry
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# Newest first, as in the admin.
+ORDERING = ('-submitted_on', '-id')
+EXPORT_COLUMNS = (
+    ('ID', 'id'),
+    ('Submitted', 'submitted_on'),
+    ('Name', 'name'),
+    ('Phone', 'phone'),
+    ('Email', 'email'),
+    ('Company', 'company'),
+    ('Service', 'service_needed__name'),
+    ('Status', 'status'),
+    ('Message', 'message'),
+    ('Estimated price', 'quote__estimated_price'),
+    ('Follow-up date', 'quote__follow_up_date'),
+)
+EXPORT_HEADER = [header for header, _ in EXPORT_COLUMNS]
+# Cells starting with these are formulas to a spreadsheet.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def log_changes(user, objects, fields):
+    """Add a "Changed <fields>." admin history entry by user for each of objects, in one INSERT."""
+    if not objects:
+        return
+    content_type = ContentType.objects.get_for_model(objects[0], for_concrete_model=False)
+    message = json.dumps([{'changed': {'fields': fields}}])
+    LogEntry.objects.bulk_create([
+        LogEntry(
+            user_id=user.pk, content_type_id=content_type.pk, object_id=str(obj.pk),
+            object_repr=str(obj)[:200], action_flag=CHANGE, change_message=message,
+        )
+        for obj in objects
+    ])
+
+
+def set_status(inquiries, status, user):
+    """
+    Set the status of inquiries (a queryset) with one UPDATE, logging the
+    change for user. Returns the number of inquiries changed.
+    """
+    with transaction.atomic():
+        # Locked, so the rollups move from the statuses the update replaces.
+        changed = list(
+            CustomerInquiry.objects.filter(pk__in=inquiries.values('pk')).exclude(status=status)
+            .select_for_update().only('name', 'submitted_on').order_by()
+        )
+        if not changed:
+            return 0
+        targets = CustomerInquiry.objects.filter(pk__in=[inquiry.pk for inquiry in changed])
+        rollups.statuses_changing(targets, status)
+        targets.update(status=status)
+        log_changes(user, changed, [capfirst(CustomerInquiry._meta.get_field('status').verbose_name)])
+    return len(changed)
+
+
+def export_row(values):
+    """
+    A CSV row of values, with text that a spreadsheet would run as a formula
+    (customers write the names and messages) quoted to stay text.
+    """
+    return [f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value for value in values]
+
+
+def export_rows(inquiries):
+    """export_row()s of EXPORT_COLUMNS for inquiries, with their service and quote, newest first."""
+    fields = [field for _, field in EXPORT_COLUMNS]
+    return map(export_row, inquiries.order_by(*ORDERING).values_list(*fields).iterator(chunk_size=BATCH_SIZE))
+
+
+def queue(action, inquiries, user, **params):
+    """Queue action (an AdminJob action) on inquiries for process_admin_jobs. Returns the job."""
+    ids = list(inquiries.order_by(*ORDERING).values_list('pk', flat=True))
+    return AdminJob.objects.create(action=action, params=params, object_ids=ids, total=len(ids), user=user)
+
+
+def claim_job():
+    """Mark the oldest pending job running and return it, or None when there is none."""
+    while True:
+        job = AdminJob.objects.filter(status='pending').order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+        # Another worker may have claimed it since it was read.
+        now = timezone.now()
+        if AdminJob.objects.filter(pk=job.pk, status='pending').update(status='running', started_at=now):
+            job.status, job.started_at = 'running', now
+            return job
+
+
+def _batches(job, batch_size):
+    for start in range(0, len(job.object_ids), batch_size):
+        yield start, CustomerInquiry.objects.filter(pk__in=job.object_ids[start:start + batch_size])
+
+
+def _run_set_status(job, batch_size):
+    for start, inquiries in _batches(job, batch_size):
+        set_status(inquiries, job.params['status'], job.user)
+        yield min(start + batch_size, job.total)
+
+
+def _run_export(job, batch_size):
+    with tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(EXPORT_HEADER)
+        for start, inquiries in _batches(job, batch_size):
+            writer.writerows(export_rows(inquiries))
+            yield min(start + batch_size, job.total)
+        handle.seek(0)
+        job.result.save(f'inquiries-{job.pk}.csv', File(handle), save=False)
+
+
+RUNNERS = {
+    'set_status': _run_set_status,
+    'export': _run_export,
+}
+
+
+def run_job(job, batch_size=BATCH_SIZE):
+    """Run a claimed job, saving its progress after each batch. Returns the job, done or failed."""
+    job.processed, job.error = 0, ''
+    try:
+        for processed in RUNNERS[job.action](job, batch_size):
+            job.processed = processed
+            AdminJob.objects.filter(pk=job.pk).update(processed=processed)
+    except Exception as exc:
+        logger.exception('Admin job %s failed', job.pk)
+        job.status, job.error = 'failed', f'{exc.__class__.__name__}: {exc}'
+    else:
+        job.status = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'processed', 'error', 'result', 'finished_at'])
+    return job
@@ -0,0 +1,106 @@
+"""
+Generation-versioned caching for data that only changes through the admin.
+
+Every namespace has a generation counter in Django's cache. Values are cached
+under the generation they were loaded in, both in Django's cache (shared by
+all workers when the backend is) and in a process-local dict, so a cache hit
+costs one counter lookup and no database queries. Model signals bump the
+counter (see core.signals), which makes every worker reload on its next read.
+"""
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+
+SITE = 'site'
+SERVICES = 'services'
+PRODUCTS = 'products'
+PRICING = 'pricing'
+CAROUSEL = 'carousel'
+
+CATALOG = (SERVICES, PRODUCTS, PRICING, CAROUSEL)
+
+_local = {}
+
+
+def _generation_key(namespace):
+    return f'core:generation:{namespace}'
+
+
+def _modified_key(namespace):
+    return f'core:modified:{namespace}'
+
+
+def _new_generation():
+    # Time-based so a counter lost to eviction never restarts at a
+    # generation that still has values cached under it.
+    return int(time.time() * 1000)
+
+
+def get_generation(namespace):
+    """Return the current generation of a namespace, starting one if needed."""
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_generations(*namespaces):
+    """Return {namespace: generation} for several namespaces in one cache round trip."""
+    found = cache.get_many([_generation_key(namespace) for namespace in namespaces])
+    return {
+        namespace: found.get(_generation_key(namespace)) or get_generation(namespace)
+        for namespace in namespaces
+    }
+
+
+def last_modified(*namespaces):
+    """
+    Return the latest change time (UTC) across namespaces, as recorded by
+    bump_generation(). Namespaces with no recorded change start now.
+    """
+    keys = [_modified_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time(), None)
+            found[key] = cache.get(key)
+    return datetime.fromtimestamp(max(found.values()), tz=timezone.utc)
+
+
+def bump_generation(namespace):
+    """Invalidate everything cached in a namespace and record the change time."""
+    cache.set(_modified_key(namespace), time.time(), None)
+    key = _generation_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        generation = _new_generation()
+        cache.set(key, generation, None)
+        return generation
+
+
+def cached(namespace, key, loader):
+    """Return loader()'s value, cached until the namespace generation changes."""
+    generation = get_generation(namespace)
+    local_key = (namespace, key)
+    entry = _local.get(local_key)
+    if entry is not None and entry[0] == generation:
+        return entry[1]
+
+    shared_key = f'core:{namespace}:{generation}:{key}'
+    # Wrapped in a tuple so a cached None is distinguishable from a miss.
+    wrapped = cache.get(shared_key)
+    if wrapped is None:
+        wrapped = (loader(),)
+        cache.set(shared_key, wrapped)
+    _local[local_key] = (generation, wrapped[0])
+    return wrapped[0]
+
+
+def clear_local_cache():
+    """Forget process-local values (the shared cache is left alone)."""
+    _local.clear()
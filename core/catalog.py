@@ -0,0 +1,299 @@
+"""
+Streaming catalog import and export.
+
+Service categories, pricing tiers and products are moved as CSV (one kind
+per file) or JSON lines (one object per line, kinds mixed, each with a
+"kind" key). Rows are identified by a natural key rather than their primary
+key, so a file can be loaded into any database and loaded again to update:
+
+* category: slug (derived from name when blank);
+* tier: min_quantity;
+* product: category slug and title.
+
+Rows are read one at a time and written in batches: existing rows with
+bulk_update, new ones with bulk_create, each batch in its own transaction.
+Bulk writes bypass model signals, so each batch refreshes the product
+search index itself, and on commit bumps the affected cache generations and
+builds image derivatives for the products it wrote (pages never build them).
+"""
+import csv
+import json
+from collections import namedtuple
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from .cache import SERVICES, PRODUCTS, PRICING, bump_generation
+from .images import get_derivatives
+from .models import PricingTier, ProductExample, ServiceCategory
+from .search import index_objects
+
+
+FORMATS = ('csv', 'jsonl')
+
+Kind = namedtuple('Kind', 'model namespace key fields')
+
+# In load order: products refer to categories.
+KINDS = {
+    'category': Kind(
+        ServiceCategory, SERVICES, ('slug',), ('slug', 'name', 'description', 'icon_class', 'order', 'is_active'),
+    ),
+    'tier': Kind(PricingTier, PRICING, ('min_quantity',), ('min_quantity', 'discount_percentage', 'is_active')),
+    'product': Kind(
+        ProductExample, PRODUCTS, ('category', 'title'),
+        ('category', 'title', 'description', 'starting_price', 'unit_price', 'min_quantity', 'image',
+         'is_featured', 'is_active'),
+    ),
+}
+
+
+# Spellings of booleans accepted in CSV cells, besides Django's own.
+BOOLEANS = {'true': True, 'yes': True, 'y': True, 'false': False, 'no': False, 'n': False}
+
+
+class CatalogError(Exception):
+    """A row that cannot be imported; the message names its line."""
+
+
+# Export
+
+def export_rows(kind):
+    """Yield a kind's rows as {field: value} dicts, reading in chunks."""
+    spec = KINDS[kind]
+    columns = ['category__slug' if field == 'category' else field for field in spec.fields]
+    queryset = spec.model.objects.order_by('pk').values_list(*columns)
+    for values in queryset.iterator(chunk_size=2000):
+        yield dict(zip(spec.fields, values))
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def write_jsonl(kinds, output):
+    """Write kinds (in load order) to output as JSON lines. Returns the row count."""
+    count = 0
+    for kind in KINDS:
+        if kind in kinds:
+            for row in export_rows(kind):
+                output.write(json.dumps({'kind': kind, **row}, default=_json_default) + '\n')
+                count += 1
+    return count
+
+
+def write_csv(kind, output):
+    """Write one kind to output as CSV with a header row. Returns the row count."""
+    writer = csv.writer(output)
+    writer.writerow(KINDS[kind].fields)
+    count = 0
+    for row in export_rows(kind):
+        writer.writerow(['' if value is None else value for value in row.values()])
+        count += 1
+    return count
+
+
+# Import
+
+def read_jsonl(handle):
+    """Yield (line number, kind, row) from JSON lines, skipping blank lines."""
+    for line_number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise CatalogError(f'line {line_number}: invalid JSON ({exc})') from exc
+        if not isinstance(row, dict) or row.get('kind') not in KINDS:
+            raise CatalogError(f"line {line_number}: expected an object with kind one of {', '.join(KINDS)}")
+        yield line_number, row.pop('kind'), row
+
+
+def read_csv(handle, kind):
+    """Yield (line number, kind, row) from CSV with a header row."""
+    reader = csv.DictReader(handle)
+    unknown = set(reader.fieldnames or ()) - set(KINDS[kind].fields)
+    if unknown:
+        raise CatalogError(f"line 1: unknown column(s) for {kind}: {', '.join(sorted(unknown))}")
+    for row in reader:
+        yield reader.line_num, kind, row
+
+
+def _clean(kind, line_number, row):
+    """Model-field values for the columns present in row."""
+    spec = KINDS[kind]
+    values = {}
+    for name, raw in row.items():
+        if name not in spec.fields:
+            raise CatalogError(f'line {line_number}: unknown field {name!r} for {kind}')
+        if name in ('category', 'image'):
+            # A category slug or a file name; FileFields store "no file" as ''.
+            values[name] = str(raw or '')
+            continue
+        field = spec.model._meta.get_field(name)
+        if raw in ('', None) and field.null:
+            values[name] = None
+            continue
+        if isinstance(raw, str) and field.get_internal_type() == 'BooleanField':
+            raw = BOOLEANS.get(raw.strip().lower(), raw)
+        try:
+            values[name] = field.clean(raw, None)
+        except ValidationError as exc:
+            raise CatalogError(f"line {line_number}: {name}: {' '.join(exc.messages)}") from exc
+
+    if kind == 'category' and not values.get('slug'):
+        values['slug'] = slugify(values.get('name', ''))
+    missing = [name for name in spec.key if values.get(name) in (None, '')]
+    if missing:
+        raise CatalogError(f"line {line_number}: {kind} needs {', '.join(missing)}")
+    return values
+
+
+def _update(model, objs, fields):
+    """
+    Save fields of objs in one executemany UPDATE. Same effect as
+    bulk_update(), whose per-row CASE expressions cost far more to build
+    than the writes themselves.
+    """
+    fields = [model._meta.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in fields)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {quote(model._meta.db_table)} SET {assignments} WHERE {quote(model._meta.pk.column)} = %s',
+            [
+                [field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields] + [obj.pk]
+                for obj in objs
+            ],
+        )
+
+
+class Importer:
+    """Upsert cleaned rows of one kind at a time, a batch per transaction."""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.created = dict.fromkeys(KINDS, 0)
+        self.updated = dict.fromkeys(KINDS, 0)
+        self.unchanged = dict.fromkeys(KINDS, 0)
+        self._category_ids = {}
+
+    def load(self, records, progress=None):
+        """
+        Import (line number, kind, row) records. progress, if given, is
+        called with (kind, rows done for kind) after every batch.
+        """
+        kind, batch = None, []
+        for line_number, record_kind, row in records:
+            if batch and (record_kind != kind or len(batch) >= self.batch_size):
+                self._flush(kind, batch, progress)
+                batch = []
+            kind = record_kind
+            batch.append(_clean(kind, line_number, row))
+        if batch:
+            self._flush(kind, batch, progress)
+
+    def _flush(self, kind, batch, progress):
+        written = self.created[kind] + self.updated[kind]
+        with transaction.atomic():
+            getattr(self, f'_upsert_{kind}')(batch)
+            if self.created[kind] + self.updated[kind] > written:
+                transaction.on_commit(partial(bump_generation, KINDS[kind].namespace))
+        if progress:
+            progress(kind, self.created[kind] + self.updated[kind] + self.unchanged[kind])
+
+    def _upsert(self, kind, rows, existing, key):
+        """
+        Apply rows ({field: value}, keyed by key(values)) onto existing
+        objects ({key: obj}) or new ones. Returns the (updated, created)
+        objects; existing objects the rows do not change are left alone.
+        """
+        model = KINDS[kind].model
+        required = [
+            field.name for field in model._meta.concrete_fields
+            if field.name in KINDS[kind].fields and not (field.blank or field.null or field.has_default())
+        ]
+        by_key = {}
+        for values in rows:
+            # A key repeated within a batch: later rows win.
+            by_key.setdefault(key(values), {}).update(values)
+
+        changed, new, fields = [], [], set()
+        for object_key, values in by_key.items():
+            obj = existing.get(object_key)
+            if obj is None:
+                missing = [name for name in required if name not in values and f'{name}_id' not in values]
+                if missing:
+                    raise CatalogError(f"new {kind} {object_key}: missing {', '.join(missing)}")
+                new.append(model(**values))
+            else:
+                differs = {name: value for name, value in values.items() if getattr(obj, name) != value}
+                if differs:
+                    for name, value in differs.items():
+                        setattr(obj, name, value)
+                    changed.append(obj)
+                    fields.update(differs)
+
+        if changed:
+            _update(model, changed, sorted(fields))
+        model.objects.bulk_create(new)
+        self.created[kind] += len(new)
+        self.updated[kind] += len(changed)
+        self.unchanged[kind] += len(by_key) - len(new) - len(changed)
+        return changed, new
+
+    def _upsert_category(self, rows):
+        existing = ServiceCategory.objects.in_bulk([values['slug'] for values in rows], field_name='slug')
+        self._upsert('category', rows, existing, lambda values: values['slug'])
+
+    def _upsert_tier(self, rows):
+        existing = PricingTier.objects.in_bulk([values['min_quantity'] for values in rows], field_name='min_quantity')
+        self._upsert('tier', rows, existing, lambda values: values['min_quantity'])
+
+    def _resolve_categories(self, slugs):
+        missing = set(slugs) - set(self._category_ids)
+        if missing:
+            self._category_ids.update(
+                ServiceCategory.objects.filter(slug__in=missing).values_list('slug', 'pk')
+            )
+        unknown = set(slugs) - set(self._category_ids)
+        if unknown:
+            raise CatalogError(f"unknown category slug(s): {', '.join(sorted(unknown))}")
+
+    def _existing_products(self, keys):
+        existing = {}
+        queryset = ProductExample.objects.filter(
+            category_id__in={category_id for category_id, _ in keys}, title__in={title for _, title in keys},
+        ).order_by('-pk')
+        for product in queryset:
+            # With duplicate titles in a category, the oldest row is updated.
+            existing[(product.category_id, product.title)] = product
+        return existing
+
+    def _upsert_product(self, rows):
+        self._resolve_categories({values['category'] for values in rows})
+        for values in rows:
+            values['category_id'] = self._category_ids[values.pop('category')]
+
+        def key(values):
+            return values['category_id'], values['title']
+
+        changed, new = self._upsert(
+            'product', rows, self._existing_products({key(values) for values in rows}), key,
+        )
+        if new and new[0].pk is None:
+            # MySQL cannot return ids from a bulk insert; look the new rows
+            # up by their key.
+            new = list(self._existing_products({(obj.category_id, obj.title) for obj in new}).values())
+        index_objects('product', changed + new)
+        if getattr(settings, 'IMAGE_DERIVATIVES_ON_SAVE', True):
+            # Registered before the batch's generation bump, which so runs
+            # after the derivatives are built.
+            for product in changed + new:
+                if product.image:
+                    transaction.on_commit(partial(get_derivatives, product.image))
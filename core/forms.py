@@ -1,6 +1,52 @@
 from django import forms
-from django.core.validators import RegexValidator
-from .models import CustomerInquiry, ServiceCategory
+from django.core.validators import RegexValidator, FileExtensionValidator
+from .models import CustomerInquiry, ProductExample, ServiceCategory
+from .uploads import ALLOWED_DESIGN_EXTENSIONS
+
+
+class LineItemsField(forms.CharField):
+    """
+    Products to quote, as comma-separated "product_id:quantity" pairs (the
+    estimate modal fills it in). Cleans to a list of (ProductExample,
+    quantity), one per active product, quantities of a repeated product
+    added up.
+    """
+    MAX_ITEMS = 20
+    MAX_QUANTITY = 100000
+
+    widget = forms.HiddenInput
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        quantities = {}
+        try:
+            for item in value.split(','):
+                if item.strip():
+                    product_id, quantity = (int(part) for part in item.split(':'))
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+        except ValueError:
+            raise forms.ValidationError('Invalid quote items.', code='invalid') from None
+        if len(quantities) > self.MAX_ITEMS:
+            raise forms.ValidationError(f'Quote at most {self.MAX_ITEMS} products at a time.', code='max_items')
+
+        products = ProductExample.objects.filter(is_active=True).in_bulk(quantities)
+        items = []
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product is None:
+                raise forms.ValidationError('One of the quoted products is no longer available.', code='unavailable')
+            minimum = max(product.min_quantity, 1)
+            if not minimum <= quantity <= self.MAX_QUANTITY:
+                raise forms.ValidationError(
+                    f'Quote between {minimum} and {self.MAX_QUANTITY} units of {product.title}.',
+                    code='quantity',
+                )
+            items.append((product, quantity))
+        return items
 
 
 class CustomerInquiryForm(forms.ModelForm):
@@ -63,6 +109,7 @@ class CustomerInquiryForm(forms.ModelForm):
     
     design_file = forms.FileField(
         required=False,
+        validators=[FileExtensionValidator(ALLOWED_DESIGN_EXTENSIONS)],
         widget=forms.FileInput(attrs={
             'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary focus:border-transparent',
             'accept': '.pdf,.png,.jpg,.jpeg,.ai,.psd,.svg'
@@ -70,6 +117,8 @@ class CustomerInquiryForm(forms.ModelForm):
         help_text="Upload your logo or design files (optional)"
     )
 
+    line_items = LineItemsField()
+
     class Meta:
         model = CustomerInquiry
         fields = ['name', 'phone', 'email', 'company', 'service_needed', 'message']
@@ -0,0 +1,72 @@
+"""
+Feather icons rendered on the server as inline SVG.
+
+The registry, core/static_src/feather-icons.json, maps each Feather icon
+name to its SVG contents (the feather-icons package's dist/icons.json,
+refreshed by build_assets). It is read once per process, and each rendered
+icon (name and attributes) is kept, so {% icon %} costs a dictionary lookup
+after the first page. Icon names stored on models are checked against the
+same registry by validate_icon_name, so an icon that renders in the admin
+form also renders on the site.
+"""
+import difflib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+
+REGISTRY_FILE = Path(__file__).resolve().parent / 'static_src' / 'feather-icons.json'
+
+# Feather's own defaults, as feather.replace() rendered them.
+SVG_ATTRIBUTES = {
+    'xmlns': 'http://www.w3.org/2000/svg',
+    'width': '24',
+    'height': '24',
+    'viewBox': '0 0 24 24',
+    'fill': 'none',
+    'stroke': 'currentColor',
+    'stroke-width': '2',
+    'stroke-linecap': 'round',
+    'stroke-linejoin': 'round',
+    'aria-hidden': 'true',
+}
+
+
+@lru_cache(maxsize=None)
+def icon_registry():
+    """{name: SVG contents} of every Feather icon."""
+    return json.loads(REGISTRY_FILE.read_text())
+
+
+@lru_cache(maxsize=1024)
+def render_icon(name, **attrs):
+    """
+    The icon as an <svg> element, with attrs (e.g. class, id) added to
+    Feather's; class is appended to "feather feather-<name>". Unknown
+    names render as ''.
+    """
+    body = icon_registry().get(name)
+    if body is None:
+        return ''
+    attrs = {**SVG_ATTRIBUTES, **attrs, 'class': f"feather feather-{name} {attrs.get('class', '')}".strip()}
+    attributes = ' '.join(f'{key}="{escape(value)}"' for key, value in attrs.items())
+    return mark_safe(f'<svg {attributes}>{body}</svg>')
+
+
+def clear_icon_cache():
+    icon_registry.cache_clear()
+    render_icon.cache_clear()
+
+
+def validate_icon_name(value):
+    if value not in icon_registry():
+        suggestions = difflib.get_close_matches(value, icon_registry(), n=3)
+        hint = f" Did you mean {', '.join(suggestions)}?" if suggestions else ''
+        raise ValidationError(
+            '"%(value)s" is not a Feather icon; see https://feathericons.com for the names.%(hint)s',
+            code='invalid_icon', params={'value': value, 'hint': hint},
+        )
@@ -0,0 +1,155 @@
+"""
+Responsive image derivatives.
+
+Product, carousel and logo images are uploaded at whatever size the admin
+has to hand. generate_derivatives() resizes a source image to a few widths
+and encodes each in AVIF (when Pillow supports it), WebP and a JPEG or PNG
+fallback. Results are written to default storage under derivatives/ next to
+a manifest.json that the {% responsive_image %} tag reads to build srcset,
+sizes, width and height. Derivatives are built once a saved or imported
+image is committed, or in bulk with build_image_derivatives (the only way
+static images get them), never while rendering a page: encoding every width
+in three formats takes seconds. Until they exist the tag renders the original.
+"""
+import io
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_ROOT = 'derivatives'
+DEFAULT_WIDTHS = (320, 640, 960, 1280, 1920)
+
+# (format, MIME type, extension, save options), best first.
+MODERN_FORMATS = (
+    ('AVIF', 'image/avif', 'avif', {'quality': 55}),
+    ('WEBP', 'image/webp', 'webp', {'quality': 78, 'method': 6}),
+)
+JPEG_OPTIONS = {'quality': 82, 'optimize': True, 'progressive': True}
+PNG_OPTIONS = {'optimize': True}
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def derivative_widths():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', DEFAULT_WIDTHS))
+
+
+def available_formats():
+    """Modern formats this Pillow build can encode."""
+    Image.init()
+    return [entry for entry in MODERN_FORMATS if entry[0] in Image.SAVE]
+
+
+def source_key(source):
+    """
+    Storage-independent name for a source image: the storage name of an
+    ImageField file, or static/<path> for a static file path.
+    """
+    if isinstance(source, str):
+        return f'static/{source}'
+    return source.name
+
+
+def _open_source(source):
+    if isinstance(source, str):
+        path = finders.find(source)
+        if path:
+            return open(path, 'rb')
+        return staticfiles_storage.open(source)
+    return source.storage.open(source.name, 'rb')
+
+
+def _manifest_name(key):
+    return f'{DERIVATIVE_ROOT}/{key}/manifest.json'
+
+
+def _encode(image, fmt, options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _save(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, content)
+
+
+def generate_derivatives(source):
+    """
+    Resize source (an ImageField file or a static path) to every configured
+    width no larger than the original, encode each width in every
+    available format, and write the manifest. Returns the manifest.
+    """
+    key = source_key(source)
+    with _open_source(source) as handle:
+        image = Image.open(handle)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    width, height = image.size
+    widths = sorted({w for w in derivative_widths() if w < width} | {min(width, max(derivative_widths()))})
+
+    fallback = ('PNG', 'image/png', 'png', PNG_OPTIONS) if has_alpha else ('JPEG', 'image/jpeg', 'jpg', JPEG_OPTIONS)
+    formats = available_formats() + [fallback]
+    sources = {mime: [] for _, mime, _, _ in formats}
+    for target_width in widths:
+        target_height = max(1, round(height * target_width / width))
+        resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+        for fmt, mime, extension, options in formats:
+            name = _save(f'{DERIVATIVE_ROOT}/{key}/{target_width}.{extension}', _encode(resized, fmt, options))
+            sources[mime].append([target_width, name])
+
+    manifest = {'width': width, 'height': height, 'fallback': fallback[1], 'sources': sources}
+    _save(_manifest_name(key), ContentFile(json.dumps(manifest).encode()))
+    with _manifests_lock:
+        _manifests[key] = manifest
+    return manifest
+
+
+def get_derivatives(source, generate=True):
+    """
+    Return the manifest for source, generating derivatives when they are
+    missing and generate is true. Returns None if there are none and they
+    cannot be built (for example, the source file is missing or not an image).
+    """
+    key = source_key(source)
+    manifest = _manifests.get(key)
+    if manifest is not None:
+        return manifest or None
+
+    name = _manifest_name(key)
+    try:
+        if default_storage.exists(name):
+            with default_storage.open(name, 'rb') as handle:
+                manifest = json.load(handle)
+        elif generate:
+            return generate_derivatives(source)
+    except Exception:
+        logger.exception('Could not build image derivatives for %s', key)
+        # Remember the failure so a broken upload is not retried on every
+        # render. A replacement upload gets a new name and is tried afresh.
+        manifest = {}
+
+    if manifest is not None:
+        with _manifests_lock:
+            _manifests[key] = manifest
+    return manifest or None
+
+
+def clear_manifest_cache():
+    with _manifests_lock:
+        _manifests.clear()
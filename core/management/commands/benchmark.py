@@ -0,0 +1,104 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmark import benchmark_database, compare, default_endpoints, run_benchmarks
+from core.testing import seed_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every public endpoint against a seeded test database, reporting latency percentiles, '
+        'queries and allocations per request. Runs against the configured database backend (SQLite or MySQL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help='Synthetic products to seed.')
+        parser.add_argument('--categories', type=int, default=6, help='Synthetic categories to seed.')
+        parser.add_argument('--inquiries', type=int, default=0, help='Synthetic inquiries to seed.')
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients in the timed pass.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first.')
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Time requests through the ASGI handler on an event loop instead of WSGI threads.',
+        )
+        parser.add_argument('--endpoint', action='append', help='Only run these endpoints (repeatable).')
+        parser.add_argument('--output', help='Write results to this JSON file.')
+        parser.add_argument('--compare', help='Baseline JSON file to diff the results against.')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Percent growth counted as a regression.')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on any regression.')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+
+        with benchmark_database(options['keepdb']):
+            self.stdout.write(f"Seeding {options['products']} products in {options['categories']} categories ...")
+            seed_catalog(options['products'], options['categories'], options['inquiries'])
+            endpoints = default_endpoints()
+            if options['endpoint']:
+                endpoints = [endpoint for endpoint in endpoints if endpoint.name in options['endpoint']]
+            results = run_benchmarks(
+                endpoints, options['requests'], options['concurrency'], options['warmup'], stdout=self.stdout,
+                asgi=options['asgi'],
+            )
+            vendor = connection.vendor
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'database': vendor,
+                'server': 'asgi' if options['asgi'] else 'wsgi',
+                'async_views': settings.ASYNC_VIEWS,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                **{key: options[key] for key in ('products', 'categories', 'inquiries', 'requests', 'concurrency')},
+            },
+            'results': results,
+        }
+        self.print_results(results)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline is not None:
+            rows = compare(baseline['results'], results, options['threshold'])
+            self.print_comparison(rows, baseline['meta'])
+            if options['fail_on_regression'] and any(row[-1] for row in rows):
+                raise CommandError('Benchmark regressions found.')
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"{'endpoint':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}{'alloc KB':>10}{'errors':>8}"
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<18}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['rps']:>9}"
+                f"{row['queries']:>9}{row['allocated_kb']:>10}{row['errors'] + row['profile_errors']:>8}"
+            )
+
+    def print_comparison(self, rows, baseline_meta):
+        self.stdout.write(f"\nCompared with {baseline_meta.get('commit') or 'baseline'}:")
+        for name, metric, old, new, change, regressed in rows:
+            line = f'{name:<18}{metric:<14}{old:>10} -> {new:<10}{change:+.1f}%'
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import benchmark_database, benchmark_indexes
+from core.testing import seed_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare query plans and latency of the hot catalog and admin querysets with and without the '
+        'catalog indexes, on a seeded test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Synthetic products to seed.')
+        parser.add_argument('--inquiries', type=int, default=100000, help='Synthetic inquiries to seed.')
+        parser.add_argument('--categories', type=int, default=6, help='Synthetic categories to seed.')
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per query.')
+        parser.add_argument('--plans', action='store_true', help='Print full query plans.')
+        parser.add_argument('--output', help='Write results to this JSON file.')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs.')
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['keepdb']):
+            self.stdout.write(
+                f"Seeding {options['products']} products and {options['inquiries']} inquiries ..."
+            )
+            seed_catalog(options['products'], options['categories'], options['inquiries'], batch_size=5000)
+            results = benchmark_indexes(options['runs'])
+
+        self.stdout.write(f"{'query':<34}{'without ms':>12}{'with ms':>10}{'speedup':>9}")
+        for name, result in results.items():
+            without, with_ = result['without']['ms'], result['with']['ms']
+            speedup = f'{without / with_:.1f}x' if with_ else '-'
+            self.stdout.write(f'{name:<34}{without:>12}{with_:>10}{speedup:>9}')
+            if options['plans']:
+                for label in ('without', 'with'):
+                    self.stdout.write(f'  {label} indexes:')
+                    for line in result[label]['plan'].splitlines():
+                        self.stdout.write(f'    {line}')
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import benchmark_rate_limiter
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the per-request cost of the token-bucket rate limiter on each cache backend, '
+        'and of the rate_limit decorator around a trivial view.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5000, help='Timed calls per measurement.')
+        parser.add_argument('--output', help='Write results to this JSON file.')
+
+    def handle(self, *args, **options):
+        results = benchmark_rate_limiter(options['iterations'])
+
+        self.stdout.write(f"{'measurement':<28}{'p50 us':>10}{'p99 us':>10}")
+        for name, result in results.items():
+            self.stdout.write(f"{name:<28}{result['p50_us']:>10}{result['p99_us']:>10}")
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
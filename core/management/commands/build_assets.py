@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.assets import FEATHER_ICONS_JSON, AssetError, build_critical_css, build_css, update_icon_registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the purged Tailwind stylesheet into core/static/core and its above-the-fold part for inlining, '
+        'and refresh the Feather icon registry from the npm package. '
+        'Needs the npm packages (npm install); run collectstatic afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tailwind', help='Tailwind CLI command (default: the TAILWIND_COMMAND setting).')
+        parser.add_argument('--icons-json', default=FEATHER_ICONS_JSON, help="feather-icons' dist/icons.json.")
+        parser.add_argument('--skip-css', action='store_true', help='Only refresh the icon registry.')
+        parser.add_argument('--skip-icons', action='store_true', help='Only build the stylesheet.')
+
+    def handle(self, *args, **options):
+        try:
+            if not options['skip_css']:
+                path = build_css(options['tailwind'])
+                self.stdout.write(f'Stylesheet: {path} ({path.stat().st_size / 1024:.1f} KB)')
+                path = build_critical_css(options['tailwind'])
+                self.stdout.write(f'Critical CSS: {path} ({path.stat().st_size / 1024:.1f} KB)')
+            if not options['skip_icons']:
+                path, count = update_icon_registry(options['icons_json'])
+                self.stdout.write(f'Icon registry: {path} ({count} icons)')
+        except AssetError as exc:
+            raise CommandError(str(exc)) from exc
@@ -0,0 +1,42 @@
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand
+
+from core.cache import bump_generation
+from core.images import generate_derivatives, get_derivatives
+from core.signals import CACHE_NAMESPACES, IMAGE_FIELDS
+
+
+# Static images rendered through {% responsive_image %}.
+STATIC_IMAGES = [f'core/img/branding-products{index}.jpg' for index in range(1, 9)]
+
+
+class Command(BaseCommand):
+    help = 'Build responsive image derivatives for uploaded product, carousel and logo images and static branding images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that already exist.')
+
+    def handle(self, *args, **options):
+        build = generate_derivatives if options['force'] else get_derivatives
+        built = failed = 0
+        sources = [path for path in STATIC_IMAGES if finders.find(path)]
+        for model, field_name in IMAGE_FIELDS.items():
+            for instance in model.objects.exclude(**{field_name: ''}).only('pk', field_name).iterator():
+                sources.append(getattr(instance, field_name))
+
+        for source in sources:
+            try:
+                manifest = build(source)
+            except Exception as exc:
+                manifest = None
+                self.stderr.write(f'{source}: {exc}')
+            if manifest is None:
+                failed += 1
+            else:
+                built += 1
+        if built:
+            # Cached fragments rendered before the derivatives existed hold
+            # plain <img> tags; static images are in the carousel's.
+            for namespace in sorted({CACHE_NAMESPACES[model] for model in IMAGE_FIELDS}):
+                bump_generation(namespace)
+        self.stdout.write(f'Derivatives ready for {built} image(s), {failed} failed.')
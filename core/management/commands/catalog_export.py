@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.catalog import FORMATS, KINDS, write_csv, write_jsonl
+
+
+class Command(BaseCommand):
+    help = 'Stream service categories, pricing tiers and products to CSV or JSON lines for catalog_import.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help=f"Kinds to export: {', '.join(KINDS)} (default: all).")
+        parser.add_argument('--format', choices=FORMATS, default='jsonl', help='CSV takes exactly one kind.')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout).')
+
+    def handle(self, *args, **options):
+        kinds = options['kinds'] or list(KINDS)
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise CommandError(f"Unknown kind(s): {', '.join(sorted(unknown))}.")
+        if options['format'] == 'csv' and len(kinds) != 1:
+            raise CommandError('CSV export takes exactly one kind.')
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else self.stdout
+        try:
+            if options['format'] == 'csv':
+                count = write_csv(kinds[0], output)
+            else:
+                count = write_jsonl(kinds, output)
+        finally:
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stdout.write(f"Exported {count} row(s) to {options['output']}.")
+        else:
+            self.stderr.write(f'Exported {count} row(s).')
@@ -0,0 +1,52 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.catalog import FORMATS, KINDS, CatalogError, Importer, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream service categories, pricing tiers and products from CSV or JSON lines into the catalog, '
+        'creating new rows and updating existing ones by natural key.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="CSV or JSON lines file, or - for stdin.")
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the extension).')
+        parser.add_argument('--kind', choices=list(KINDS), help='Kind of rows in a CSV file.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per transaction.')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        if file_format == 'csv' and not options['kind']:
+            raise CommandError('CSV import needs --kind.')
+
+        start = time.perf_counter()
+
+        def progress(kind, done):
+            self.stdout.write(f'{kind}: {done} row(s) ({time.perf_counter() - start:.1f}s)')
+
+        importer = Importer(options['batch_size'])
+        try:
+            handle = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(exc)
+        try:
+            records = read_csv(handle, options['kind']) if file_format == 'csv' else read_jsonl(handle)
+            importer.load(records, progress)
+        except CatalogError as exc:
+            raise CommandError(f'{exc}. Batches before this line were imported.')
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+        for kind in KINDS:
+            if importer.created[kind] or importer.updated[kind] or importer.unchanged[kind]:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{kind}: {importer.created[kind]} created, {importer.updated[kind]} updated, '
+                    f'{importer.unchanged[kind]} unchanged.'
+                ))
+        self.stdout.write(f'Done in {time.perf_counter() - start:.1f}s.')
@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.rollups import compact, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Merge duplicate and empty inquiry rollup rows. Run periodically (e.g. nightly); '
+        'with --rebuild, recompute rollups from inquiries after writes that bypass model signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute rollups from inquiries instead of merging.')
+        parser.add_argument('--since', help='With --rebuild: only days from this date (YYYY-MM-DD).')
+        parser.add_argument('--days', type=int, help='With --rebuild: only the last N days.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            since = None
+            if options['since']:
+                try:
+                    since = date.fromisoformat(options['since'])
+                except ValueError:
+                    raise CommandError('--since must be a date, YYYY-MM-DD.')
+            elif options['days']:
+                since = timezone.now().date() - timedelta(days=options['days'] - 1)
+            count = rebuild(since)
+            self.stdout.write(f"Rebuilt {count} rollup row(s){f' from {since}' if since else ''}.")
+            return
+
+        before, after = compact()
+        self.stdout.write(f'Compacted {before} rollup row(s) into {after}.')
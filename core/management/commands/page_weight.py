@@ -0,0 +1,91 @@
+import json
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core.benchmark import compare
+from core.pageweight import COMPARED_METRICS, default_pages, measure_pages
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the bytes each public page loads, blocking and deferred, and estimate first and largest '
+        'contentful paint on a simulated slow 4G connection. Offline: renders the pages with the test client '
+        'against the configured database and reads static and media files from disk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', action='append', help='Only measure these pages (repeatable).')
+        parser.add_argument('--output', help='Write results to this JSON file.')
+        parser.add_argument('--compare', help='Baseline JSON file to diff the results against.')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Percent growth counted as a regression.')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on any regression.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+
+        pages = default_pages()
+        if options['page']:
+            pages = {name: path for name, path in pages.items() if name in options['page']}
+        # The test client's host, over plain HTTP.
+        with override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False):
+            try:
+                results = measure_pages(pages)
+            except ValueError as exc:
+                raise CommandError(str(exc)) from exc
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'deferred_loading': settings.DEFERRED_LOADING,
+            },
+            'results': results,
+        }
+        self.print_results(results)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline is not None:
+            rows = compare(baseline['results'], results, options['threshold'], COMPARED_METRICS)
+            self.print_comparison(rows, baseline['meta'])
+            if options['fail_on_regression'] and any(row[-1] for row in rows):
+                raise CommandError('Page weight regressions found.')
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"{'page':<18}{'HTML KB':>9}{'load KB':>9}{'later KB':>10}{'block KB':>10}{'requests':>10}"
+            f"{'FCP ms':>9}{'LCP ms':>9}  LCP element"
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<18}{row['html_kb']:>9}{row['initial_kb']:>9}{row['deferred_kb']:>10}{row['blocking_kb']:>10}"
+                f"{row['requests']:>10}{row['fcp_ms']:>9}{row['lcp_ms']:>9}  {row['lcp']}"
+            )
+        for name, row in results.items():
+            for url in row['third_party']:
+                self.stdout.write(f'{name}: third-party, not measured: {url}')
+            for url in row['missing']:
+                self.stdout.write(self.style.WARNING(f'{name}: not found: {url}'))
+
+    def print_comparison(self, rows, baseline_meta):
+        self.stdout.write(f"\nCompared with {baseline_meta.get('commit') or 'baseline'}:")
+        for name, metric, old, new, change, regressed in rows:
+            line = f'{name:<18}{metric:<14}{old:>10} -> {new:<10}{change:+.1f}%'
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
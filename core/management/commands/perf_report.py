@@ -0,0 +1,49 @@
+import os
+import statistics
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import percentile
+from core.performance import read_json_log
+
+
+class Command(BaseCommand):
+    help = 'Summarise sampled performance log lines: request percentiles per URL name over a recent window.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Performance log to read (default: PERFORMANCE_LOG_FILE and its rotations).')
+        parser.add_argument('--minutes', type=float, default=60, help='Only include requests from the last N minutes (0 for all).')
+        parser.add_argument('--view', help='Only report this URL name, e.g. core:index.')
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.PERFORMANCE_LOG_FILE
+        if not os.path.exists(path):
+            raise CommandError(f'No performance log at {path}.')
+
+        since = time.time() - options['minutes'] * 60 if options['minutes'] else 0
+        records = defaultdict(list)
+        for record in read_json_log(path, since):
+            view = record.get('view') or '(unresolved)'
+            if options['view'] in (None, view):
+                records[view].append(record)
+
+        if not records:
+            self.stdout.write('No sampled requests in the window.')
+            return
+
+        self.stdout.write(
+            f"{'view':<36}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'db p95':>9}{'render p95':>12}{'queries':>9}{'5xx':>6}"
+        )
+        for view, rows in sorted(records.items(), key=lambda item: -len(item[1])):
+            total = [row['total_ms'] for row in rows]
+            self.stdout.write(
+                f"{view:<36}{len(rows):>7}{percentile(total, 50):>9.1f}{percentile(total, 95):>9.1f}"
+                f"{percentile(total, 99):>9.1f}{percentile([row['db_ms'] for row in rows], 95):>9.1f}"
+                f"{percentile([row['render_ms'] for row in rows], 95):>12.1f}"
+                f"{statistics.fmean(row['queries'] for row in rows):>9.1f}"
+                f"{sum(row['status'] >= 500 for row in rows):>6}"
+            )
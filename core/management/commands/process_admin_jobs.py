@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.bulk import BATCH_SIZE, claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run bulk admin actions queued as admin jobs (status changes and exports of large selections).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Inquiries per transaction and progress update.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the queue is empty.')
+        parser.add_argument('--interval', type=float, default=10, help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            while True:
+                job = claim_job()
+                if job is None:
+                    break
+                run_job(job, options['batch_size'])
+                line = f'Job #{job.pk} ({job.get_action_display()}): {job.get_status_display()}, {job.processed}/{job.total}'
+                if job.status == 'failed':
+                    self.stdout.write(self.style.ERROR(f'{line}: {job.error}'))
+                else:
+                    self.stdout.write(line)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
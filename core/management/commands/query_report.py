@@ -0,0 +1,62 @@
+import os
+import statistics
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import percentile
+from core.performance import read_json_log
+
+
+class Command(BaseCommand):
+    help = 'Summarise the SQL query profiler log per view: slowest pages, duplicate and N+1 queries, slow query plans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Profiler log to read (default: QUERY_PROFILER_LOG_FILE and its rotations).')
+        parser.add_argument('--minutes', type=float, default=0, help='Only include requests from the last N minutes (0 for all).')
+        parser.add_argument('--view', help='Only report this URL name, e.g. admin:core_customerinquiry_changelist.')
+        parser.add_argument('--top', type=int, default=5, help='Slow queries shown per view.')
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.QUERY_PROFILER_LOG_FILE
+        if not os.path.exists(path):
+            raise CommandError(f'No query profiler log at {path}. Is QUERY_PROFILER_ENABLED set?')
+
+        since = time.time() - options['minutes'] * 60 if options['minutes'] else 0
+        records = defaultdict(list)
+        for record in read_json_log(path, since):
+            if options['view'] in (None, record['view']):
+                records[record['view']].append(record)
+        if not records:
+            self.stdout.write('No profiled requests in the window.')
+            return
+
+        # Slowest pages (by p95 database time) first.
+        views = sorted(records.items(), key=lambda item: -percentile([r['db_ms'] for r in item[1]], 95))
+        self.stdout.write(f"{'view':<48}{'requests':>9}{'queries':>9}{'db p95 ms':>11}{'dupes':>7}{'n+1':>6}{'slow':>6}")
+        for view, rows in views:
+            self.stdout.write(
+                f"{view:<48}{len(rows):>9}{statistics.fmean(r['queries'] for r in rows):>9.1f}"
+                f"{percentile([r['db_ms'] for r in rows], 95):>11.1f}"
+                f"{sum(len(r['duplicates']) for r in rows):>7}{sum(len(r['n_plus_one']) for r in rows):>6}"
+                f"{sum(len(r['slow']) for r in rows):>6}"
+            )
+
+        for view, rows in views:
+            patterns = {}
+            for row in rows:
+                for finding in row['n_plus_one'] + row['duplicates']:
+                    if finding['count'] > patterns.get(finding['sql'], 0):
+                        patterns[finding['sql']] = finding['count']
+            slow = sorted((query for row in rows for query in row['slow']), key=lambda query: -query['ms'])
+            if not patterns and not slow:
+                continue
+            self.stdout.write(f'\n{view}')
+            for sql, count in sorted(patterns.items(), key=lambda item: -item[1]):
+                self.stdout.write(f'  repeated x{count}: {sql}')
+            for query in slow[:options['top']]:
+                self.stdout.write(f"  slow {query['ms']} ms: {query['sql']}")
+                for line in query['explain'] or []:
+                    self.stdout.write(f'    {line}')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.search import INDEXED, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product and inquiry search index, e.g. after bulk imports that bypass model signals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help=f"Kinds to rebuild: {', '.join(INDEXED)} (default: all).")
+        parser.add_argument('--batch-size', type=int, default=1000, help='Records read per query.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(INDEXED)
+        if unknown:
+            raise CommandError(f"Unknown kind(s): {', '.join(sorted(unknown))}.")
+        for kind in options['kinds'] or INDEXED:
+            count = rebuild(kind, options['batch_size'])
+            self.stdout.write(f'Indexed {count} {kind} record(s).')
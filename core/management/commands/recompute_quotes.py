@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.quotes import recompute_quotes
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-price the line items and estimated prices of open, automatically priced quotes from the current '
+        'product prices and pricing tiers. Run after changing either.'
+    )
+
+    def handle(self, *args, **options):
+        count = recompute_quotes()
+        self.stdout.write(f'Recomputed {count} open quote(s).')
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import send_due_emails
+
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails from the outbox, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails sent per SMTP connection.')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before an email is marked failed.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the outbox is drained.')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = send_due_emails(options['batch_size'], options['max_attempts'])
+                total_sent += sent
+                total_failed += failed
+                # A batch with failures is retried later, not in this pass.
+                if sent + failed < options['batch_size'] or failed:
+                    break
+            if total_sent or total_failed:
+                self.stdout.write(f'Sent {total_sent} email(s), {total_failed} failed.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
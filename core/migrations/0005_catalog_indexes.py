@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carouselimage',
+            index=models.Index(fields=['is_active', 'order'], name='core_carousel_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerinquiry',
+            index=models.Index(fields=['-submitted_on', '-id'], name='core_inquiry_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerinquiry',
+            index=models.Index(fields=['status', '-submitted_on', '-id'], name='core_inquiry_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricingtier',
+            index=models.Index(fields=['is_active', '-min_quantity'], name='core_tier_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productexample',
+            index=models.Index(fields=['is_active', 'is_featured', 'starting_price'], name='core_product_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productexample',
+            index=models.Index(fields=['category', 'is_active', '-is_featured', 'starting_price'], name='core_product_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicecategory',
+            index=models.Index(fields=['is_active', 'order', 'name'], name='core_service_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='socialmedialink',
+            index=models.Index(fields=['is_active', 'order'], name='core_social_active_idx'),
+        ),
+    ]
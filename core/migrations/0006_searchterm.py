@@ -0,0 +1,66 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:08
+
+import re
+
+from django.db import migrations, models
+
+
+# The index as core.search built it when this migration was written, frozen
+# so later changes to the indexed fields, weights or tokenizer cannot change
+# what replaying it produces.
+TERM_MAX_LENGTH = 40
+STOP_WORDS = frozenset('a an and are as at be by for from in is it of on or the to with'.split())
+INDEXED = {
+    'product': ('ProductExample', {'title': 3, 'description': 1}),
+    'inquiry': ('CustomerInquiry', {'name': 3, 'email': 3, 'phone': 3, 'company': 2, 'message': 1}),
+}
+WORD = re.compile(r'\w+')
+
+
+def document_terms(values, weights):
+    terms = {}
+    for field, weight in weights.items():
+        for word in WORD.findall((values.get(field) or '').lower()):
+            if len(word) > 1 and word not in STOP_WORDS:
+                term = word[:TERM_MAX_LENGTH]
+                terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+def build_search_index(apps, schema_editor):
+    SearchTerm = apps.get_model('core', 'SearchTerm')
+    for kind, (model_name, weights) in INDEXED.items():
+        rows = []
+        for values in apps.get_model('core', model_name).objects.values('pk', *weights).iterator():
+            rows.extend(
+                SearchTerm(kind=kind, object_id=values['pk'], term=term, weight=weight)
+                for term, weight in document_terms(values, weights).items()
+            )
+            if len(rows) >= 5000:
+                SearchTerm.objects.bulk_create(rows)
+                rows = []
+        SearchTerm.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Product'), ('inquiry', 'Inquiry')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('term', models.CharField(max_length=40)),
+                ('weight', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'term', 'object_id'], name='core_search_term_idx'), models.Index(fields=['kind', 'object_id'], name='core_search_object_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
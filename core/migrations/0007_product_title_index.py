@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_searchterm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productexample',
+            index=models.Index(fields=['category', 'title'], name='core_product_title_idx'),
+        ),
+    ]
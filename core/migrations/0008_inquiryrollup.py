@@ -0,0 +1,50 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def build_rollups(apps, schema_editor):
+    CustomerInquiry = apps.get_model('core', 'CustomerInquiry')
+    InquiryRollup = apps.get_model('core', 'InquiryRollup')
+    totals = (
+        CustomerInquiry.objects.annotate(day=TruncDate('submitted_on'))
+        .values('day', 'service_needed_id', 'status')
+        .annotate(count=Count('id'), quotes=Count('quote__estimated_price'), value=Sum('quote__estimated_price'))
+        .order_by()
+    )
+    InquiryRollup.objects.bulk_create(
+        InquiryRollup(
+            day=row['day'], service_id=row['service_needed_id'], status=row['status'],
+            inquiries=row['count'], quotes=row['quotes'], quote_value=row['value'] or 0,
+        )
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_product_title_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InquiryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('new', 'New'), ('contacted', 'Contacted'), ('quoted', 'Quote Sent'), ('closed', 'Closed')], max_length=20)),
+                ('inquiries', models.IntegerField(default=0)),
+                ('quotes', models.IntegerField(default=0, help_text='Quotes with an estimated price')),
+                ('quote_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.servicecategory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'service', 'status'], name='core_rollup_key_idx')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:48
+
+import core.icons
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_inquiryrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='servicecategory',
+            name='icon_class',
+            field=models.CharField(help_text="Feather icon name (e.g., 'layers', 'coffee', 'truck')", max_length=50, validators=[core.icons.validate_icon_name]),
+        ),
+        migrations.AlterField(
+            model_name='socialmedialink',
+            name='icon_class',
+            field=models.CharField(help_text='Feather icon name (e.g., facebook, instagram)', max_length=50, validators=[core.icons.validate_icon_name]),
+        ),
+    ]
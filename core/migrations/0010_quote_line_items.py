@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-18 03:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_icon_name_validation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quoterequest',
+            name='auto_priced',
+            field=models.BooleanField(default=False, help_text='Estimated price computed from the line items, and recomputed when prices change. Cleared when the price is set by hand.'),
+        ),
+        migrations.CreateModel(
+            name='QuoteLineItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('total', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.productexample')),
+                ('quote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='core.quoterequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'quantity'], name='core_lineitem_price_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,14 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 
+from .cache import SITE, cached
+from .icons import validate_icon_name
+
+
 class SingletonModel(models.Model):
     """Abstract class to ensure only one instance of a model exists."""
     class Meta:
@@ -14,8 +21,11 @@ class SingletonModel(models.Model):
 
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(id=1)
-        return obj
+        """Return the instance, creating it if needed; cached until the next site change."""
+        def get_or_create():
+            obj, created = cls.objects.get_or_create(id=1)
+            return obj
+        return cached(SITE, f'{cls._meta.label_lower}:load', get_or_create)
 
 
 
@@ -26,7 +36,8 @@ class ServiceCategory(models.Model):
     description = models.TextField()
     icon_class = models.CharField(
         max_length=50,
-        help_text="Feather icon name (e.g., 'shirt', 'coffee', 'truck')"
+        validators=[validate_icon_name],
+        help_text="Feather icon name (e.g., 'layers', 'coffee', 'truck')"
     )
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
@@ -34,6 +45,9 @@ class ServiceCategory(models.Model):
     class Meta:
         verbose_name_plural = "Service Categories"
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['is_active', 'order', 'name'], name='core_service_listing_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -73,6 +87,17 @@ class ProductExample(models.Model):
 
     class Meta:
         ordering = ['-is_featured', 'starting_price']
+        indexes = [
+            # Featured listings (index, products page): filter is_active and
+            # is_featured, then read in starting_price order.
+            models.Index(fields=['is_active', 'is_featured', 'starting_price'], name='core_product_listing_idx'),
+            # A service page's products, in the default ordering.
+            models.Index(
+                fields=['category', 'is_active', '-is_featured', 'starting_price'], name='core_product_category_idx',
+            ),
+            # Natural key used by catalog_import to match rows to products.
+            models.Index(fields=['category', 'title'], name='core_product_title_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - KSh {self.starting_price}"
@@ -109,6 +134,12 @@ class CustomerInquiry(models.Model):
     class Meta:
         verbose_name_plural = "Customer Inquiries"
         ordering = ['-submitted_on']
+        indexes = [
+            # Admin changelist and date_hierarchy, with and without the status
+            # filter. The admin adds -pk to make the ordering total.
+            models.Index(fields=['-submitted_on', '-id'], name='core_inquiry_recent_idx'),
+            models.Index(fields=['status', '-submitted_on', '-id'], name='core_inquiry_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.submitted_on.strftime('%Y-%m-%d')}"
@@ -144,6 +175,11 @@ class QuoteRequest(models.Model):
         null=True,
         blank=True
     )
+    auto_priced = models.BooleanField(
+        default=False,
+        help_text="Estimated price computed from the line items, and recomputed when prices change. "
+                  "Cleared when the price is set by hand."
+    )
     notes = models.TextField(blank=True)
     follow_up_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -153,6 +189,33 @@ class QuoteRequest(models.Model):
         return f"Quote for {self.inquiry.name}"
 
 
+class QuoteLineItem(models.Model):
+    """A product and quantity on a quote, priced by core.quotes."""
+    quote = models.ForeignKey(
+        QuoteRequest,
+        on_delete=models.CASCADE,
+        related_name='line_items'
+    )
+    product = models.ForeignKey(
+        ProductExample,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # recompute_quotes updates every line of a product and quantity at once.
+            models.Index(fields=['product', 'quantity'], name='core_lineitem_price_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product or 'deleted product'}"
+
+
 class PricingTier(models.Model):
     """Global volume discount tiers."""
     min_quantity = models.PositiveIntegerField(unique=True, help_text="Minimum quantity to trigger this discount")
@@ -165,6 +228,9 @@ class PricingTier(models.Model):
 
     class Meta:
         ordering = ['-min_quantity']
+        indexes = [
+            models.Index(fields=['is_active', '-min_quantity'], name='core_tier_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.min_quantity}+ units: {self.discount_percentage}% off"
@@ -190,12 +256,17 @@ class SocialMediaLink(models.Model):
     """Social media links for footer."""
     name = models.CharField(max_length=50, help_text="e.g., Facebook, Instagram")
     url = models.URLField()
-    icon_class = models.CharField(max_length=50, help_text="Feather icon name (e.g., facebook, instagram)")
+    icon_class = models.CharField(
+        max_length=50, validators=[validate_icon_name], help_text="Feather icon name (e.g., facebook, instagram)"
+    )
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['is_active', 'order'], name='core_social_active_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -210,6 +281,149 @@ class CarouselImage(models.Model):
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['is_active', 'order'], name='core_carousel_active_idx'),
+        ]
 
     def __str__(self):
         return self.title or f"Slide {self.id}"
+
+
+
+class OutboundEmail(models.Model):
+    """Queued notification email, delivered by the send_outbox management command."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.EmailField()
+    recipients = models.TextField(help_text="Comma-separated email addresses")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipients}"
+
+    @property
+    def recipient_list(self):
+        return [address.strip() for address in self.recipients.split(',') if address.strip()]
+
+
+class SearchTerm(models.Model):
+    """
+    Inverted search index: one row per distinct term of an indexed object,
+    maintained by core.search. Serves admin and public search without
+    LIKE '%...%' scans over text columns.
+    """
+    KIND_CHOICES = [
+        ('product', 'Product'),
+        ('inquiry', 'Inquiry'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    term = models.CharField(max_length=40)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Term and prefix lookups (term range scans) within a kind.
+            models.Index(fields=['kind', 'term', 'object_id'], name='core_search_term_idx'),
+            # Replacing or deleting one object's terms.
+            models.Index(fields=['kind', 'object_id'], name='core_search_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.term}"
+
+
+class InquiryRollup(models.Model):
+    """
+    Inquiry and quote totals per submission day, service and current status,
+    maintained by core.rollups as inquiries and quotes change. The analytics
+    dashboard reads only this table, so its cost follows the number of days
+    shown rather than the number of inquiries.
+    """
+    day = models.DateField()
+    service = models.ForeignKey(
+        ServiceCategory,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    status = models.CharField(max_length=20, choices=CustomerInquiry.STATUS_CHOICES)
+    inquiries = models.IntegerField(default=0)
+    quotes = models.IntegerField(default=0, help_text="Quotes with an estimated price")
+    quote_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['day', 'service', 'status'], name='core_rollup_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.service_id} {self.status}: {self.inquiries}"
+
+
+def export_storage():
+    """Storage for admin job exports, outside MEDIA_ROOT (see ADMIN_EXPORT_ROOT)."""
+    return FileSystemStorage(location=settings.ADMIN_EXPORT_ROOT)
+
+
+class AdminJob(models.Model):
+    """
+    Bulk admin action queued for the process_admin_jobs management command,
+    for selections too large to handle in the request (see core.bulk).
+    """
+    ACTION_CHOICES = [
+        ('set_status', 'Set inquiry status'),
+        ('export', 'Export inquiries'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    object_ids = models.JSONField(default=list, help_text="Inquiry ids, in processing order")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    result = models.FileField(upload_to='admin-jobs/', storage=export_storage, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='core_adminjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} ({self.total}) #{self.pk}"
+
+    @property
+    def percent(self):
+        return round(100 * self.processed / self.total) if self.total else 100
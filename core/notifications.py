@@ -0,0 +1,160 @@
+"""
+Notification outbox.
+
+Views queue emails as OutboundEmail rows inside their own transaction, so
+the request never talks to the mail server. The send_outbox management
+command delivers due rows over one SMTP connection per batch, retrying
+failures with exponential backoff.
+
+Workers may overlap (an always-on send_outbox --loop and a scheduled run),
+so each claims its batch before sending: the rows are locked, skipping rows
+another worker holds, and marked 'sending' with a lease in next_attempt_at.
+A worker that dies mid-batch leaves its rows to be claimed again once the
+lease (SEND_TIMEOUT) runs out.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=6)
+SEND_TIMEOUT = timedelta(minutes=10)
+
+
+def queue_email(subject, body, recipients, from_email=None):
+    return OutboundEmail(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=', '.join(recipients),
+    )
+
+
+def queue_inquiry_emails(inquiry, quote=None):
+    """Queue the admin notification and customer auto-reply for a new inquiry and its quote request."""
+    price = quote.estimated_price if quote is not None else None
+    admin_notification = queue_email(
+        subject=f'New Inquiry from {inquiry.name}',
+        body=f'''
+New inquiry received on PrintHive Kenya:
+
+Name: {inquiry.name}
+Phone: {inquiry.phone}
+Email: {inquiry.email}
+Company: {inquiry.company or 'N/A'}
+Service: {inquiry.service_needed or 'Not specified'}
+Estimate: {f'KSh {price:,.2f} (from the quoted products)' if price is not None else 'None'}
+
+Message:
+{inquiry.message}
+
+---
+View in admin: /admin/core/customerinquiry/{inquiry.id}/change/
+WhatsApp: {inquiry.whatsapp_link}
+        ''',
+        recipients=[settings.DEFAULT_FROM_EMAIL],
+    )
+    auto_reply = queue_email(
+        subject='Thank you for contacting PrintHive Kenya!',
+        body=f'''
+Dear {inquiry.name},
+
+Thank you for reaching out to PrintHive Kenya! We have received your inquiry and our team will get back to you within 24 hours.
+
+Your inquiry details:
+- Service: {inquiry.service_needed or 'General inquiry'}
+- Message: {inquiry.message[:200]}{'...' if len(inquiry.message) > 200 else ''}
+{f'- Estimated total: KSh {price:,.2f} (we will confirm the final price)' if price is not None else ''}
+
+If you need immediate assistance, please call us at +254 700 123 456 or message us on WhatsApp.
+
+Best regards,
+The PrintHive Kenya Team
+        ''',
+        recipients=[inquiry.email],
+    )
+    return OutboundEmail.objects.bulk_create([admin_notification, auto_reply])
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 1, 2, 4, ... minutes, capped at RETRY_MAX_DELAY."""
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def send_due_emails(batch_size=50, max_attempts=5):
+    """
+    Send up to batch_size due emails over a single connection. Returns
+    (sent, failed) counts; failures are rescheduled until max_attempts.
+    """
+    now = timezone.now()
+    batch = claim_due_emails(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # Nothing can go out; count one attempt against every email in the batch.
+        for email in batch:
+            _record_failure(email, exc, now, max_attempts)
+        return 0, len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.recipient_list,
+                connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as exc:
+                _record_failure(email, exc, now, max_attempts)
+                failed += 1
+            else:
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                email.attempts += 1
+                email.save(update_fields=['status', 'sent_at', 'attempts'])
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def claim_due_emails(batch_size, now):
+    """
+    Mark up to batch_size due emails (pending, or claimed by a worker whose
+    lease has run out) as 'sending' for this worker, and return them.
+    """
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        if batch:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                status='sending', next_attempt_at=now + SEND_TIMEOUT,
+            )
+    return batch
+
+
+def _record_failure(email, exc, now, max_attempts):
+    email.attempts += 1
+    email.last_error = f'{exc.__class__.__name__}: {exc}'
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = now + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
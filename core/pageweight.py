@@ -0,0 +1,274 @@
+"""
+Offline page weight and load-time estimates for the public pages.
+
+measure_page() renders a page with the test client and reads its HTML the
+way a browser's preload scanner would, without a browser or network:
+
+* stylesheets and scripts in <head> without async/defer block rendering;
+* eager images are fetched on load (for <picture>, the first <source>,
+  which is the most compact format; the srcset candidate is the one a
+  mobile viewport would pick); lazy images, deferred carousel slides
+  (data-srcset) and data-fragment placeholders are fetched later;
+* <noscript> content is skipped, as in a browser running scripts.
+
+Sizes come from the static files (collected or found), media storage, or
+for fragments the fragment's own response; CSS, JS and HTML are counted
+gzipped, as served. Third-party URLs (fonts, CDNs) cannot be measured
+offline: they are listed, and each costs a connection in the timings.
+
+First and largest contentful paint are modelled on Lighthouse's simulated
+slow 4G (150 ms round trips, 1.6 Mbps): the HTML, then the blocking
+resources, then the LCP element, which is the fetchpriority="high" image
+when the page has one and otherwise text, painted with the first paint.
+The numbers are for comparing one build with another (the page_weight
+command can diff against a saved run, like benchmark does), not a
+substitute for measuring in a real browser.
+"""
+import gzip
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
+from django.test import Client
+from django.urls import reverse
+
+from .models import ServiceCategory
+
+
+RTT_MS = 150
+THROUGHPUT_KBPS = 1638.4
+# DNS, TCP and TLS before the first request to an origin.
+CONNECTION_RTTS = 3
+# Lighthouse's emulated mobile device.
+VIEWPORT_WIDTH = 412
+DEVICE_PIXEL_RATIO = 1.75
+
+TEXT_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.html')
+
+# Metrics where a higher value in the current run is a regression.
+COMPARED_METRICS = ('initial_kb', 'blocking_kb', 'requests', 'fcp_ms', 'lcp_ms')
+
+
+def default_pages():
+    """{name: path} of the pages to measure, using the first active category."""
+    category = ServiceCategory.objects.filter(is_active=True).order_by('order', 'name').first()
+    pages = {'index': reverse('core:index'), 'products': reverse('core:products')}
+    if category is not None:
+        pages['service_detail'] = reverse('core:service_detail', args=[category.slug])
+    pages['inquiry_success'] = reverse('core:inquiry_success')
+    return pages
+
+
+class PageParser(HTMLParser):
+    """Collects the resources a page asks for, as dicts with url, kind and when they load."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.resources = []
+        self.in_head = False
+        self.noscript = 0
+        self.picture = None
+
+    def add(self, url, kind, load='initial', **extra):
+        if url:
+            self.resources.append({'url': url, 'kind': kind, 'load': load, **extra})
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'noscript':
+            self.noscript += 1
+        if self.noscript:
+            return
+        if tag == 'head':
+            self.in_head = True
+        elif tag == 'body':
+            self.in_head = False
+        elif tag == 'link':
+            rel = (attrs.get('rel') or '').split()
+            if 'stylesheet' in rel:
+                self.add(attrs.get('href'), 'css', blocking=attrs.get('media', 'all') != 'print')
+            elif 'preload' in rel and attrs.get('as') == 'style':
+                self.add(attrs.get('href'), 'css', blocking=False)
+        elif tag == 'script' and attrs.get('src'):
+            blocking = self.in_head and not {'async', 'defer'} & attrs.keys() and attrs.get('type') != 'module'
+            self.add(attrs['src'], 'js', blocking=blocking)
+        elif tag == 'picture':
+            self.picture = {}
+        elif tag == 'source' and self.picture is not None and not self.picture:
+            self.picture.update(attrs)
+        elif tag == 'img':
+            self.image(attrs, self.picture or {})
+        if 'data-fragment' in attrs:
+            self.add(attrs['data-fragment'], 'fragment', 'deferred')
+
+    def handle_endtag(self, tag):
+        if tag == 'noscript':
+            self.noscript = max(0, self.noscript - 1)
+        elif tag == 'picture':
+            self.picture = None
+        elif tag == 'head':
+            self.in_head = False
+
+    def image(self, attrs, source):
+        srcset = source.get('srcset') or attrs.get('srcset')
+        deferred = not (srcset or attrs.get('src'))
+        if deferred:
+            srcset = source.get('data-srcset') or attrs.get('data-srcset')
+        url = pick_candidate(srcset, source.get('sizes') or attrs.get('sizes')) if srcset else None
+        url = url or attrs.get('src') or attrs.get('data-src')
+        load = 'deferred' if deferred or attrs.get('loading') == 'lazy' else 'initial'
+        self.add(url, 'image', load, lcp=attrs.get('fetchpriority') == 'high')
+
+
+def slot_width(sizes, viewport=VIEWPORT_WIDTH):
+    """CSS pixel width of an image slot from its sizes attribute, for a viewport this wide."""
+    for entry in (sizes or '100vw').split(','):
+        entry = entry.strip()
+        match = re.match(r'\(\s*(min|max)-width:\s*(\d+)px\s*\)\s*(.+)', entry)
+        if match:
+            kind, width, entry = match.groups()
+            if (viewport < int(width)) if kind == 'min' else (viewport > int(width)):
+                continue
+        match = re.fullmatch(r'([\d.]+)(vw|px)', entry)
+        if match:
+            value, unit = float(match.group(1)), match.group(2)
+            return viewport * value / 100 if unit == 'vw' else value
+        return viewport
+    return viewport
+
+
+def pick_candidate(srcset, sizes, viewport=VIEWPORT_WIDTH, dpr=DEVICE_PIXEL_RATIO):
+    """The srcset URL a browser would choose: the narrowest at least as wide as the slot needs."""
+    slot = slot_width(sizes, viewport)
+    candidates = []
+    for entry in srcset.split(','):
+        parts = entry.split()
+        if not parts:
+            continue
+        descriptor = parts[1] if len(parts) > 1 else '1x'
+        value = float(descriptor[:-1])
+        candidates.append((value * slot if descriptor.endswith('x') else value, parts[0]))
+    if not candidates:
+        return None
+    needed = slot * dpr
+    candidates.sort()
+    return next((url for width, url in candidates if width >= needed), candidates[-1][1])
+
+
+def transfer_size(name, content):
+    """Bytes on the wire: gzipped for text, as the server sends it."""
+    if name.endswith(TEXT_EXTENSIONS):
+        return len(gzip.compress(content, compresslevel=6, mtime=0))
+    return len(content)
+
+
+def _read_static(name):
+    if staticfiles_storage.exists(name):
+        with staticfiles_storage.open(name) as handle:
+            return handle.read()
+    path = finders.find(name)
+    return Path(path).read_bytes() if path else None
+
+
+def _read_media(name):
+    if default_storage.exists(name):
+        with default_storage.open(name) as handle:
+            return handle.read()
+    return None
+
+
+def resource_size(url, client):
+    """Transfer size in bytes of a same-site URL, or None if it is missing."""
+    path = urlsplit(url).path
+    if path.startswith(settings.STATIC_URL):
+        content = _read_static(path[len(settings.STATIC_URL):])
+    elif path.startswith(settings.MEDIA_URL):
+        content = _read_media(path[len(settings.MEDIA_URL):])
+    else:
+        response = client.get(path)
+        content = response.content if response.status_code == 200 else None
+        path += '.html'
+    return None if content is None else transfer_size(path, content)
+
+
+def _load_ms(size, rtts=1):
+    return rtts * RTT_MS + size * 8 / THROUGHPUT_KBPS / 1024 * 1000
+
+
+def measure_page(path, client=None):
+    """
+    Weight and simulated paint times of one page: {'html_kb',
+    'initial_kb' (HTML and everything fetched on load), 'deferred_kb'
+    (lazy images, deferred slides and fragments), 'blocking_kb',
+    'requests' (on load), 'fcp_ms', 'lcp_ms', 'lcp' (the LCP element),
+    'third_party' (URLs not measured), 'missing' (same-site URLs not
+    found)}.
+    """
+    client = client or Client()
+    response = client.get(path)
+    if response.status_code != 200:
+        raise ValueError(f'{path} returned {response.status_code}')
+    html = response.content
+    parser = PageParser()
+    parser.feed(html.decode(response.charset or 'utf-8'))
+
+    html_size = transfer_size('page.html', html)
+    initial = deferred = blocking = 0
+    blocking_rtts = 0
+    requests = 1
+    third_party, missing, seen = [], [], set()
+    lcp_url, lcp_size = None, 0
+    for resource in parser.resources:
+        url = resource['url']
+        if url in seen:
+            continue
+        seen.add(url)
+        requests += resource['load'] == 'initial'
+        if urlsplit(url).netloc:
+            third_party.append(url)
+            if resource.get('blocking'):
+                # A new origin: connection setup, then the request.
+                blocking_rtts = max(blocking_rtts, CONNECTION_RTTS + 1)
+            continue
+        size = resource_size(url, client)
+        if size is None:
+            missing.append(url)
+            continue
+        if resource['load'] == 'deferred':
+            deferred += size
+            continue
+        initial += size
+        if resource.get('blocking'):
+            blocking += size
+            blocking_rtts = max(blocking_rtts, 1)
+        if resource.get('lcp') and lcp_url is None:
+            lcp_url, lcp_size = url, size
+
+    html_ms = _load_ms(html_size, CONNECTION_RTTS + 1)
+    fcp_ms = html_ms + _load_ms(blocking, blocking_rtts)
+    # The LCP image is found by the preload scanner with the blocking
+    # resources and shares the connection with them.
+    lcp_ms = max(fcp_ms, html_ms + _load_ms(blocking + lcp_size, max(blocking_rtts, 1))) if lcp_url else fcp_ms
+    return {
+        'html_kb': round(html_size / 1024, 1),
+        'initial_kb': round((html_size + initial) / 1024, 1),
+        'deferred_kb': round(deferred / 1024, 1),
+        'blocking_kb': round(blocking / 1024, 1),
+        'requests': requests,
+        'fcp_ms': round(fcp_ms),
+        'lcp_ms': round(lcp_ms),
+        'lcp': lcp_url or 'text',
+        'third_party': third_party,
+        'missing': missing,
+    }
+
+
+def measure_pages(pages, client=None):
+    """{name: measure_page(path)} for a {name: path} dict."""
+    client = client or Client()
+    return {name: measure_page(path, client) for name, path in pages.items()}
@@ -0,0 +1,187 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware times every request and collects, for the current
+request only (through a context variable):
+
+* db: query count and time, from an execute wrapper on every connection;
+* render: template rendering, from the TimedDjangoTemplates backend;
+* context: the site_context context processor (part of render);
+* total: the whole request.
+
+The numbers go out as a Server-Timing header when PERFORMANCE_SERVER_TIMING
+is set (DEBUG only by default) and, for a sample of requests, as one JSON
+line on the core.performance logger. The perf_report command
+reads those lines back and prints percentiles per URL name.
+"""
+import glob
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+
+logger = logging.getLogger('core.performance')
+
+_current = ContextVar('core_performance_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings (seconds) and query count collected for one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = {'db': 0.0, 'render': 0.0, 'context': 0.0}
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timer(name):
+    """Add the time spent in the block (or decorated function) to the current request's metrics."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    metrics.queries += 1
+    with timer('db'):
+        return execute(sql, params, many, context)
+
+
+def wrap_connections(wrapper):
+    """
+    Install an execute wrapper on every database connection of the calling
+    thread (connections are per thread); closing the returned ExitStack
+    removes it.
+    """
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+    return stack
+
+
+class PerformanceMiddleware:
+    """Collect RequestMetrics for each request; report them as Server-Timing and sampled logs."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.collect() as metrics, wrap_connections(_record_query):
+            response = self.get_response(request)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        with self.collect() as metrics:
+            # Under ASGI the ORM runs in a worker thread with its own
+            # connections, which inherits the metrics context variable.
+            stack = await sync_to_async(wrap_connections)(_record_query)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        return self.report(request, response, metrics)
+
+    @contextmanager
+    def collect(self):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            _current.reset(token)
+        metrics.add('total', time.perf_counter() - start)
+
+    def report(self, request, response, metrics):
+        if getattr(settings, 'PERFORMANCE_SERVER_TIMING', False):
+            response['Server-Timing'] = server_timing(metrics)
+        sample_rate = getattr(settings, 'PERFORMANCE_LOG_SAMPLE_RATE', 0)
+        if sample_rate and random.random() < sample_rate:
+            logger.info(json.dumps(log_record(request, response, metrics)))
+        return response
+
+
+def server_timing(metrics):
+    timings = metrics.timings
+    return ', '.join([
+        f'db;dur={timings["db"] * 1000:.1f};desc="{metrics.queries} queries"',
+        f'render;dur={timings["render"] * 1000:.1f}',
+        f'context;dur={timings["context"] * 1000:.1f}',
+        f'total;dur={timings["total"] * 1000:.1f}',
+    ])
+
+
+def log_record(request, response, metrics):
+    match = request.resolver_match
+    return {
+        'ts': round(time.time(), 3),
+        'view': match.view_name if match else None,
+        'method': request.method,
+        'status': response.status_code,
+        'queries': metrics.queries,
+        **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in metrics.timings.items()},
+    }
+
+
+def read_json_log(path, since=0):
+    """Yield the JSON records logged to path and its rotations at or after since (epoch seconds)."""
+    for log_path in sorted(glob.glob(glob.escape(path) + '*')):
+        with open(log_path) as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('ts', 0) >= since:
+                    yield record
+
+
+class TimedTemplate:
+    """Backend template wrapper that adds render() time to the request's metrics."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timer('render'):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with top-level renders timed for PerformanceMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -0,0 +1,162 @@
+"""
+In-process pricing engine for the estimate calculator.
+
+Active pricing tiers and product base prices are loaded once into a
+PricingTable and kept in memory until the services, products or pricing
+cache generation changes (see core.cache and core.signals), so price
+lookups need no database queries.
+
+The estimate modal prices locally from payload() using the same integer
+arithmetic as price_cents(); static/core/js/pricing.js must stay in step
+with it.
+"""
+import asyncio
+import hashlib
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+from decimal import Decimal
+from functools import cached_property
+
+from asgiref.sync import sync_to_async
+
+from .cache import SERVICES, PRODUCTS, PRICING, get_generations
+from .models import ProductExample, PricingTier
+
+
+HUNDRED = Decimal('100.00')
+
+Quote = namedtuple('Quote', ['product_id', 'qty', 'base_unit_price', 'discount_percentage', 'unit_price', 'total_price'])
+
+
+def to_cents(amount):
+    return int(amount * 100)
+
+
+def to_basis_points(percentage):
+    return int(percentage * 100)
+
+
+def price_cents(base_cents, discount_basis_points, qty):
+    """Total in cents, rounded half up, for qty units at a discount in 1/100ths of a percent."""
+    return (base_cents * (10000 - discount_basis_points) * qty + 5000) // 10000
+
+
+class PricingTable:
+    """Sorted tier breakpoints plus base unit prices keyed by product id."""
+
+    def __init__(self, tiers, base_prices, categories=None):
+        # tiers: iterable of (min_quantity, discount_percentage)
+        # base_prices: iterable of (product_id, base unit price)
+        # categories: optional {category slug: [active product ids]}
+        tiers = sorted(tiers)
+        self.breakpoints = [min_quantity for min_quantity, _ in tiers]
+        self.discounts = [discount for _, discount in tiers]
+        self.base_prices = dict(base_prices)
+        self.categories = categories or {}
+
+    @staticmethod
+    def _queries():
+        tiers = PricingTier.objects.filter(is_active=True).values_list('min_quantity', 'discount_percentage')
+        products = ProductExample.objects.order_by('-is_featured', 'starting_price', 'id').values_list(
+            'id', 'unit_price', 'starting_price', 'is_active', 'category__slug'
+        )
+        return tiers, products
+
+    @classmethod
+    def _build(cls, tiers, products):
+        base_prices = []
+        categories = {}
+        for product_id, unit_price, starting_price, is_active, category_slug in products:
+            base_prices.append((product_id, unit_price if unit_price else starting_price))
+            if is_active:
+                categories.setdefault(category_slug, []).append(product_id)
+        return cls(tiers, base_prices, categories)
+
+    @classmethod
+    def load(cls):
+        """Build a table from the database (one query for tiers, one for products)."""
+        return cls._build(*cls._queries())
+
+    @classmethod
+    async def aload(cls):
+        """load() through the async ORM, with both queries in flight together."""
+        async def fetch(queryset):
+            return [row async for row in queryset]
+        return cls._build(*await asyncio.gather(*map(fetch, cls._queries())))
+
+    @cached_property
+    def version(self):
+        """Short hash of the tiers and base prices, used to detect stale client payloads."""
+        state = (self.breakpoints, self.discounts, sorted(self.base_prices.items()))
+        return hashlib.sha1(repr(state).encode()).hexdigest()[:12]
+
+    def payload(self, product_ids):
+        """Compact JSON-ready pricing data for the estimate modal."""
+        return {
+            'v': self.version,
+            't': [[min_quantity, to_basis_points(discount)] for min_quantity, discount in zip(self.breakpoints, self.discounts)],
+            'p': {
+                str(product_id): to_cents(self.base_prices[product_id])
+                for product_id in product_ids if product_id in self.base_prices
+            },
+        }
+
+    def products_in_category(self, slug):
+        """Active product ids in a category, in catalog display order."""
+        return self.categories.get(slug, [])
+
+    def discount_for(self, qty):
+        """Return the discount percentage of the largest tier whose minimum is <= qty."""
+        index = bisect_right(self.breakpoints, qty) - 1
+        if index < 0:
+            return Decimal('0.00')
+        return self.discounts[index]
+
+    def quote(self, product_id, qty):
+        """Price qty units of a product, or return None if the product is unknown."""
+        base_price = self.base_prices.get(product_id)
+        if base_price is None:
+            return None
+        discount_percentage = self.discount_for(qty)
+        multiplier = (HUNDRED - discount_percentage) / HUNDRED
+        unit_price = base_price * multiplier
+        return Quote(product_id, qty, base_price, discount_percentage, unit_price, unit_price * qty)
+
+
+TABLE_NAMESPACES = (SERVICES, PRODUCTS, PRICING)
+
+_table = None  # (generations, PricingTable)
+_lock = threading.Lock()
+
+
+def get_pricing_table():
+    """Return the process-wide pricing table, reloading it when its generations change."""
+    global _table
+    generations = tuple(get_generations(*TABLE_NAMESPACES).values())
+    entry = _table
+    if entry is None or entry[0] != generations:
+        with _lock:
+            entry = _table
+            if entry is None or entry[0] != generations:
+                entry = _table = (generations, PricingTable.load())
+    return entry[1]
+
+
+async def aget_pricing_table():
+    """get_pricing_table() for async views; a reload reads through the async ORM."""
+    global _table
+    generations = tuple((await sync_to_async(get_generations)(*TABLE_NAMESPACES)).values())
+    entry = _table
+    if entry is None or entry[0] != generations:
+        # The lock cannot be held across an await. Concurrent reloads build
+        # equal tables for the same generations, so whichever lands is fine.
+        entry = _table = (generations, await PricingTable.aload())
+    return entry[1]
+
+
+def invalidate_pricing_table():
+    """Drop this process's table so the next lookup reloads it."""
+    global _table
+    with _lock:
+        _table = None
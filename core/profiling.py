@@ -0,0 +1,174 @@
+"""
+SQL query profiler.
+
+QueryProfilerMiddleware wraps every database connection for the duration of
+a request with a QueryProfile, which fingerprints each statement (literals
+and IN lists normalised away) and times it. At the end of the request it
+reports, on the core.profiling logger as one JSON line per request:
+
+* duplicates: the same statement with the same parameters run more than once;
+* n_plus_one: the same fingerprint run QUERY_PROFILER_N_PLUS_ONE times or
+  more with different parameters, the usual sign of a per-row lookup;
+* slow: statements slower than QUERY_PROFILER_SLOW_MS, with EXPLAIN output.
+
+Records carry the URL name (core:index, admin:core_customerinquiry_changelist,
+...), so the query_report command can group them by view. The profiler is
+off unless QUERY_PROFILER_ENABLED is set.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .performance import wrap_connections
+
+
+logger = logging.getLogger('core.profiling')
+
+# EXPLAIN prefix per database vendor.
+EXPLAIN_PREFIXES = {
+    'mysql': 'EXPLAIN ',
+    'postgresql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Replace literals and placeholders with ? and collapse IN lists and whitespace."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+class QueryProfile:
+    """Execute wrapper recording every statement run while it is installed."""
+
+    def __init__(self, slow_ms=100, n_plus_one=3):
+        self.slow_ms = slow_ms
+        self.n_plus_one = n_plus_one
+        self.queries = []
+        self.slow = []
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = (time.perf_counter() - start) * 1000
+        self.queries.append((fingerprint(sql), sql, params, duration))
+        if duration >= self.slow_ms and not many:
+            self.slow.append({
+                'sql': normalize_sql(sql),
+                'ms': round(duration, 2),
+                'explain': self.explain(context['connection'], sql, params),
+            })
+        return result
+
+    def explain(self, connection, sql, params):
+        prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+        if prefix is None or not sql.lstrip().upper().startswith('SELECT'):
+            return None
+        self._explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                return [[str(value) for value in row] for row in cursor.fetchall()]
+        except Exception as exc:
+            return [f'EXPLAIN failed: {exc}']
+        finally:
+            self._explaining = False
+
+    def findings(self):
+        """Duplicate and N+1 statements as lists of {fingerprint, sql, count}."""
+        exact = Counter((sql, repr(params)) for _, sql, params, _ in self.queries)
+        by_fingerprint = defaultdict(list)
+        for key, sql, params, _ in self.queries:
+            by_fingerprint[key].append((sql, repr(params)))
+
+        duplicates = [
+            {'fingerprint': fingerprint(sql), 'sql': normalize_sql(sql), 'count': count}
+            for (sql, _), count in exact.items() if count > 1
+        ]
+        # Repeats with the same parameters are duplicates, not N+1.
+        n_plus_one = [
+            {'fingerprint': key, 'sql': normalize_sql(statements[0][0]), 'count': len(statements)}
+            for key, statements in by_fingerprint.items()
+            if len({params for _, params in statements}) >= self.n_plus_one
+        ]
+        return duplicates, n_plus_one
+
+    def report(self, view):
+        duplicates, n_plus_one = self.findings()
+        return {
+            'ts': round(time.time(), 3),
+            'view': view,
+            'queries': len(self.queries),
+            'db_ms': round(sum(query[3] for query in self.queries), 2),
+            'duplicates': duplicates,
+            'n_plus_one': n_plus_one,
+            'slow': self.slow,
+        }
+
+
+class QueryProfilerMiddleware:
+    """Profile each request's SQL with a QueryProfile and log the report."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = self.new_profile()
+        with wrap_connections(profile):
+            response = self.get_response(request)
+        self.report(request, profile)
+        return response
+
+    async def __acall__(self, request):
+        # The ORM runs in a worker thread, on that thread's connections.
+        profile = self.new_profile()
+        stack = await sync_to_async(wrap_connections)(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.report(request, profile)
+        return response
+
+    def new_profile(self):
+        return QueryProfile(
+            slow_ms=getattr(settings, 'QUERY_PROFILER_SLOW_MS', 100),
+            n_plus_one=getattr(settings, 'QUERY_PROFILER_N_PLUS_ONE', 3),
+        )
+
+    def report(self, request, profile):
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else request.path
+        logger.info(json.dumps(profile.report(view)))
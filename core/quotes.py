@@ -0,0 +1,172 @@
+"""
+Quote engine: estimated prices from a quote's line items.
+
+Each line item (product and quantity) is priced from the pricing table with
+the same tier discounts and integer arithmetic as the estimate calculator
+(core.pricing and pricing.js), so a stored quote matches, to the cent, the
+estimate the customer saw. A quote's estimated_price is the sum of its
+lines. Quotes priced this way are marked auto_priced; staff setting the
+price by hand clears the mark, and the quote is left alone from then on.
+
+recompute_quotes() re-prices open quotes after prices or tiers change
+without saving them one by one: one UPDATE per distinct (product,
+quantity) pair on their line items, sent as one executemany, then one
+UPDATE summing the lines into every quote (NULL where a line is unpriced
+or the sum is too large to store, as in estimate()). Bulk updates bypass signals, so it applies
+the change in quote totals to the affected rollup keys itself.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, Exists, OuterRef, Subquery, Sum, When
+from django.db.models.lookups import LessThanOrEqual
+from django.utils import timezone
+
+from . import rollups
+from .models import QuoteLineItem, QuoteRequest
+from .pricing import get_pricing_table, price_cents, to_basis_points, to_cents
+
+
+# Inquiry statuses whose quotes follow price changes; once a quote has been
+# sent (or the inquiry closed) its price stays as it was.
+OPEN_STATUSES = ('new', 'contacted')
+
+# Largest estimated_price (and line total) the columns hold.
+MAX_ESTIMATE = Decimal('99999999.99')
+
+LinePrice = namedtuple('LinePrice', 'product_id quantity unit_price total')
+
+
+def _from_cents(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def price_line(table, product_id, quantity):
+    """
+    Price quantity units of a product from a PricingTable, or None if the
+    product is unknown. The total is None if it is too large to store.
+    """
+    base_price = table.base_prices.get(product_id)
+    if base_price is None:
+        return None
+    base_cents, discount = to_cents(base_price), to_basis_points(table.discount_for(quantity))
+    total = _from_cents(price_cents(base_cents, discount, quantity))
+    return LinePrice(
+        product_id, quantity,
+        _from_cents(price_cents(base_cents, discount, 1)), total if total <= MAX_ESTIMATE else None,
+    )
+
+
+def estimate(lines):
+    """Sum of priced lines, or None if any is unpriced or the sum is too large to store."""
+    if not lines or any(line.total is None for line in lines):
+        return None
+    total = sum(line.total for line in lines)
+    return total if total <= MAX_ESTIMATE else None
+
+
+def _priced_lines(items):
+    table = get_pricing_table()
+    lines = []
+    for product, quantity in items:
+        price = price_line(table, product.pk, quantity)
+        lines.append(QuoteLineItem(
+            product=product, quantity=quantity,
+            unit_price=price.unit_price if price else None, total=price.total if price else None,
+        ))
+    return lines
+
+
+def create_quote(inquiry, items=(), **fields):
+    """
+    Create the quote request for a new inquiry, with a line item per
+    (ProductExample, quantity) in items and the estimated price they add
+    up to. Call it inside the inquiry's transaction.
+    """
+    lines = _priced_lines(items)
+    price = estimate(lines)
+    quote = QuoteRequest.objects.create(
+        inquiry=inquiry, estimated_price=price, auto_priced=price is not None, **fields,
+    )
+    for line in lines:
+        line.quote = quote
+    QuoteLineItem.objects.bulk_create(lines)
+    return quote
+
+
+def reprice(quote):
+    """Re-price one auto-priced quote's line items and save its estimated price (with signals)."""
+    lines = list(quote.line_items.all())
+    table = get_pricing_table()
+    for line in lines:
+        price = price_line(table, line.product_id, line.quantity) if line.product_id else None
+        if price is not None:
+            line.unit_price, line.total = price.unit_price, price.total
+    QuoteLineItem.objects.bulk_update(lines, ['unit_price', 'total'])
+    quote.estimated_price = estimate(lines)
+    quote.auto_priced = quote.estimated_price is not None
+    quote.save(update_fields=['estimated_price', 'auto_priced', 'updated_at'])
+    return quote
+
+
+def open_quotes(quotes=None):
+    """The auto-priced quotes of open inquiries, among quotes (default: all)."""
+    quotes = QuoteRequest.objects.all() if quotes is None else quotes
+    return quotes.filter(auto_priced=True, inquiry__status__in=OPEN_STATUSES)
+
+
+def _update_lines(quotes, prices):
+    """Set unit_price and total of the lines of quotes for each LinePrice's product and quantity."""
+    opts = QuoteLineItem._meta
+    unit_price, total = opts.get_field('unit_price'), opts.get_field('total')
+    quote = connection.ops.quote_name
+    subquery, params = quotes.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {quote(opts.db_table)} SET {quote(unit_price.column)} = %s, {quote(total.column)} = %s '
+            f'WHERE {quote("product_id")} = %s AND {quote("quantity")} = %s AND {quote("quote_id")} IN ({subquery})',
+            [
+                [
+                    unit_price.get_db_prep_save(price.unit_price, connection),
+                    total.get_db_prep_save(price.total, connection),
+                    price.product_id, price.quantity, *params,
+                ]
+                for price in prices
+            ],
+        )
+
+
+def recompute_quotes(quotes=None):
+    """
+    Re-price the open, auto-priced quotes among quotes (default: all) from
+    the current pricing table. Lines of deleted products keep their last
+    price; quotes with a line or a sum over MAX_ESTIMATE are left
+    unpriced. Returns the number of quotes updated.
+    """
+    quotes = open_quotes(quotes)
+    table = get_pricing_table()
+    pairs = (
+        QuoteLineItem.objects.filter(quote__in=quotes.values('pk'), product__isnull=False)
+        .values_list('product_id', 'quantity').distinct().order_by()
+    )
+    prices = [price for price in (price_line(table, *pair) for pair in pairs) if price is not None]
+    total = Subquery(
+        QuoteLineItem.objects.filter(quote=OuterRef('pk')).order_by()
+        .values('quote').annotate(sum=Sum('total')).values('sum')
+    )
+    unpriced = Exists(QuoteLineItem.objects.filter(quote=OuterRef('pk'), total__isnull=True))
+    with transaction.atomic():
+        before = rollups.quote_totals(quotes)
+        if not before:
+            return 0
+        if prices:
+            _update_lines(quotes, prices)
+        updated = quotes.update(
+            estimated_price=Case(
+                When(unpriced, then=None), When(LessThanOrEqual(total, MAX_ESTIMATE), then=total), default=None,
+            ),
+            updated_at=timezone.now(),
+        )
+        rollups.quotes_repriced(before, rollups.quote_totals(quotes))
+    return updated
@@ -0,0 +1,159 @@
+"""
+Token-bucket rate limiting keyed by client IP and endpoint.
+
+Buckets use GCRA, the token bucket expressed as a single number: each key
+stores a "theoretical arrival time" (TAT, in milliseconds). A request moves
+the TAT one token interval forward, and it is allowed while the TAT stays
+within a burst's worth of intervals of now. A bucket left alone refills as
+the clock passes its TAT.
+
+The TAT lives in the cache named by RATE_LIMIT_CACHE, an alias of its own
+(CACHES['ratelimit']) so buckets and catalog data do not cull each other,
+and moves by cache.incr, which is atomic on memcached, Redis and the
+local-memory backend; the file backend is shared between workers but may
+lose the odd increment under contention, which only lets an extra request
+through. If the cache fails, buckets fall back to this process's memory.
+
+Limits come from the RATE_LIMITS setting, {scope: 'count/period'}, where a
+period is s, m, h or d with an optional multiple ('5/10m'): count is the
+burst size and the bucket refills count tokens per period. The rate_limit
+decorator answers over-limit requests with 429 and Retry-After before the
+view runs, so they cost no database work.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from functools import lru_cache, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+
+logger = logging.getLogger('core.ratelimit')
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Local buckets are pruned of refilled entries once there are this many.
+LOCAL_PRUNE_SIZE = 10000
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'30/m' or '5/10m' -> (burst, milliseconds per token)."""
+    try:
+        count, period = rate.split('/')
+        count = int(count)
+        seconds = int(period[:-1] or 1) * PERIODS[period[-1]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f'Invalid rate {rate!r}; expected e.g. "30/m" or "5/10m"') from None
+    return count, max(1, round(seconds * 1000 / count))
+
+
+class TokenBucket:
+    """
+    GCRA token buckets in a Django cache (a backend instance, default the
+    RATE_LIMIT_CACHE alias), with an in-process fallback.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._local = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, burst, interval):
+        """
+        Take a token from key's bucket (burst tokens, one per interval ms).
+        Returns 0 if allowed, otherwise the seconds until a token is free.
+        """
+        now = int(time.time() * 1000)
+        try:
+            excess = self._hit_cache(key, burst, interval, now)
+        except Exception:
+            logger.warning('Rate limit cache unavailable; using process-local buckets', exc_info=True)
+            excess = self._hit_local(key, burst, interval, now)
+        return excess / 1000 if excess > 0 else 0
+
+    def _hit_cache(self, key, burst, interval, now):
+        cache = self.cache or caches[getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+        timeout = math.ceil(burst * interval / 1000) + 1
+        cache.add(key, now, timeout)
+        tat = cache.incr(key, interval)
+        if tat - interval < now:
+            # The bucket was full: start from now instead of a TAT in the past.
+            # Racing requests may both reset it, which only spares a token.
+            tat = now + interval
+            cache.set(key, tat, timeout)
+        excess = tat - now - burst * interval
+        if excess > 0:
+            # Refused requests take no token.
+            cache.decr(key, interval)
+        else:
+            cache.touch(key, timeout)
+        return excess
+
+    def _hit_local(self, key, burst, interval, now):
+        with self._lock:
+            if len(self._local) >= LOCAL_PRUNE_SIZE:
+                self._local = {k: tat for k, tat in self._local.items() if tat > now}
+            tat = max(self._local.get(key, now), now) + interval
+            excess = tat - now - burst * interval
+            if excess <= 0:
+                self._local[key] = tat
+            return excess
+
+
+limiter = TokenBucket()
+
+
+def client_ip(request):
+    """
+    The client address: REMOTE_ADDR, or the RATE_LIMIT_IP_HEADER META key
+    (e.g. HTTP_X_REAL_IP) when a trusted proxy sets the real one.
+    """
+    header = getattr(settings, 'RATE_LIMIT_IP_HEADER', None)
+    address = request.META.get(header) if header else None
+    return (address or request.META.get('REMOTE_ADDR') or 'unknown').split(',')[0].strip()
+
+
+def too_many_requests(request, retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    message = f'Too many requests. Please try again in {seconds} seconds.'
+    # Browsers posting the contact form get text; scripts and fetch() get JSON.
+    if 'text/html' in request.headers.get('Accept', ''):
+        response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+    else:
+        response = JsonResponse({'error': message, 'retry_after': seconds}, status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def rate_limit(scope, methods=None):
+    """
+    Limit a view to RATE_LIMITS[scope] per client IP, for the given HTTP
+    methods (default: all). Scopes without a configured rate, or
+    RATE_LIMIT_ENABLED = False, turn the limit off. Works on sync and
+    async views; for async ones the cache round trips run in a thread.
+    """
+    def check(request):
+        rate = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+        if rate and getattr(settings, 'RATE_LIMIT_ENABLED', True) and (methods is None or request.method in methods):
+            retry_after = limiter.hit(f'ratelimit:{scope}:{client_ip(request)}', *parse_rate(rate))
+            if retry_after:
+                return too_many_requests(request, retry_after)
+        return None
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                return await sync_to_async(check)(request) or await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapped(request, *args, **kwargs):
+                return check(request) or view(request, *args, **kwargs)
+        return wrapped
+    return decorator
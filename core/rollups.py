@@ -0,0 +1,239 @@
+"""
+Pre-aggregated inquiry analytics.
+
+InquiryRollup holds, per (submission day, service, current status), the
+number of inquiries, the number of their quotes with an estimated price and
+the sum of those prices. Model signals (see core.signals) keep it current
+by applying the difference each save or delete makes, in the same
+transaction as the change. The admin analytics dashboard reads only
+rollups.
+
+Concurrent first writes to a key can each insert a row, and keys emptied
+by status changes keep zero rows; readers always sum, so both are harmless,
+and compact() folds them away. Writes that bypass signals (bulk updates,
+imports) must call rebuild() for the days they touched, or for bulk status
+changes, statuses_changing() before the update, and for bulk price changes,
+quotes_repriced() with quote_totals() from before and after.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CustomerInquiry, InquiryRollup, QuoteRequest
+
+
+STATUSES = [status for status, _ in CustomerInquiry.STATUS_CHOICES]
+
+
+def inquiry_key(submitted_on, service_id, status):
+    return submitted_on.date(), service_id, status
+
+
+def record(key, inquiries=0, quotes=0, quote_value=Decimal('0')):
+    """Add the given amounts to the rollup for key (day, service id, status)."""
+    if not (inquiries or quotes or quote_value):
+        return
+    day, service_id, status = key
+    updated = InquiryRollup.objects.filter(day=day, service_id=service_id, status=status).update(
+        inquiries=F('inquiries') + inquiries,
+        quotes=F('quotes') + quotes,
+        quote_value=F('quote_value') + quote_value,
+    )
+    if not updated:
+        InquiryRollup.objects.create(
+            day=day, service_id=service_id, status=status,
+            inquiries=inquiries, quotes=quotes, quote_value=quote_value,
+        )
+
+
+def current_inquiry_key(inquiry_id):
+    """The rollup key of an inquiry as stored, or None if it does not exist."""
+    row = CustomerInquiry.objects.filter(pk=inquiry_id).values_list('submitted_on', 'service_needed_id', 'status').first()
+    return inquiry_key(*row) if row else None
+
+
+def inquiry_saved(old_key, inquiry):
+    """Move an inquiry (and its priced quote) from old_key, None if new, to its current key."""
+    new_key = inquiry_key(inquiry.submitted_on, inquiry.service_needed_id, inquiry.status)
+    if old_key == new_key:
+        return
+    quotes, value = 0, Decimal('0')
+    if old_key is not None:
+        price = QuoteRequest.objects.filter(
+            inquiry=inquiry, estimated_price__isnull=False,
+        ).values_list('estimated_price', flat=True).first()
+        if price is not None:
+            quotes, value = 1, price
+        record(old_key, -1, -quotes, -value)
+    record(new_key, 1, quotes, value)
+
+
+def quote_priced(key, old_price, new_price):
+    """Apply a quote's estimated price changing from old_price to new_price (either may be None)."""
+    if key is None or old_price == new_price:
+        return
+    record(
+        key,
+        quotes=(new_price is not None) - (old_price is not None),
+        quote_value=(new_price or Decimal('0')) - (old_price or Decimal('0')),
+    )
+
+
+def statuses_changing(inquiries, status):
+    """
+    Move inquiries (a queryset, read before a bulk update sets their status)
+    and their priced quotes to the rollups of status, with one query and a
+    write per affected key rather than per inquiry.
+    """
+    totals = (
+        inquiries.exclude(status=status).annotate(day=TruncDate('submitted_on'))
+        .values('day', 'service_needed_id', 'status')
+        .annotate(count=Count('id'), quotes=Count('quote__estimated_price'), value=Sum('quote__estimated_price'))
+        .order_by()
+    )
+    moved = {}
+    for row in totals:
+        value = row['value'] or Decimal('0')
+        record((row['day'], row['service_needed_id'], row['status']), -row['count'], -row['quotes'], -value)
+        count, quotes, total = moved.get((row['day'], row['service_needed_id']), (0, 0, Decimal('0')))
+        moved[row['day'], row['service_needed_id']] = (count + row['count'], quotes + row['quotes'], total + value)
+    for (day, service_id), amounts in moved.items():
+        record((day, service_id, status), *amounts)
+
+
+def quote_totals(quotes):
+    """{rollup key: (priced quotes, their value)} of quotes (a queryset), keyed by their inquiries."""
+    rows = (
+        quotes.annotate(day=TruncDate('inquiry__submitted_on'))
+        .values('day', 'inquiry__service_needed_id', 'inquiry__status')
+        .annotate(count=Count('estimated_price'), value=Sum('estimated_price'))
+        .order_by()
+    )
+    return {
+        (row['day'], row['inquiry__service_needed_id'], row['inquiry__status']): (row['count'], row['value'] or Decimal('0'))
+        for row in rows
+    }
+
+
+def quotes_repriced(before, after):
+    """Apply the difference between quote_totals() of the same quotes before and after a bulk price update."""
+    for key in before.keys() | after.keys():
+        old_count, old_value = before.get(key, (0, Decimal('0')))
+        new_count, new_value = after.get(key, (0, Decimal('0')))
+        record(key, quotes=new_count - old_count, quote_value=new_value - old_value)
+
+
+def rebuild(since=None):
+    """
+    Recompute rollups from inquiries submitted on or after since (a date),
+    or all of them, in one set-based pass. Returns the number of rows written.
+    """
+    inquiries = CustomerInquiry.objects.all()
+    rollups = InquiryRollup.objects.all()
+    if since is not None:
+        inquiries = inquiries.filter(submitted_on__gte=since)
+        rollups = rollups.filter(day__gte=since)
+    totals = (
+        inquiries.annotate(day=TruncDate('submitted_on'))
+        .values('day', 'service_needed_id', 'status')
+        .annotate(count=Count('id'), quotes=Count('quote__estimated_price'), value=Sum('quote__estimated_price'))
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        rows = InquiryRollup.objects.bulk_create(
+            (
+                InquiryRollup(
+                    day=row['day'], service_id=row['service_needed_id'], status=row['status'],
+                    inquiries=row['count'], quotes=row['quotes'], quote_value=row['value'] or Decimal('0'),
+                )
+                for row in totals.iterator()
+            ),
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def compact(days_per_batch=31):
+    """
+    Merge rollup rows sharing a key and drop empty ones, a batch of days per
+    transaction. Returns (rows before, rows after) for the days touched.
+    """
+    duplicated = (
+        InquiryRollup.objects.values('day', 'service_id', 'status')
+        .annotate(rows=Count('id')).filter(rows__gt=1).values_list('day', flat=True)
+    )
+    empty = InquiryRollup.objects.filter(inquiries=0, quotes=0, quote_value=0).values_list('day', flat=True)
+    days = sorted(set(duplicated) | set(empty))
+
+    before = after = 0
+    for start in range(0, len(days), days_per_batch):
+        with transaction.atomic():
+            rows = list(InquiryRollup.objects.select_for_update().filter(day__in=days[start:start + days_per_batch]))
+            merged = {}
+            for row in rows:
+                key = (row.day, row.service_id, row.status)
+                total = merged.setdefault(key, InquiryRollup(day=row.day, service_id=row.service_id, status=row.status))
+                total.inquiries += row.inquiries
+                total.quotes += row.quotes
+                total.quote_value += row.quote_value
+            kept = [row for row in merged.values() if row.inquiries or row.quotes or row.quote_value]
+            # By id, so rows added since the read above are left alone.
+            InquiryRollup.objects.filter(pk__in=[row.pk for row in rows]).delete()
+            InquiryRollup.objects.bulk_create(kept)
+        before += len(rows)
+        after += len(kept)
+    return before, after
+
+
+def dashboard(days=30, today=None):
+    """
+    Analytics for the last days days (including today), from rollups only:
+    totals, the status funnel, inquiries per day and per-service figures.
+    """
+    today = today or timezone.now().date()
+    start = today - timedelta(days=days - 1)
+    rollups = InquiryRollup.objects.filter(day__gte=start, day__lte=today)
+    sums = {'inquiries': Sum('inquiries'), 'quotes': Sum('quotes'), 'quote_value': Sum('quote_value')}
+
+    def empty():
+        return {'inquiries': 0, 'quotes': 0, 'quote_value': Decimal('0')}
+
+    by_status = {status: empty() for status in STATUSES}
+    services = {}
+    for row in rollups.values('service__name', 'status').annotate(**sums).order_by():
+        service = services.setdefault(row['service__name'] or 'Unspecified', dict(empty(), closed=0))
+        for name in sums:
+            by_status[row['status']][name] += row[name] or 0
+            service[name] += row[name] or 0
+        if row['status'] == 'closed':
+            service['closed'] += row['inquiries'] or 0
+
+    per_day = dict(rollups.values_list('day').annotate(Sum('inquiries')).order_by())
+    total = sum(status['inquiries'] for status in by_status.values())
+    # Funnel stages are cumulative: a closed inquiry was also contacted and quoted.
+    funnel, reached = [], 0
+    for status, label in reversed(CustomerInquiry.STATUS_CHOICES):
+        reached += by_status[status]['inquiries']
+        funnel.append((label, reached, round(100 * reached / total) if total else 0))
+    funnel.reverse()
+
+    return {
+        'start': start,
+        'end': today,
+        'total': total,
+        'quotes': sum(status['quotes'] for status in by_status.values()),
+        'quote_value': sum(status['quote_value'] for status in by_status.values()),
+        'closed': by_status['closed']['inquiries'],
+        'funnel': funnel,
+        'by_status': by_status,
+        'per_day': [
+            (start + timedelta(days=offset), per_day.get(start + timedelta(days=offset)) or 0)
+            for offset in range(days)
+        ],
+        'services': sorted(services.items(), key=lambda item: -item[1]['inquiries']),
+    }
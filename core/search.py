@@ -0,0 +1,148 @@
+"""
+Catalog and inquiry search over an inverted index.
+
+Each indexed object's text fields are split into lowercase terms and stored
+as SearchTerm rows with a weight (field weight x occurrences). A query
+matches objects that have every query term, each as a prefix ("mug" finds
+"mugs"), ranked by summed weight with exact terms counting double. Lookups
+are index range scans, so the same code runs on SQLite and MySQL.
+
+Saves and deletes keep the index current (see core.signals); bulk writes
+bypass signals and must call index_objects() or rebuild().
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, When
+
+from .models import CustomerInquiry, ProductExample, SearchTerm
+
+
+TERM_MAX_LENGTH = 40
+STOP_WORDS = frozenset('a an and are as at be by for from in is it of on or the to with'.split())
+
+# kind -> (model, {field: weight})
+INDEXED = {
+    'product': (ProductExample, {'title': 3, 'description': 1}),
+    'inquiry': (CustomerInquiry, {'name': 3, 'email': 3, 'phone': 3, 'company': 2, 'message': 1}),
+}
+KIND_FOR_MODEL = {model: kind for kind, (model, _) in INDEXED.items()}
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercase word terms of text, without stop words and single characters."""
+    return [
+        word[:TERM_MAX_LENGTH] for word in _WORD.findall((text or '').lower())
+        if len(word) > 1 and word not in STOP_WORDS
+    ]
+
+
+def document_terms(values, weights):
+    """{term: weight} for an object's field values ({field: text})."""
+    terms = {}
+    for field, weight in weights.items():
+        for term in tokenize(values.get(field)):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+def _rows(kind, pk, values, weights):
+    return [(kind, pk, term, weight) for term, weight in document_terms(values, weights).items()]
+
+
+def _insert(rows):
+    # executemany rather than bulk_create: building and compiling a model
+    # instance per term dominated the cost of indexing large imports.
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in ('kind', 'object_id', 'term', 'weight'))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {quote(SearchTerm._meta.db_table)} ({columns}) VALUES (%s, %s, %s, %s)', rows,
+        )
+
+
+def index_objects(kind, objects):
+    """Replace the index entries of objects (instances of the kind's model)."""
+    weights = INDEXED[kind][1]
+    objects = list(objects)
+    rows = [
+        row for obj in objects
+        for row in _rows(kind, obj.pk, {field: getattr(obj, field) for field in weights}, weights)
+    ]
+    with transaction.atomic():
+        SearchTerm.objects.filter(kind=kind, object_id__in=[obj.pk for obj in objects]).delete()
+        _insert(rows)
+
+
+def remove_object(kind, pk):
+    SearchTerm.objects.filter(kind=kind, object_id=pk).delete()
+
+
+def rebuild(kind, batch_size=1000):
+    """Rebuild a kind's index from scratch. Returns the number of objects indexed."""
+    model, weights = INDEXED[kind]
+    count = 0
+    last_pk = 0
+    # One transaction, so searches never see a half-built index.
+    with transaction.atomic():
+        SearchTerm.objects.filter(kind=kind).delete()
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').values('pk', *weights)[:batch_size]
+            )
+            if not batch:
+                return count
+            _insert([row for values in batch for row in _rows(kind, values['pk'], values, weights)])
+            count += len(batch)
+            last_pk = batch[-1]['pk']
+
+
+def _prefix(term):
+    # A range instead of LIKE 'term%' so every backend uses the term index.
+    return Q(term__gte=term, term__lt=term + '\uffff')
+
+
+def search(kind, query):
+    """
+    Object ids of kind matching every term of query (as prefixes), best
+    first, as a values queryset usable as a subquery. None if the query
+    has no searchable terms.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return None
+
+    matched = {
+        f'm{index}': Max(Case(When(_prefix(term), then=1), default=0, output_field=IntegerField()))
+        for index, term in enumerate(terms)
+    }
+    exact = Sum(Case(When(term__in=terms, then='weight'), default=0, output_field=IntegerField()))
+    condition = Q()
+    for term in terms:
+        condition |= _prefix(term)
+    return (
+        SearchTerm.objects.filter(condition, kind=kind)
+        .values('object_id')
+        .annotate(score=Sum('weight') + exact, **matched)
+        .filter(**{name: 1 for name in matched})
+        .order_by('-score', 'object_id')
+        .values_list('object_id', flat=True)
+    )
+
+
+class IndexedSearchMixin:
+    """
+    ModelAdmin mixin answering the search box from the search index instead
+    of search_fields LIKE scans. search_fields still enables the box.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        ids = search(KIND_FOR_MODEL[self.model], search_term) if search_term else None
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        # Ranking is dropped here; the changelist keeps its own ordering.
+        return queryset.filter(pk__in=ids.order_by().values('object_id')), False
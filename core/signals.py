@@ -0,0 +1,122 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import SITE, SERVICES, PRODUCTS, PRICING, CAROUSEL, bump_generation
+from . import rollups
+from .images import get_derivatives
+from .search import KIND_FOR_MODEL, index_objects, remove_object
+from .models import (
+    ServiceCategory, ProductExample, CustomerInquiry, QuoteRequest, PricingTier, CarouselImage, SiteConfiguration,
+    SocialMediaLink,
+)
+
+
+# Cache namespace invalidated by saving or deleting each model.
+CACHE_NAMESPACES = {
+    ServiceCategory: SERVICES,
+    ProductExample: PRODUCTS,
+    PricingTier: PRICING,
+    CarouselImage: CAROUSEL,
+    SiteConfiguration: SITE,
+    SocialMediaLink: SITE,
+}
+
+
+@receiver([post_save, post_delete])
+def bump_cache_generation(sender, **kwargs):
+    """
+    Bump the model's cache namespace once the change is committed. This
+    invalidates cached fragments, the site context and the pricing table in
+    every worker.
+    """
+    namespace = CACHE_NAMESPACES.get(sender)
+    if namespace is not None:
+        transaction.on_commit(partial(bump_generation, namespace))
+
+
+# Image field of each model that gets responsive derivatives (see core.images).
+IMAGE_FIELDS = {
+    ProductExample: 'image',
+    CarouselImage: 'image',
+    SiteConfiguration: 'logo',
+}
+
+
+def build_derivatives(image, namespace):
+    """
+    Build derivatives for image, then invalidate namespace: fragments cached
+    before they existed hold a plain <img>.
+    """
+    if get_derivatives(image) is not None:
+        bump_generation(namespace)
+
+
+@receiver(post_save)
+def build_image_derivatives(sender, instance, **kwargs):
+    """Build derivatives for a newly saved image once the change is committed."""
+    field_name = IMAGE_FIELDS.get(sender)
+    if field_name is None or not getattr(settings, 'IMAGE_DERIVATIVES_ON_SAVE', True):
+        return
+    image = getattr(instance, field_name)
+    if image:
+        transaction.on_commit(partial(build_derivatives, image, CACHE_NAMESPACES[sender]))
+
+
+@receiver(post_save)
+def update_search_index(sender, instance, **kwargs):
+    """Re-index a saved product or inquiry in the same transaction."""
+    kind = KIND_FOR_MODEL.get(sender)
+    if kind is not None:
+        index_objects(kind, [instance])
+
+
+@receiver(post_delete)
+def remove_from_search_index(sender, instance, **kwargs):
+    kind = KIND_FOR_MODEL.get(sender)
+    if kind is not None:
+        remove_object(kind, instance.pk)
+
+
+# Inquiry rollups (see core.rollups) change in the same transaction as the
+# inquiry or quote. pre_save reads the stored row so post_save can apply
+# the difference.
+
+@receiver(pre_save, sender=CustomerInquiry)
+def remember_inquiry_key(sender, instance, **kwargs):
+    instance._rollup_key = rollups.current_inquiry_key(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=CustomerInquiry)
+def update_inquiry_rollup(sender, instance, **kwargs):
+    rollups.inquiry_saved(getattr(instance, '_rollup_key', None), instance)
+
+
+@receiver(post_delete, sender=CustomerInquiry)
+def remove_inquiry_from_rollup(sender, instance, **kwargs):
+    # Its quote was deleted first (cascade) and took the quote value with it.
+    rollups.record(rollups.inquiry_key(instance.submitted_on, instance.service_needed_id, instance.status), -1)
+
+
+@receiver(pre_save, sender=QuoteRequest)
+def remember_quote_price(sender, instance, **kwargs):
+    instance._rollup_price = (
+        QuoteRequest.objects.filter(pk=instance.pk).values_list('estimated_price', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=QuoteRequest)
+def update_quote_rollup(sender, instance, **kwargs):
+    old_price = getattr(instance, '_rollup_price', None)
+    if old_price != instance.estimated_price:
+        rollups.quote_priced(rollups.current_inquiry_key(instance.inquiry_id), old_price, instance.estimated_price)
+
+
+@receiver(post_delete, sender=QuoteRequest)
+def remove_quote_from_rollup(sender, instance, **kwargs):
+    if instance.estimated_price is not None:
+        rollups.quote_priced(rollups.current_inquiry_key(instance.inquiry_id), instance.estimated_price, None)
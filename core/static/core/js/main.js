@@ -26,65 +26,151 @@ document.querySelectorAll('a[href^="#"]').forEach(anchor => {
     });
 });
 
-// Pricing Calculator Modal
-const modal = document.getElementById('estimate-modal');
-const modalTitle = document.getElementById('modal-title');
-const estimateQty = document.getElementById('estimate-qty');
-const estimateTotal = document.getElementById('estimate-total');
-const minQtySpan = document.getElementById('min-qty');
-const closeModalBtn = document.getElementById('close-modal');
+// Deferred fragments (DEFERRED_LOADING): the home page leaves placeholders
+// with data-fragment="url" that are replaced by the fetched markup, when they
+// near the viewport (data-fragment-load="visible") or once the page is idle
+// ("idle"). loadFragment() also fetches one on demand; each is fetched once.
+const fragmentLoads = new Map();
+
+function loadFragment(placeholder) {
+    if (!fragmentLoads.has(placeholder)) {
+        fragmentLoads.set(placeholder, fetch(placeholder.dataset.fragment, { credentials: 'same-origin' })
+            .then(response => {
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                return response.text();
+            })
+            .then(html => {
+                const template = document.createElement('template');
+                template.innerHTML = html.trim();
+                const nodes = [...template.content.children];
+                placeholder.replaceWith(template.content);
+                nodes.forEach(node => document.dispatchEvent(new CustomEvent('fragment:loaded', { detail: node })));
+            }));
+    }
+    return fragmentLoads.get(placeholder);
+}
+
+document.querySelectorAll('[data-fragment]').forEach(placeholder => {
+    if (placeholder.dataset.fragmentLoad === 'idle') {
+        const whenIdle = window.requestIdleCallback || (callback => setTimeout(callback, 2000));
+        window.addEventListener('load', () => whenIdle(() => loadFragment(placeholder)));
+    } else if ('IntersectionObserver' in window && location.hash !== '#' + placeholder.id) {
+        const observer = new IntersectionObserver(entries => {
+            if (entries[0].isIntersecting) {
+                observer.disconnect();
+                loadFragment(placeholder);
+            }
+        }, { rootMargin: '600px' });
+        observer.observe(placeholder);
+    } else {
+        loadFragment(placeholder).then(() => {
+            if (location.hash) document.querySelector(location.hash)?.scrollIntoView();
+        });
+    }
+});
+
+// Pricing Calculator Modal. It is part of the page, or on the home page a
+// deferred fragment (#estimate-modal-fragment), set up when it arrives.
+let modal, modalTitle, estimateQty, estimateTotal, minQtySpan;
 
 let currentUnitPrice = 0;
 let currentMinQty = 1;
 let currentProductId = null;
+let currentProductTitle = '';
 let debounceTimer;
 
-// Open modal when clicking estimate buttons
-document.querySelectorAll('.estimate-btn').forEach(btn => {
-    btn.addEventListener('click', function () {
-        const title = this.dataset.title;
-        const unitPrice = parseFloat(this.dataset.unitPrice);
-        const minQty = parseInt(this.dataset.minQty) || 1;
-        const productId = this.dataset.productId;
-
-        currentUnitPrice = unitPrice;
-        currentMinQty = minQty;
-        currentProductId = productId;
-
-        modalTitle.textContent = `Estimate: ${title}`;
-        estimateQty.min = minQty;
-        estimateQty.value = Math.max(minQty, 1);
-        minQtySpan.textContent = minQty;
-
-        calculateEstimate();
-        modal.classList.remove('hidden');
-
-        // Re-initialize feather icons for the modal
-        if (typeof feather !== 'undefined') {
-            feather.replace();
-        }
-    });
-});
-
-// Close modal
-if (closeModalBtn) {
-    closeModalBtn.addEventListener('click', function () {
+// Pricing payload embedded by the estimate modal partial. Estimates are
+// computed locally from it; the API is only used once it is found stale.
+let pricingData = null;
+let pricingStale = false;
+
+function initEstimateModal() {
+    modal = document.getElementById('estimate-modal');
+    if (!modal) return;
+    modalTitle = document.getElementById('modal-title');
+    estimateQty = document.getElementById('estimate-qty');
+    estimateTotal = document.getElementById('estimate-total');
+    minQtySpan = document.getElementById('min-qty');
+    const pricingDataElement = document.getElementById('pricing-data');
+    pricingData = pricingDataElement ? JSON.parse(pricingDataElement.textContent) : null;
+
+    // Close modal
+    document.getElementById('close-modal').addEventListener('click', function () {
         modal.classList.add('hidden');
     });
-}
 
-// Close modal when clicking outside
-if (modal) {
+    // Close modal when clicking outside
     modal.addEventListener('click', function (e) {
         if (e.target === modal) {
             modal.classList.add('hidden');
         }
     });
-}
 
-// Calculate estimate on quantity change
-if (estimateQty) {
+    // Calculate estimate on quantity change
     estimateQty.addEventListener('input', calculateEstimate);
+
+    // Add the product to the inquiry's quote items on the way to the form
+    document.getElementById('modal-inquire').addEventListener('click', function () {
+        const qty = Math.max(parseInt(estimateQty.value) || currentMinQty, currentMinQty);
+        const items = quoteItems().filter(item => item.id !== currentProductId);
+        items.push({ id: currentProductId, qty: qty, title: currentProductTitle });
+        saveQuoteItems(items);
+        modal.classList.add('hidden');
+    });
+}
+
+function estimateModalReady() {
+    const placeholder = document.getElementById('estimate-modal-fragment');
+    return modal || !placeholder ? Promise.resolve() : loadFragment(placeholder);
+}
+
+initEstimateModal();
+document.addEventListener('fragment:loaded', event => {
+    if (event.detail.id === 'estimate-modal') initEstimateModal();
+});
+
+function localQuote(qty) {
+    if (!pricingData || pricingStale || typeof PrintHivePricing === 'undefined') return null;
+    return PrintHivePricing.quote(pricingData, currentProductId, qty);
+}
+
+// One request per modal open: if the server's pricing version differs from
+// the embedded one, switch to the API for the rest of the session.
+function verifyPricingVersion(qty) {
+    if (!pricingData || pricingStale || !currentProductId) return;
+    fetch(`/api/calculate-price/?product_id=${currentProductId}&qty=${qty}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.version && data.version !== pricingData.v) {
+                pricingStale = true;
+                calculateEstimate();
+            }
+        })
+        .catch(error => console.error('Network error:', error));
+}
+
+// Open modal when clicking estimate buttons
+document.querySelectorAll('.estimate-btn').forEach(btn => {
+    btn.addEventListener('click', function () {
+        estimateModalReady().then(() => openEstimate(this));
+    });
+});
+
+function openEstimate(btn) {
+    if (!modal) return;
+    currentUnitPrice = parseFloat(btn.dataset.unitPrice);
+    currentMinQty = parseInt(btn.dataset.minQty) || 1;
+    currentProductId = btn.dataset.productId;
+    currentProductTitle = btn.dataset.title;
+
+    modalTitle.textContent = `Estimate: ${btn.dataset.title}`;
+    estimateQty.min = currentMinQty;
+    estimateQty.value = Math.max(currentMinQty, 1);
+    minQtySpan.textContent = currentMinQty;
+
+    calculateEstimate();
+    verifyPricingVersion(parseInt(estimateQty.value));
+    modal.classList.remove('hidden');
 }
 
 function calculateEstimate() {
@@ -99,6 +185,12 @@ function calculateEstimate() {
     // Clear previous timer
     clearTimeout(debounceTimer);
 
+    const quote = localQuote(qty);
+    if (quote) {
+        updateTotalDisplay(quote.totalCents / 100);
+        return;
+    }
+
     // Show loading state
     estimateTotal.textContent = 'Calculating...';
     estimateTotal.classList.add('text-gray-500', 'text-xl');
@@ -143,9 +235,10 @@ function validateKenyanPhone(phone) {
     return pattern.test(cleaned);
 }
 
-// Form validation
-const contactForm = document.getElementById('contact-form');
-if (contactForm) {
+// Form validation, for the contact section in the page or once its deferred fragment arrives
+function initContactForm() {
+    const contactForm = document.getElementById('contact-form');
+    if (!contactForm) return;
     const phoneInput = document.getElementById('id_phone');
 
     if (phoneInput) {
@@ -162,6 +255,67 @@ if (contactForm) {
     }
 }
 
+initContactForm();
+document.addEventListener('fragment:loaded', event => {
+    if (event.detail.id === 'contact') initContactForm();
+});
+
+// Products picked in the estimate modal, kept across pages in sessionStorage
+// until the inquiry is sent. The form posts them as "id:qty,..." and the
+// server prices them into the quote.
+const QUOTE_ITEMS_KEY = 'printhive:quote-items';
+
+function quoteItems() {
+    try {
+        return JSON.parse(sessionStorage.getItem(QUOTE_ITEMS_KEY)) || [];
+    } catch (e) {
+        return [];
+    }
+}
+
+function saveQuoteItems(items) {
+    try {
+        sessionStorage.setItem(QUOTE_ITEMS_KEY, JSON.stringify(items));
+    } catch (e) {
+        // Storage unavailable (private mode): the form still goes without items.
+    }
+    renderQuoteItems();
+}
+
+function renderQuoteItems() {
+    const input = document.getElementById('id_line_items');
+    const box = document.getElementById('quote-items');
+    if (!input || !box) return;
+    const items = quoteItems();
+    // Keep a value the server sent back with form errors.
+    if (items.length) input.value = items.map(item => `${item.id}:${item.qty}`).join(',');
+    box.classList.toggle('hidden', !items.length);
+    box.querySelector('ul').replaceChildren(...items.map(item => {
+        const li = document.createElement('li');
+        li.textContent = `${item.qty} \u00d7 ${item.title}`;
+        return li;
+    }));
+}
+
+function initQuoteItems() {
+    if (document.querySelector('[data-quote-sent]')) {
+        sessionStorage.removeItem(QUOTE_ITEMS_KEY);
+        return;
+    }
+    const clear = document.getElementById('clear-quote-items');
+    if (!clear) return;
+    clear.addEventListener('click', function () {
+        document.getElementById('id_line_items').value = '';
+        saveQuoteItems([]);
+    });
+    renderQuoteItems();
+}
+
+initQuoteItems();
+document.addEventListener('fragment:loaded', event => {
+    if (event.detail.id === 'contact') initQuoteItems();
+});
+
 // WhatsApp link generator
 function generateWhatsAppLink(phone, message) {
     let cleaned = phone.replace(/[\s-]/g, '');
@@ -200,6 +354,23 @@ document.addEventListener('keydown', function (e) {
     let isPaused = false;
     const autoPlayDelay = 5000; // 5 seconds between slides
 
+    // Slides after the first are rendered with data-src/data-srcset (see
+    // responsive_image's defer), so they don't compete with the first for
+    // bandwidth; each is loaded one step before it is shown.
+    function loadSlide(index) {
+        const slide = slides[index % slides.length];
+        const picture = slide.parentElement.tagName === 'PICTURE' ? slide.parentElement : null;
+        (picture ? [...picture.querySelectorAll('source'), slide] : [slide]).forEach(element => {
+            ['srcset', 'src'].forEach(attribute => {
+                const value = element.getAttribute(`data-${attribute}`);
+                if (value) {
+                    element.setAttribute(attribute, value);
+                    element.removeAttribute(`data-${attribute}`);
+                }
+            });
+        });
+    }
+
     // Initialize first slide as active
     function initSlides() {
         slides.forEach((slide, index) => {
@@ -223,11 +394,13 @@ document.addEventListener('keydown', function (e) {
         slides[currentSlide].style.opacity = '0';
 
         // Show new slide
+        loadSlide(index);
         slides[index].classList.add('active');
         slides[index].style.opacity = '1';
 
         currentSlide = index;
         updateDots(index);
+        loadSlide(index + 1);
     }
 
     // Update dot indicators
@@ -358,14 +531,15 @@ document.addEventListener('keydown', function (e) {
     // Initialize
     initSlides();
     startAutoPlay();
+    // The second slide waits for the page's own images.
+    if (document.readyState === 'complete') {
+        loadSlide(1);
+    } else {
+        window.addEventListener('load', () => loadSlide(1));
+    }
 
     // Make carousel focusable for keyboard navigation
     carousel.setAttribute('tabindex', '0');
     carousel.setAttribute('role', 'region');
     carousel.setAttribute('aria-label', 'Product image carousel');
 })();
-
-// Initialize feather icons
-if (typeof feather !== 'undefined') {
-    feather.replace();
-}
@@ -0,0 +1,42 @@
+// Shared estimate pricing.
+// Mirrors core/pricing.py (price_cents and PricingTable.payload) so the
+// estimate modal can price locally; the parity tests in core/tests.py run
+// this file under Node to check both sides agree to the cent.
+(function (root, factory) {
+    const api = factory();
+    if (typeof module === 'object' && module.exports) {
+        module.exports = api;
+    } else {
+        root.PrintHivePricing = api;
+    }
+})(this, function () {
+    // Discount (in 1/100ths of a percent) of the largest tier whose minimum is <= qty.
+    // Tiers are [minQuantity, basisPoints] pairs sorted by minQuantity.
+    function discountBasisPoints(tiers, qty) {
+        let discount = 0;
+        for (const [minQuantity, basisPoints] of tiers) {
+            if (qty < minQuantity) break;
+            discount = basisPoints;
+        }
+        return discount;
+    }
+
+    // Total in cents, rounded half up. BigInt keeps large totals exact.
+    function priceCents(baseCents, discount, qty) {
+        const numerator = BigInt(baseCents) * BigInt(10000 - discount) * BigInt(qty);
+        return Number((numerator + 5000n) / 10000n);
+    }
+
+    // Price qty units of a product from a payload, or null if it is not in the payload.
+    function quote(payload, productId, qty) {
+        const baseCents = payload.p[String(productId)];
+        if (baseCents === undefined) return null;
+        const discount = discountBasisPoints(payload.t, qty);
+        return {
+            totalCents: priceCents(baseCents, discount, qty),
+            discountPercentage: discount / 100,
+        };
+    }
+
+    return { discountBasisPoints, priceCents, quote };
+});
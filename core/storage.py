@@ -0,0 +1,59 @@
+"""
+Static files storage for production.
+
+CompressedManifestStorage is Django's ManifestStaticFilesStorage (every
+file also saved under a content-hashed name, which {% static %} links to,
+so the web server can cache them for a year) that also writes precompressed
+copies of text assets next to the hashed files: name.gz always, name.br
+when the brotli package is installed. Servers that look for them (nginx
+gzip_static / brotli_static, Apache MultiViews) send those instead of
+compressing on every request.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.xml', '.html')
+# Smaller files gain nothing once compressed, and neither do copies that
+# save less than this fraction.
+MIN_COMPRESS_SIZE = 256
+MIN_SAVING = 0.05
+
+
+def compressed_variants(content):
+    """[(extension, compressed bytes)] worth keeping for content."""
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content, quality=11)))
+    return [
+        (extension, data) for extension, data in variants
+        if len(data) <= len(content) * (1 - MIN_SAVING)
+    ]
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            if not hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            with self.open(hashed_name) as handle:
+                content = handle.read()
+            if len(content) < MIN_COMPRESS_SIZE:
+                continue
+            for extension, data in compressed_variants(content):
+                compressed_name = hashed_name + extension
+                if self.exists(compressed_name):
+                    self.delete(compressed_name)
+                self._save(compressed_name, ContentFile(data))
+                yield hashed_name, compressed_name, True
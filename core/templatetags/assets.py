@@ -0,0 +1,22 @@
+from django import template
+from django.templatetags.static import static
+
+from core.assets import STYLES_CSS, TAILWIND_CSS, built_asset_url, critical_css
+
+register = template.Library()
+
+
+@register.inclusion_tag('core/partials/stylesheets.html')
+def stylesheets(critical=False):
+    """
+    The built Tailwind stylesheet (the Play CDN until build_assets has run)
+    and styles.css. With critical, once the critical CSS is built too, the
+    above-the-fold rules and styles.css are inlined and the stylesheet
+    loads without blocking rendering.
+    """
+    href = built_asset_url(TAILWIND_CSS)
+    return {
+        'href': href,
+        'styles_href': static(STYLES_CSS),
+        'critical_css': critical_css() if critical and href else '',
+    }
@@ -0,0 +1,13 @@
+from django import template
+from django.utils.html import json_script
+
+from core.pricing import get_pricing_table
+
+register = template.Library()
+
+
+@register.simple_tag
+def estimate_pricing_data(products):
+    """Embed the pricing payload for the given products as <script id="pricing-data">."""
+    payload = get_pricing_table().payload(product.id for product in products)
+    return json_script(payload, 'pricing-data')
@@ -0,0 +1,14 @@
+from django import template
+
+from core.icons import render_icon
+
+register = template.Library()
+
+
+@register.simple_tag
+def icon(name, **attrs):
+    """
+    Inline SVG for a Feather icon, e.g. {% icon service.icon_class class="w-8 h-8" %}.
+    Renders nothing for a name that is not a Feather icon.
+    """
+    return render_icon(name, **{key: str(value) for key, value in attrs.items()})
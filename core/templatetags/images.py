@@ -0,0 +1,53 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.images import get_derivatives
+
+register = template.Library()
+
+
+def _srcset(entries):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in entries)
+
+
+@register.simple_tag
+def responsive_image(source, alt='', sizes='100vw', css_class='', loading='lazy', fetchpriority='', defer=False):
+    """
+    Render an image as <picture> with AVIF/WebP sources, a srcset fallback
+    and intrinsic width/height. source is an ImageField file or a static
+    path. Derivatives are never built here, in the page request: uploads get
+    them once saved or imported, static images from build_image_derivatives. Until then the original is rendered as a plain
+    <img>.
+
+        {% responsive_image product.image alt=product.title sizes="(min-width: 768px) 33vw, 100vw" %}
+
+    With defer, src and srcset are rendered as data-src and data-srcset, so
+    the browser fetches nothing until a script swaps them back (the hero
+    carousel, for slides not yet shown: loading="lazy" does not hold back
+    images that are in the viewport, even invisible ones).
+    """
+    if not source:
+        return ''
+    manifest = get_derivatives(source, generate=False)
+    extra = format_html(' fetchpriority="{}"', fetchpriority) if fetchpriority else ''
+    src, srcset = ('data-src', 'data-srcset') if defer else ('src', 'srcset')
+    if manifest is None:
+        url = static(source) if isinstance(source, str) else source.url
+        return format_html(
+            '<img {}="{}" alt="{}" class="{}" loading="{}" decoding="async"{}>',
+            src, url, alt, css_class, loading, extra,
+        )
+
+    fallback = manifest['sources'][manifest['fallback']]
+    modern = [(mime, entries) for mime, entries in manifest['sources'].items() if mime != manifest['fallback']]
+    return format_html(
+        '<picture>{}<img {}="{}" {}="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" '
+        'loading="{}" decoding="async"{}></picture>',
+        format_html_join('', '<source type="{}" {}="{}" sizes="{}">', (
+            (mime, srcset, _srcset(entries), sizes) for mime, entries in modern
+        )),
+        src, default_storage.url(fallback[-1][1]), srcset, _srcset(fallback), sizes,
+        manifest['width'], manifest['height'], alt, css_class, loading, extra,
+    )
@@ -0,0 +1,115 @@
+"""
+Helpers for tests and benchmarks: synthetic catalog seeding and per-view
+query budgets.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .cache import clear_local_cache
+from .models import ServiceCategory, ProductExample, CustomerInquiry, QuoteRequest, PricingTier
+from .pricing import invalidate_pricing_table
+from .rollups import rebuild as rebuild_rollups
+
+
+ICONS = ['layers', 'coffee', 'truck', 'gift', 'award', 'edit-3']
+
+
+def _bulk_create(model, objs, batch_size):
+    objs = model.objects.bulk_create(objs, batch_size=batch_size)
+    if objs and objs[0].pk is None:
+        # MySQL cannot return ids from a bulk insert; the new rows hold the
+        # highest len(objs) ids, in insertion order.
+        pks = list(model.objects.order_by('-pk').values_list('pk', flat=True)[:len(objs)])
+        for obj, pk in zip(objs, reversed(pks)):
+            obj.pk = pk
+    return objs
+
+
+def seed_catalog(products, categories=6, inquiries=0, batch_size=1000):
+    """
+    Bulk-create a synthetic catalog: categories, products spread evenly
+    across them (half featured), three pricing tiers and optionally
+    inquiries with quotes (half priced), submitted over the past year, and
+    their rollups. Returns the categories.
+    """
+    category_objs = _bulk_create(ServiceCategory, [
+        ServiceCategory(
+            name=f'Category {index}', slug=f'category-{index}', description=f'Synthetic category {index}',
+            icon_class=ICONS[index % len(ICONS)], order=index,
+        )
+        for index in range(categories)
+    ], batch_size)
+    ProductExample.objects.bulk_create((
+        ProductExample(
+            category=category_objs[index % categories], title=f'Product {index}',
+            description=f'Synthetic product {index} for load and query-budget testing.',
+            starting_price=Decimal(100 + index % 900), unit_price=Decimal(50 + index % 450),
+            min_quantity=1 + index % 10, is_featured=index % 2 == 0,
+        )
+        for index in range(products)
+    ), batch_size=batch_size)
+    PricingTier.objects.bulk_create([
+        PricingTier(min_quantity=50, discount_percentage=Decimal('5.00')),
+        PricingTier(min_quantity=200, discount_percentage=Decimal('10.00')),
+        PricingTier(min_quantity=1000, discount_percentage=Decimal('15.00')),
+    ])
+    if inquiries:
+        inquiry_objs = _bulk_create(CustomerInquiry, [
+            CustomerInquiry(
+                name=f'Customer {index}', phone='0712345678', email=f'customer{index}@example.com',
+                service_needed=category_objs[index % categories], message=f'Synthetic inquiry {index}',
+                status=[choice for choice, _ in CustomerInquiry.STATUS_CHOICES][index % 4],
+            )
+            for index in range(inquiries)
+        ], batch_size)
+        QuoteRequest.objects.bulk_create(
+            (
+                QuoteRequest(inquiry=inquiry, estimated_price=Decimal(1000 + index % 9000) if index % 2 else None)
+                for index, inquiry in enumerate(inquiry_objs)
+            ),
+            batch_size=batch_size,
+        )
+        # submitted_on is auto_now_add, so spread it out after the insert:
+        # one UPDATE per day over the year before now.
+        days = min(inquiries, 365)
+        per_day = -(-inquiries // days)
+        now = timezone.now()
+        for day in range(days):
+            CustomerInquiry.objects.filter(
+                pk__in=[inquiry.pk for inquiry in inquiry_objs[day * per_day:(day + 1) * per_day]]
+            ).update(submitted_on=now - timedelta(days=day))
+        rebuild_rollups()
+    return category_objs
+
+
+def reset_caches():
+    """Forget every cached fragment, site value, pricing table and rate limit bucket."""
+    cache.clear()
+    caches[settings.RATE_LIMIT_CACHE].clear()
+    clear_local_cache()
+    invalidate_pricing_table()
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting that a request stays within a fixed number of
+    queries. Budgets are measured with cold caches, so they catch N+1
+    patterns that fragment caching would otherwise hide.
+    """
+
+    def assertQueryBudget(self, url, budget, data=None):
+        reset_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url} ran {len(queries)} queries (budget {budget}):\n' + '\n'.join(q['sql'] for q in queries),
+        )
+        return response
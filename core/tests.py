@@ -1,3 +1,1583 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import io
+import json
+import shutil
+import subprocess
+import tempfile
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import product as cartesian
+from datetime import timedelta
+from pathlib import Path
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth.models import Permission, User
+from django.core import mail
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import Http404
+from django.db.models import Sum
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import assets, async_views, bulk, views
+from .benchmark import benchmark_indexes, compare, default_endpoints, run_benchmarks
+from .cache import PRODUCTS, SERVICES, _local, clear_local_cache, get_generation
+from .catalog import Importer
+from .context_processors import site_context
+from .icons import clear_icon_cache, icon_registry, render_icon
+from .images import clear_manifest_cache, get_derivatives
+from .models import (
+    ServiceCategory, ProductExample, PricingTier, SiteConfiguration, SocialMediaLink, CustomerInquiry, OutboundEmail,
+    QuoteRequest, QuoteLineItem, SearchTerm, InquiryRollup, AdminJob,
+)
+from .notifications import retry_delay, send_due_emails
+from .pageweight import PageParser
+from .testing import QueryBudgetMixin, reset_caches, seed_catalog
+from .pagination import decode_cursor
+from .pricing import PricingTable, get_pricing_table, invalidate_pricing_table, price_cents, to_basis_points, to_cents
+from .profiling import QueryProfile, normalize_sql
+from .quotes import create_quote, recompute_quotes
+from .ratelimit import TokenBucket, client_ip, parse_rate
+from .rollups import compact, dashboard, rebuild as rebuild_rollups
+from .search import search, tokenize
+from .storage import CompressedManifestStorage
+
+
+class PricingTableTests(TestCase):
+    def setUp(self):
+        self.table = PricingTable(
+            [(200, Decimal('10.00')), (50, Decimal('5.00'))],
+            [(1, Decimal('100.00'))],
+        )
+
+    def test_discount_breakpoints(self):
+        self.assertEqual(self.table.discount_for(1), Decimal('0.00'))
+        self.assertEqual(self.table.discount_for(49), Decimal('0.00'))
+        self.assertEqual(self.table.discount_for(50), Decimal('5.00'))
+        self.assertEqual(self.table.discount_for(199), Decimal('5.00'))
+        self.assertEqual(self.table.discount_for(200), Decimal('10.00'))
+
+    def test_quote(self):
+        quote = self.table.quote(1, 50)
+        self.assertEqual(quote.unit_price, Decimal('95.00'))
+        self.assertEqual(quote.total_price, Decimal('4750.00'))
+        self.assertIsNone(self.table.quote(2, 50))
+
+
+class CalculatePriceTests(TestCase):
+    def setUp(self):
+        invalidate_pricing_table()
+        self.addCleanup(invalidate_pricing_table)
+        category = ServiceCategory.objects.create(name='Mugs', description='Mugs', icon_class='coffee')
+        self.product = ProductExample.objects.create(
+            category=category, title='Mug', description='Mug',
+            starting_price=Decimal('500.00'), unit_price=Decimal('400.00'),
+        )
+        PricingTier.objects.create(min_quantity=50, discount_percentage=Decimal('5.00'))
+        self.url = reverse('core:calculate_price')
+
+    def test_calculates_discounted_total(self):
+        response = self.client.get(self.url, {'product_id': self.product.id, 'qty': 100})
+        self.assertEqual(response.json(), {
+            'total_price': 38000.0,
+            'unit_price': 380.0,
+            'base_unit_price': 400.0,
+            'discount_percentage': 5.0,
+            'qty': 100,
+            'version': get_pricing_table().version,
+        })
+
+    def test_no_queries_once_loaded(self):
+        get_pricing_table()
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'product_id': self.product.id, 'qty': 10})
+
+    def test_tier_change_invalidates_table(self):
+        get_pricing_table()
+        with self.captureOnCommitCallbacks(execute=True):
+            PricingTier.objects.create(min_quantity=100, discount_percentage=Decimal('10.00'))
+        response = self.client.get(self.url, {'product_id': self.product.id, 'qty': 100})
+        self.assertEqual(response.json()['discount_percentage'], 10.0)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'product_id': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'product_id': 999}).status_code, 404)
+
+
+class CalculatePricesTests(TestCase):
+    def setUp(self):
+        invalidate_pricing_table()
+        self.addCleanup(invalidate_pricing_table)
+        self.category = ServiceCategory.objects.create(name='Mugs', description='Mugs', icon_class='coffee')
+        self.mug = ProductExample.objects.create(
+            category=self.category, title='Mug', description='Mug',
+            starting_price=Decimal('500.00'), unit_price=Decimal('400.00'),
+        )
+        self.cup = ProductExample.objects.create(
+            category=self.category, title='Cup', description='Cup', starting_price=Decimal('200.00'),
+        )
+        PricingTier.objects.create(min_quantity=50, discount_percentage=Decimal('5.00'))
+        self.url = reverse('core:calculate_prices')
+
+    def test_price_ladder(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'product_ids': f'{self.mug.id},999', 'qty': '1,50'})
+        data = response.json()
+        self.assertEqual([(q['qty'], q['total_price']) for q in data['quotes']], [(1, 400.0), (50, 19000.0)])
+        self.assertEqual(data['missing'], [999])
+
+    def test_category_with_default_quantities(self):
+        response = self.client.get(self.url, {'category': self.category.slug})
+        pairs = [(q['product_id'], q['qty']) for q in response.json()['quotes']]
+        self.assertEqual(pairs, [(self.cup.id, 1), (self.cup.id, 50), (self.mug.id, 1), (self.mug.id, 50)])
+
+    def test_jsonl_stream(self):
+        response = self.client.get(self.url, {'product_ids': self.mug.id, 'qty': '1,2,3', 'format': 'jsonl'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['qty'] for line in lines], [1, 2, 3])
+
+    def test_errors(self):
+        self.assertEqual(self.client.get(self.url, {'qty': '1'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'product_ids': 'a'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'product_ids': self.mug.id, 'qty': '0'}).status_code, 400)
+
+
+PRICING_JS = Path(__file__).resolve().parent / 'static' / 'core' / 'js' / 'pricing.js'
+
+NODE_QUOTES = """
+const pricing = require(process.argv[1]);
+const {payload, cases} = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const results = cases.map(([productId, qty]) => {
+    const quote = pricing.quote(payload, productId, qty);
+    return quote && quote.totalCents;
+});
+process.stdout.write(JSON.stringify(results));
+"""
+
+
+@skipUnless(shutil.which('node'), 'Node.js is required for the pricing parity tests')
+class PricingParityTests(TestCase):
+    """The estimate modal (pricing.js) and core.pricing must agree to the cent."""
+
+    BASE_PRICES = ['0.01', '0.99', '1.00', '19.99', '333.33', '400.00', '1234.57', '99999999.99']
+    DISCOUNTS = ['0.00', '0.01', '5.00', '12.50', '33.33', '99.99']
+    QUANTITIES = [1, 3, 7, 49, 50, 199, 200, 1001, 123457]
+
+    def run_node(self, payload, cases):
+        result = subprocess.run(
+            ['node', '-e', NODE_QUOTES, str(PRICING_JS)],
+            input=json.dumps({'payload': payload, 'cases': cases}),
+            capture_output=True, text=True, check=True,
+        )
+        return json.loads(result.stdout)
+
+    def test_totals_match_decimal_quotes(self):
+        base_prices = [(index, Decimal(price)) for index, price in enumerate(self.BASE_PRICES, start=1)]
+        for discount in self.DISCOUNTS:
+            tiers = [(50, Decimal(discount)), (200, Decimal('7.25'))]
+            table = PricingTable(tiers, base_prices)
+            cases = list(cartesian([index for index, _ in base_prices] + [404], self.QUANTITIES))
+            js_totals = self.run_node(table.payload(table.base_prices), cases)
+            for (product_id, qty), js_total in zip(cases, js_totals):
+                quote = table.quote(product_id, qty)
+                if quote is None:
+                    self.assertIsNone(js_total)
+                    continue
+                expected = int((quote.total_price * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+                python_total = price_cents(to_cents(quote.base_unit_price), to_basis_points(quote.discount_percentage), qty)
+                self.assertEqual(python_total, expected)
+                self.assertEqual(js_total, expected, f'product {product_id} x {qty} at {discount}%')
+
+    def test_payload_embedded_in_service_page(self):
+        cache.clear()
+        clear_local_cache()
+        invalidate_pricing_table()
+        self.addCleanup(invalidate_pricing_table)
+        category = ServiceCategory.objects.create(name='Mugs', description='Mugs', icon_class='coffee')
+        product = ProductExample.objects.create(
+            category=category, title='Mug', description='Mug',
+            starting_price=Decimal('500.00'), unit_price=Decimal('400.00'),
+        )
+        PricingTier.objects.create(min_quantity=50, discount_percentage=Decimal('5.00'))
+        response = self.client.get(reverse('core:service_detail', args=[category.slug]))
+        self.assertContains(response, '<script id="pricing-data" type="application/json">')
+        self.assertEqual(response.context['products'][0], product)
+        payload = get_pricing_table().payload([product.id])
+        self.assertEqual(payload['t'], [[50, 500]])
+        self.assertEqual(payload['p'], {str(product.id): 40000})
+        self.assertEqual(self.run_node(payload, [[product.id, 50]]), [1900000])
+
+
+class SiteContextCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.addCleanup(clear_local_cache)
+        self.request = RequestFactory().get('/')
+        self.config = SiteConfiguration.objects.create(logo='site/logo.png')
+        SocialMediaLink.objects.create(name='Facebook', url='https://facebook.com/x', icon_class='facebook')
+
+    def test_no_queries_once_cached(self):
+        site_context(self.request)
+        with self.assertNumQueries(0):
+            context = site_context(self.request)
+        self.assertEqual(context['site_config'], self.config)
+        self.assertEqual([link.name for link in context['social_links']], ['Facebook'])
+
+    def test_admin_edit_bumps_generation(self):
+        site_context(self.request)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.phone_contact = '0700000000'
+            self.config.save()
+            SocialMediaLink.objects.create(name='Instagram', url='https://instagram.com/x', icon_class='instagram', order=1)
+        context = site_context(self.request)
+        self.assertEqual(context['site_config'].phone_contact, '0700000000')
+        self.assertEqual(len(context['social_links']), 2)
+
+    def test_load_shares_site_cache(self):
+        self.assertEqual(SiteConfiguration.load(), self.config)
+        with self.assertNumQueries(0):
+            SiteConfiguration.load()
+
+
+class CatalogFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        invalidate_pricing_table()
+        self.addCleanup(invalidate_pricing_table)
+        self.category = ServiceCategory.objects.create(name='Mugs', description='Mugs', icon_class='coffee')
+        self.product = ProductExample.objects.create(
+            category=self.category, title='Classic Mug', description='Mug',
+            starting_price=Decimal('500.00'), unit_price=Decimal('400.00'), is_featured=True,
+        )
+
+    @override_settings(DEFERRED_LOADING=False)
+    def test_index_fragments_are_reused(self):
+        self.client.get(reverse('core:index'))
+        # Only the uncached contact form's service choices hit the database.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('core:index'))
+        self.assertContains(response, 'Classic Mug')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_catalog_save_busts_fragments(self):
+        self.client.get(reverse('core:index'))
+        self.client.get(reverse('core:service_detail', args=[self.category.slug]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.title = 'Travel Mug'
+            self.product.save()
+        self.assertContains(self.client.get(reverse('core:index')), 'Travel Mug')
+        self.assertContains(self.client.get(reverse('core:service_detail', args=[self.category.slug])), 'Travel Mug')
+
+    def test_service_detail_cached(self):
+        url = reverse('core:service_detail', args=[self.category.slug])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.assertEqual(self.client.get(reverse('core:service_detail', args=['missing'])).status_code, 404)
+        # Unknown slugs are not cached one by one.
+        self.assertEqual([key for key in _local if key[0] == SERVICES], [(SERVICES, 'active_services')])
+
+    def test_csrf_token_is_per_request(self):
+        first = self.client.get(reverse('core:index')).context['csrf_token']
+        self.client.cookies.clear()
+        second = self.client.get(reverse('core:index')).context['csrf_token']
+        self.assertNotEqual(str(first), str(second))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        invalidate_pricing_table()
+        self.addCleanup(invalidate_pricing_table)
+        category = ServiceCategory.objects.create(name='Mugs', description='Mugs', icon_class='coffee')
+        self.product = ProductExample.objects.create(
+            category=category, title='Mug', description='Mug', starting_price=Decimal('500.00'), is_featured=True,
+        )
+
+    def test_not_modified_until_catalog_changes(self):
+        url = reverse('core:products')
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached_response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_calculate_price_revalidates(self):
+        url = reverse('core:calculate_price')
+        params = {'product_id': self.product.id, 'qty': 5}
+        response = self.client.get(url, params)
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    @override_settings(DEFERRED_LOADING=False)
+    def test_index_etag_follows_csrf_cookie(self):
+        url = reverse('core:index')
+        self.client.get(url)  # sets the CSRF cookie
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Per-view query counts must not grow with the size of the catalog."""
+
+    CATALOG_SIZES = [10, 1000, 10000]
+
+    # Cold-cache query budgets per URL name.
+    BUDGETS = {
+        'core:index': 9,
+        'core:products': 4,
+        'core:list_products': 3,
+        'core:service_detail': 7,
+        'core:contact_fragment': 3,
+        'core:estimate_modal_fragment': 6,
+        'core:calculate_price': 2,
+        'core:calculate_prices': 2,
+        'admin:core_servicecategory_changelist': 8,
+        'admin:core_productexample_changelist': 9,
+        'admin:core_customerinquiry_changelist': 11,
+        'admin:core_quoterequest_changelist': 8,
+        'admin:core_inquiryrollup_changelist': 7,
+        'admin:core_adminjob_changelist': 9,
+    }
+
+    def check_budgets(self):
+        categories = ServiceCategory.objects.all()
+        product = ProductExample.objects.first()
+        requests = {
+            'core:index': (reverse('core:index'), None),
+            'core:products': (reverse('core:products'), None),
+            'core:list_products': (reverse('core:list_products'), {'category': categories[0].slug}),
+            'core:service_detail': (reverse('core:service_detail', args=[categories[0].slug]), None),
+            'core:contact_fragment': (reverse('core:contact_fragment'), None),
+            'core:estimate_modal_fragment': (reverse('core:estimate_modal_fragment'), None),
+            'core:calculate_price': (reverse('core:calculate_price'), {'product_id': product.id, 'qty': 60}),
+            'core:calculate_prices': (reverse('core:calculate_prices'), {'product_ids': product.id, 'qty': '1,50,200'}),
+        }
+        for name in ['servicecategory', 'productexample', 'customerinquiry', 'quoterequest', 'inquiryrollup', 'adminjob']:
+            requests[f'admin:core_{name}_changelist'] = (reverse(f'admin:core_{name}_changelist'), None)
+        for name, (url, data) in requests.items():
+            with self.subTest(view=name):
+                self.assertQueryBudget(url, self.BUDGETS[name], data)
+
+    def test_budgets_hold_across_catalog_sizes(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        for size in self.CATALOG_SIZES:
+            with self.subTest(products=size):
+                ProductExample.objects.all().delete()
+                ServiceCategory.objects.all().delete()
+                PricingTier.objects.all().delete()
+                seed_catalog(size, inquiries=size // 10)
+                self.check_budgets()
+
+
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        reset_caches()
+
+    def submit(self):
+        return self.client.post(reverse('core:submit_inquiry'), {
+            'name': 'Jane', 'phone': '0712345678', 'email': 'jane@example.com', 'message': 'Need 100 mugs',
+        })
+
+    def test_submit_queues_emails_without_sending(self):
+        response = self.submit()
+        self.assertRedirects(response, reverse('core:inquiry_success'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(CustomerInquiry.objects.count(), 1)
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('recipients', flat=True)),
+            ['jane@example.com', 'studioprinthive@gmail.com'],
+        )
+
+    def test_send_outbox_drains_over_one_connection(self):
+        self.submit()
+        with mock.patch('core.notifications.get_connection', wraps=mail.get_connection) as get_connection:
+            call_command('send_outbox', stdout=mock.MagicMock())
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+
+    def test_overlapping_workers_send_each_email_once(self):
+        self.submit()
+        self.submit()
+        other_worker = []
+
+        def open_connection(connection):
+            # A second worker runs while the first holds its batch.
+            if not other_worker:
+                other_worker.append(None)
+                other_worker[0] = send_due_emails()
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', open_connection):
+            self.assertEqual(send_due_emails(batch_size=2), (2, 0))
+        self.assertEqual(other_worker, [(2, 0)])
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), sorted(OutboundEmail.objects.values_list('recipients', flat=True)))
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', flat=True)), {'sent'})
+
+        # A batch left 'sending' by a worker that died is claimed again once its lease runs out.
+        email = OutboundEmail.objects.first()
+        OutboundEmail.objects.filter(pk=email.pk).update(status='sending', next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(send_due_emails(), (0, 0))
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(send_due_emails(), (1, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        self.submit()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            self.assertEqual(send_due_emails(max_attempts=2), (0, 2))
+            email = OutboundEmail.objects.first()
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertIn('OSError: down', email.last_error)
+            # Not due yet, so nothing is retried immediately.
+            self.assertEqual(send_due_emails(max_attempts=2), (0, 0))
+            OutboundEmail.objects.update(next_attempt_at=email.next_attempt_at - retry_delay(1))
+            self.assertEqual(send_due_emails(max_attempts=2), (0, 2))
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', flat=True)), {'failed'})
+        self.assertEqual(retry_delay(3), timedelta(minutes=4))
+
+
+class DesignFileUploadTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, DESIGN_FILE_MAX_SIZE=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = Path(media_root)
+
+    def submit(self, name, content, client=None):
+        return (client or self.client).post(reverse('core:submit_inquiry'), {
+            'name': 'Jane', 'phone': '0712345678', 'email': 'jane@example.com', 'message': 'Logo attached',
+            'design_file': SimpleUploadedFile(name, content),
+        })
+
+    def test_identical_files_are_stored_once(self):
+        self.assertRedirects(self.submit('logo.PDF', b'%PDF design'), reverse('core:inquiry_success'))
+        self.assertRedirects(self.submit('copy.pdf', b'%PDF design'), reverse('core:inquiry_success'))
+        names = set(QuoteRequest.objects.values_list('specifications_file', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertRegex(name, r'^specifications/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual((self.media_root / name).read_bytes(), b'%PDF design')
+        self.assertEqual(len(list(self.media_root.rglob('*.pdf'))), 1)
+
+    def test_rejects_disallowed_type(self):
+        response = self.submit('payload.exe', b'MZ')
+        self.assertContains(response, 'Unsupported file type')
+        self.assertFalse(CustomerInquiry.objects.exists())
+
+    def test_rejects_oversized_file(self):
+        response = self.submit('huge.png', b'x' * 2048)
+        self.assertContains(response, 'File is too large')
+        self.assertFalse(CustomerInquiry.objects.exists())
+
+    def test_csrf_still_enforced(self):
+        response = self.submit('logo.pdf', b'%PDF', client=Client(enforce_csrf_checks=True))
+        self.assertEqual(response.status_code, 403)
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_DERIVATIVE_WIDTHS=[320, 640])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(clear_manifest_cache)
+        self.media_root = Path(media_root)
+        category = ServiceCategory.objects.create(name='Mugs', slug='mugs', description='Mugs', icon_class='coffee')
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'orange').save(buffer, 'JPEG')
+        self.product = ProductExample.objects.create(
+            category=category, title='Mug', description='Mug', starting_price=Decimal('500'),
+            image=SimpleUploadedFile('mug.jpg', buffer.getvalue()),
+        )
+
+    def test_generates_widths_up_to_original(self):
+        manifest = get_derivatives(self.product.image)
+        self.assertEqual((manifest['width'], manifest['height']), (800, 600))
+        self.assertEqual(manifest['fallback'], 'image/jpeg')
+        self.assertIn('image/webp', manifest['sources'])
+        for entries in manifest['sources'].values():
+            self.assertEqual([width for width, _ in entries], [320, 640])
+            for _, name in entries:
+                self.assertTrue((self.media_root / name).exists())
+        with Image.open(self.media_root / manifest['sources']['image/jpeg'][0][1]) as image:
+            self.assertEqual(image.size, (320, 240))
+
+    def test_tag_renders_srcset_and_dimensions(self):
+        get_derivatives(self.product.image)
+        html = Template(
+            '{% load images %}{% responsive_image product.image alt=product.title sizes="50vw" %}'
+        ).render(Context({'product': self.product}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('320w', html)
+        self.assertIn('sizes="50vw"', html)
+        self.assertIn('width="800" height="600"', html)
+        self.assertIn('alt="Mug"', html)
+
+    def test_tag_falls_back_to_plain_img(self):
+        html = Template(
+            "{% load images %}{% responsive_image 'core/img/branding-products1.jpg' alt='Products' %}"
+        ).render(Context())
+        self.assertTrue(html.startswith('<img src="/static/core/img/branding-products1.jpg"'))
+        self.assertFalse(list(self.media_root.rglob('*.webp')))
+
+    def test_tag_renders_original_until_derivatives_exist(self):
+        html = Template(
+            '{% load images %}{% responsive_image product.image alt=product.title %}'
+        ).render(Context({'product': self.product}))
+        self.assertTrue(html.startswith(f'<img src="{self.product.image.url}"'))
+        self.assertFalse(list(self.media_root.rglob('*.webp')))
+
+    def test_import_builds_derivatives_on_commit(self):
+        row = {
+            'category': 'mugs', 'title': 'Imported Mug', 'description': 'Mug',
+            'starting_price': '400', 'image': self.product.image.name,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            Importer().load([(1, 'product', row)])
+        self.assertTrue(list(self.media_root.rglob('*.webp')))
+
+    def test_cached_fragments_gain_srcset_once_derivatives_exist(self):
+        reset_caches()
+        self.product.is_featured = True
+        url = reverse('core:products')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.save()
+        # A request between the save's generation bump and the build caches
+        # the plain <img>.
+        for callback in callbacks:
+            callback()
+            self.assertContains(self.client.get(url), 'alt="Mug"')
+        self.assertContains(self.client.get(url), 'srcset=')
+
+        clear_manifest_cache()
+        shutil.rmtree(self.media_root / 'derivatives')
+        reset_caches()
+        self.assertNotContains(self.client.get(url), 'srcset=')
+        with mock.patch('core.management.commands.build_image_derivatives.STATIC_IMAGES', []):
+            call_command('build_image_derivatives', stdout=StringIO())
+        self.assertContains(self.client.get(url), 'srcset=')
+
+    def test_deferred_tag_holds_back_sources(self):
+        get_derivatives(self.product.image)
+        html = Template(
+            '{% load images %}{% responsive_image product.image alt=product.title defer=True %}'
+        ).render(Context({'product': self.product}))
+        self.assertIn('<source type="image/webp" data-srcset="', html)
+        self.assertIn('<img data-src="', html)
+        self.assertNotIn(' src=', html)
+        self.assertNotIn(' srcset=', html)
+
+
+class BenchmarkTests(TransactionTestCase):
+    def test_run_benchmarks_reports_every_endpoint(self):
+        seed_catalog(20, categories=2)
+        endpoints = default_endpoints()
+        # One client: the in-memory test database cannot take concurrent writes.
+        results = run_benchmarks(endpoints, requests=6, concurrency=1, warmup=1, profile_iterations=2)
+        self.assertEqual(list(results), [endpoint.name for endpoint in endpoints])
+        for name, metrics in results.items():
+            self.assertEqual(metrics['requests'], 6, name)
+            self.assertEqual(metrics['errors'] + metrics['profile_errors'], 0, name)
+            self.assertLessEqual(metrics['p50_ms'], metrics['p95_ms'])
+            self.assertLessEqual(metrics['p95_ms'], metrics['p99_ms'])
+        self.assertEqual(results['calculate_price']['queries'], 0)
+
+    def test_asgi_timing(self):
+        seed_catalog(20, categories=2)
+        endpoints = [endpoint for endpoint in default_endpoints() if endpoint.method == 'get']
+        results = run_benchmarks(endpoints, requests=4, concurrency=2, warmup=1, profile_iterations=1, asgi=True)
+        for name, metrics in results.items():
+            self.assertEqual((metrics['requests'], metrics['errors']), (4, 0), name)
+
+    def test_index_benchmark_restores_indexes(self):
+        seed_catalog(20, categories=2, inquiries=40)
+        results = benchmark_indexes(runs=1)
+        self.assertIn('core_inquiry_recent_idx', results['inquiry changelist']['with']['plan'])
+        self.assertNotIn('core_inquiry_recent_idx', results['inquiry changelist']['without']['plan'])
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, CustomerInquiry._meta.db_table)
+        self.assertIn('core_inquiry_status_idx', constraints)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'index': {'p95_ms': 100, 'queries': 3, 'allocated_kb': 50}}
+        current = {'index': {'p95_ms': 105, 'queries': 4, 'allocated_kb': 80}, 'new': {'p95_ms': 1}}
+        regressed = {row[1]: row[-1] for row in compare(baseline, current, threshold=10)}
+        self.assertEqual(regressed, {'p95_ms': False, 'queries': True, 'allocated_kb': True})
+
+
+@override_settings(PERFORMANCE_SERVER_TIMING=True)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        invalidate_pricing_table()
+        self.addCleanup(invalidate_pricing_table)
+        ServiceCategory.objects.create(name='Mugs', slug='mugs', description='Mugs', icon_class='coffee')
+
+    def timings(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+        return entries
+
+    def test_server_timing_reports_queries_and_render(self):
+        response = self.client.get(reverse('core:products'))
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'render', 'context', 'total'})
+        self.assertRegex(timings['db']['desc'], r'^"[1-9]\d* queries"$')
+        self.assertGreater(float(timings['render']['dur']), 0)
+        self.assertGreaterEqual(float(timings['render']['dur']), float(timings['context']['dur']))
+        self.assertGreaterEqual(float(timings['total']['dur']), float(timings['render']['dur']))
+
+    def test_sampled_log_line_and_report(self):
+        log_file = Path(tempfile.mkdtemp()) / 'performance.log'
+        self.addCleanup(shutil.rmtree, log_file.parent)
+        with override_settings(PERFORMANCE_LOG_SAMPLE_RATE=1), self.assertLogs('core.performance') as logs:
+            self.client.get(reverse('core:products'))
+            self.client.get(reverse('core:calculate_price'), {'product_id': 'x'})
+        records = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual([record['view'] for record in records], ['core:products', 'core:calculate_price'])
+        self.assertEqual(records[1]['status'], 400)
+        self.assertGreater(records[0]['queries'], 0)
+
+        log_file.write_text(''.join(record.getMessage() + '\n' for record in logs.records))
+        out = StringIO()
+        call_command('perf_report', file=str(log_file), stdout=out)
+        self.assertIn('core:products', out.getvalue())
+        self.assertIn('core:calculate_price', out.getvalue())
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False, PERFORMANCE_LOG_SAMPLE_RATE=1)
+    def test_server_timing_can_be_turned_off(self):
+        with self.assertLogs('core.performance') as logs:
+            response = self.client.get(reverse('core:products'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertGreater(json.loads(logs.records[0].getMessage())['queries'], 0)
+
+
+class QueryProfilerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        invalidate_pricing_table()
+        self.addCleanup(invalidate_pricing_table)
+        seed_catalog(6, categories=3)
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t  WHERE id IN (%s, %s, %s) AND name = 'x''y' AND n > 10"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? AND n > ?',
+        )
+
+    def test_flags_n_plus_one_and_duplicates(self):
+        profile = QueryProfile(slow_ms=10_000, n_plus_one=3)
+        with connection.execute_wrapper(profile):
+            for product in ProductExample.objects.all():
+                product.category.name
+            list(PricingTier.objects.all())
+            list(PricingTier.objects.all())
+        duplicates, n_plus_one = profile.findings()
+        self.assertEqual([finding['count'] for finding in n_plus_one], [6])
+        self.assertIn('core_servicecategory', n_plus_one[0]['sql'])
+        self.assertEqual([finding['count'] for finding in duplicates], [2, 2, 2, 2])
+
+    def test_exact_repeats_are_duplicates_not_n_plus_one(self):
+        profile = QueryProfile(slow_ms=10_000, n_plus_one=3)
+        with connection.execute_wrapper(profile):
+            for _ in range(4):
+                list(PricingTier.objects.filter(min_quantity__gte=10))
+        duplicates, n_plus_one = profile.findings()
+        self.assertEqual([finding['count'] for finding in duplicates], [4])
+        self.assertEqual(n_plus_one, [])
+
+    def test_middleware_logs_report_with_explain(self):
+        log_file = Path(tempfile.mkdtemp()) / 'queries.log'
+        self.addCleanup(shutil.rmtree, log_file.parent)
+        with override_settings(QUERY_PROFILER_ENABLED=True, QUERY_PROFILER_SLOW_MS=0), \
+                self.assertLogs('core.profiling') as logs:
+            self.client.get(reverse('core:products'))
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual(report['view'], 'core:products')
+        self.assertEqual(report['queries'], len(report['slow']))
+        self.assertTrue(all(query['explain'] for query in report['slow']))
+
+        log_file.write_text(logs.records[0].getMessage() + '\n')
+        out = StringIO()
+        call_command('query_report', file=str(log_file), stdout=out)
+        self.assertIn('core:products', out.getvalue())
+        self.assertIn('slow', out.getvalue())
+
+    def test_disabled_by_default(self):
+        with self.assertNoLogs('core.profiling'):
+            self.client.get(reverse('core:products'))
+
+
+class ProductListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.categories = seed_catalog(60, categories=2)
+        self.url = reverse('core:list_products')
+
+    def walk(self, **params):
+        ids, cursor = [], None
+        while True:
+            data = self.client.get(self.url, dict(params, **({'cursor': cursor} if cursor else {}))).json()
+            ids += [row['id'] for row in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                return ids
+
+    def test_pages_follow_catalog_ordering(self):
+        expected = list(
+            ProductExample.objects.filter(is_active=True, is_featured=True)
+            .order_by('-is_featured', 'starting_price', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.walk(limit=7), expected)
+        self.assertEqual(len(self.client.get(self.url).json()['results']), 12)
+
+    def test_category_filter(self):
+        category = self.categories[1]
+        ids = self.walk(category=category.slug)
+        self.assertEqual(
+            sorted(ids),
+            sorted(category.products.filter(is_featured=True).values_list('id', flat=True)),
+        )
+        self.assertEqual(self.client.get(self.url, {'category': 'nope'}).status_code, 404)
+
+    def test_bounds_and_bad_input(self):
+        self.assertEqual(len(self.client.get(self.url, {'limit': 1000}).json()['results']), 30)
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, 400)
+        ordering = ['-is_featured', 'starting_price', 'id']
+        for values in [[1], ['a', 'b', 'c'], [True, {'x': 1}, 1], [True, '10.00', None], [True, '10.00', [1]]]:
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            with self.subTest(values=values):
+                with self.assertRaises(ValueError):
+                    decode_cursor(cursor, ordering, ProductExample)
+                self.assertEqual(self.client.get(self.url, {'cursor': cursor}).status_code, 400)
+
+    def test_html_fragment_and_products_page(self):
+        response = self.client.get(self.url, {'format': 'html', 'limit': 5})
+        self.assertEqual(response.content.decode().count('class="product-card'), 5)
+        cursor = response['X-Next-Cursor']
+        response = self.client.get(self.url, {'format': 'html', 'cursor': cursor, 'limit': 48})
+        self.assertEqual(response.content.decode().count('class="product-card'), 25)
+        self.assertNotIn('X-Next-Cursor', response)
+
+        response = self.client.get(reverse('core:products'))
+        self.assertContains(response, 'class="product-card', count=12)
+        self.assertContains(response, f'data-next="{response.context["products"].next_cursor}"')
+
+
+class CatalogImportExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def test_round_trip_and_upsert(self):
+        seed_catalog(12, categories=2)
+        call_command('catalog_export', output=str(self.tmp / 'catalog.jsonl'), stdout=StringIO())
+        ProductExample.objects.filter(title='Product 3').update(starting_price=Decimal('1.00'))
+        ProductExample.objects.filter(title='Product 11').delete()
+
+        out = StringIO()
+        generation = get_generation(PRODUCTS)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('catalog_import', str(self.tmp / 'catalog.jsonl'), batch_size=5, stdout=out)
+        self.assertIn('product: 1 created, 1 updated, 10 unchanged.', out.getvalue())
+        self.assertIn('tier: 0 created, 0 updated, 3 unchanged.', out.getvalue())
+        self.assertGreater(get_generation(PRODUCTS), generation)
+        self.assertEqual(ProductExample.objects.count(), 12)
+        self.assertEqual(ProductExample.objects.get(title='Product 3').starting_price, Decimal('103.00'))
+        self.assertEqual(list(search('product', 'product 11')), [ProductExample.objects.get(title='Product 11').pk])
+
+    def test_csv_import(self):
+        (self.tmp / 'categories.csv').write_text(
+            'name,description,icon_class,order\nTote Bags,Printed totes,shopping-bag,2\n'
+        )
+        (self.tmp / 'products.csv').write_text(
+            'category,title,description,starting_price,unit_price,is_featured\n'
+            'tote-bags,Canvas Tote,Heavy canvas tote,350,,yes\n'
+            'tote-bags,Canvas Tote,Heavy canvas tote bag,300,250,no\n'
+        )
+        call_command('catalog_import', str(self.tmp / 'categories.csv'), kind='category', stdout=StringIO())
+        call_command('catalog_import', str(self.tmp / 'products.csv'), kind='product', stdout=StringIO())
+        product = ProductExample.objects.get()
+        self.assertEqual(product.category.slug, 'tote-bags')
+        self.assertEqual(
+            (product.description, product.starting_price, product.unit_price, product.is_featured),
+            ('Heavy canvas tote bag', Decimal('300'), Decimal('250'), False),
+        )
+
+        out = StringIO()
+        call_command('catalog_export', 'product', format='csv', stdout=out, stderr=StringIO())
+        self.assertEqual(out.getvalue().splitlines()[1], 'tote-bags,Canvas Tote,Heavy canvas tote bag,300.00,250.00,1,,False,True')
+
+    def test_bad_rows_name_their_line(self):
+        (self.tmp / 'bad.jsonl').write_text(
+            '{"kind": "tier", "min_quantity": 50, "discount_percentage": "5"}\n'
+            '{"kind": "product", "category": "nope", "title": "Mug", "description": "Mug", "starting_price": "x"}\n'
+        )
+        with self.assertRaisesMessage(CommandError, 'line 2: starting_price'):
+            call_command('catalog_import', str(self.tmp / 'bad.jsonl'), stdout=StringIO())
+        # The tier batch before the bad line was committed.
+        self.assertTrue(PricingTier.objects.filter(min_quantity=50).exists())
+
+
+class InquiryRollupTests(TestCase):
+    def setUp(self):
+        self.mugs = ServiceCategory.objects.create(name='Mugs', description='Mugs', icon_class='coffee')
+        self.shirts = ServiceCategory.objects.create(name='Shirts', description='Shirts', icon_class='layers')
+
+    def inquiry(self, service, status='new', price=None):
+        inquiry = CustomerInquiry.objects.create(
+            name='Jane', phone='0712345678', email='jane@example.com', message='Mugs', service_needed=service,
+            status=status,
+        )
+        QuoteRequest.objects.create(inquiry=inquiry, estimated_price=price)
+        return inquiry
+
+    def totals(self):
+        rows = InquiryRollup.objects.values('day', 'service', 'status').annotate(
+            inquiries=Sum('inquiries'), quotes=Sum('quotes'), value=Sum('quote_value'),
+        )
+        return {
+            (row['day'], row['service'], row['status']): (row['inquiries'], row['quotes'], row['value'])
+            for row in rows if row['inquiries'] or row['quotes'] or row['value']
+        }
+
+    def test_signals_match_rebuild(self):
+        first = self.inquiry(self.mugs, price=Decimal('1500'))
+        second = self.inquiry(self.mugs)
+        self.inquiry(self.shirts, status='contacted', price=Decimal('800'))
+
+        first.status = 'quoted'
+        first.save()
+        quote = second.quote
+        quote.estimated_price = Decimal('2000')
+        quote.save()
+        second.service_needed = self.shirts
+        second.status = 'closed'
+        second.save()
+        self.inquiry(self.shirts).delete()
+
+        today = first.submitted_on.date()
+        incremental = self.totals()
+        self.assertEqual(incremental, {
+            (today, self.mugs.pk, 'quoted'): (1, 1, Decimal('1500')),
+            (today, self.shirts.pk, 'closed'): (1, 1, Decimal('2000')),
+            (today, self.shirts.pk, 'contacted'): (1, 1, Decimal('800')),
+        })
+        rebuild_rollups()
+        self.assertEqual(self.totals(), incremental)
+
+    def test_compact_merges_rows(self):
+        today = timezone.now().date()
+        InquiryRollup.objects.bulk_create([
+            InquiryRollup(day=today, service=self.mugs, status='new', inquiries=2),
+            InquiryRollup(day=today, service=self.mugs, status='new', inquiries=1, quotes=1, quote_value=500),
+            InquiryRollup(day=today, service=self.shirts, status='new'),
+        ])
+        self.assertEqual(compact(), (3, 1))
+        self.assertEqual(self.totals(), {(today, self.mugs.pk, 'new'): (3, 1, Decimal('500'))})
+
+    def test_dashboard(self):
+        self.inquiry(self.mugs, status='closed', price=Decimal('1200'))
+        self.inquiry(self.mugs, status='contacted')
+        self.inquiry(None)
+        stats = dashboard(7)
+        self.assertEqual((stats['total'], stats['closed'], stats['quote_value']), (3, 1, Decimal('1200')))
+        self.assertEqual([reached for _, reached, _ in stats['funnel']], [3, 2, 1, 1])
+        self.assertEqual(stats['per_day'][-1], (timezone.now().date(), 3))
+        self.assertEqual([name for name, _ in stats['services']], ['Mugs', 'Unspecified'])
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(reverse('admin:core_inquiryrollup_changelist'), {'days': 90})
+        self.assertContains(response, 'Inquiry Analytics')
+        self.assertContains(response, 'KSh 1,200')
+
+    def test_dashboard_needs_view_permission(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.client.force_login(staff)
+        url = reverse('admin:core_inquiryrollup_changelist')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        staff.user_permissions.add(Permission.objects.get(codename='view_inquiryrollup'))
+        self.assertContains(self.client.get(url), 'Inquiry Analytics')
+
+
+class QuoteEngineTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(invalidate_pricing_table)
+        self.category = ServiceCategory.objects.create(name='Mugs', description='Mugs', icon_class='coffee')
+        self.mug = ProductExample.objects.create(
+            category=self.category, title='Classic Mug', description='Mug', starting_price=Decimal('500.00'),
+            unit_price=Decimal('412.35'), min_quantity=10,
+        )
+        self.pen = ProductExample.objects.create(
+            category=self.category, title='Pen', description='Pen', starting_price=Decimal('33.33'),
+        )
+        self.tier = PricingTier.objects.create(min_quantity=50, discount_percentage=Decimal('7.50'))
+        reset_caches()
+
+    def submit(self, line_items):
+        return self.client.post(reverse('core:submit_inquiry'), {
+            'name': 'Jane', 'phone': '0712345678', 'email': 'jane@example.com', 'message': 'Mugs and pens',
+            'service_needed': self.category.pk, 'line_items': line_items,
+        })
+
+    def inquiry(self, items, status='new'):
+        inquiry = CustomerInquiry.objects.create(
+            name='Jane', phone='0712345678', email='jane@example.com', message='Mugs', status=status,
+        )
+        return create_quote(inquiry, items)
+
+    def test_submission_prices_line_items_like_the_calculator(self):
+        self.assertRedirects(self.submit(f'{self.mug.pk}:60, {self.pen.pk}:3,{self.mug.pk}:5'), reverse('core:inquiry_success'))
+        quote = QuoteRequest.objects.get()
+        lines = {line.product_id: line for line in quote.line_items.all()}
+        # 65 mugs at 7.5% off, 3 pens undiscounted, in whole cents rounded half up.
+        self.assertEqual((lines[self.mug.pk].quantity, lines[self.mug.pk].total), (65, Decimal('24792.54')))
+        self.assertEqual(lines[self.mug.pk].unit_price, Decimal('381.42'))
+        self.assertEqual(lines[self.pen.pk].total, Decimal('99.99'))
+        self.assertEqual(quote.estimated_price, Decimal('24892.53'))
+        self.assertTrue(quote.auto_priced)
+        self.assertEqual(InquiryRollup.objects.get().quote_value, Decimal('24892.53'))
+        self.assertIn('Estimate: KSh 24,892.53', OutboundEmail.objects.get(recipients='studioprinthive@gmail.com').body)
+
+        self.submit('')
+        quote = QuoteRequest.objects.latest('pk')
+        self.assertEqual((quote.estimated_price, quote.auto_priced, quote.line_items.count()), (None, False, 0))
+
+    def test_invalid_line_items_are_rejected(self):
+        self.pen.is_active = False
+        self.pen.save()
+        for line_items, error in [
+            (f'{self.mug.pk}:5', 'Quote between 10 and 100000 units of Classic Mug.'),
+            (f'{self.pen.pk}:5', 'no longer available'),
+            ('mugs', 'Invalid quote items.'),
+        ]:
+            with self.subTest(line_items):
+                self.assertContains(self.submit(line_items), error)
+        self.assertFalse(CustomerInquiry.objects.exists())
+
+    def test_recompute_updates_open_quotes_in_bulk(self):
+        open_quotes = [self.inquiry([(self.mug, 60), (self.pen, 100)]) for _ in range(3)]
+        sent = self.inquiry([(self.mug, 60)], status='quoted')
+        manual = self.inquiry([(self.mug, 60)])
+        QuoteRequest.objects.filter(pk=manual.pk).update(auto_priced=False, estimated_price=Decimal('20000'))
+        rebuild_rollups()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tier.discount_percentage = Decimal('10.00')
+            self.tier.save()
+            self.pen.unit_price = Decimal('30.00')
+            self.pen.save()
+        # A fixed number of statements whatever the number of quotes (one
+        # rollup write per day, service and status touched).
+        with self.assertNumQueries(10):
+            self.assertEqual(recompute_quotes(), 3)
+
+        for quote in QuoteRequest.objects.filter(pk__in=[quote.pk for quote in open_quotes]):
+            self.assertEqual(quote.estimated_price, Decimal('22266.90') + Decimal('2700.00'))
+        self.assertEqual(QuoteRequest.objects.get(pk=sent.pk).estimated_price, Decimal('22885.43'))
+        self.assertEqual(QuoteRequest.objects.get(pk=manual.pk).estimated_price, Decimal('20000'))
+        self.assertEqual(
+            sorted(QuoteLineItem.objects.filter(quote=open_quotes[0]).values_list('total', flat=True)),
+            [Decimal('2700.00'), Decimal('22266.90')],
+        )
+        self.assertEqual(
+            InquiryRollup.objects.aggregate(value=Sum('quote_value'))['value'],
+            3 * Decimal('24966.90') + Decimal('22885.43') + Decimal('20000'),
+        )
+        self.assertEqual(recompute_quotes(QuoteRequest.objects.filter(pk=sent.pk)), 0)
+
+    def test_recompute_caps_sums_and_touches_only_affected_rollups(self):
+        old = self.inquiry([(self.mug, 60)])
+        CustomerInquiry.objects.filter(pk=old.inquiry_id).update(submitted_on=timezone.now() - timedelta(days=400))
+        huge = self.inquiry([(self.mug, 60)])
+        QuoteLineItem.objects.filter(quote=huge).update(quantity=300000)
+        rebuild_rollups()
+        # A day between the two that recompute_quotes has no business rebuilding.
+        closed = CustomerInquiry.objects.create(name='Sam', phone='0700000000', email='s@example.com', message='Pens', status='closed')
+        CustomerInquiry.objects.filter(pk=closed.pk).update(submitted_on=timezone.now() - timedelta(days=100))
+        between = (timezone.now() - timedelta(days=100)).date()
+        InquiryRollup.objects.create(day=between, status='closed', inquiries=99)
+
+        self.assertEqual(recompute_quotes(), 2)
+        self.assertEqual(QuoteRequest.objects.get(pk=old.pk).estimated_price, Decimal('22885.43'))
+        self.assertIsNone(QuoteRequest.objects.get(pk=huge.pk).estimated_price)
+        self.assertIsNone(QuoteLineItem.objects.get(quote=huge).total)
+        self.assertEqual(InquiryRollup.objects.get(day=between).inquiries, 99)
+        self.assertEqual(InquiryRollup.objects.filter(status='new').aggregate(value=Sum('quote_value'))['value'], Decimal('22885.43'))
+        self.assertEqual(InquiryRollup.objects.filter(status='new').aggregate(quotes=Sum('quotes'))['quotes'], 1)
+
+    def test_admin_price_by_hand_and_recompute_action(self):
+        quote = self.inquiry([(self.mug, 60)])
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        url = reverse('admin:core_quoterequest_change', args=[quote.pk])
+        line = quote.line_items.get()
+        data = {
+            'inquiry': quote.inquiry_id, 'estimated_price': '20000.00', 'auto_priced': 'on', 'notes': '',
+            'line_items-TOTAL_FORMS': 1, 'line_items-INITIAL_FORMS': 1,
+            'line_items-0-id': line.pk, 'line_items-0-quote': quote.pk,
+            'line_items-0-product': self.mug.pk, 'line_items-0-quantity': 60,
+        }
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        quote.refresh_from_db()
+        self.assertEqual((quote.estimated_price, quote.auto_priced), (Decimal('20000.00'), False))
+
+        QuoteRequest.objects.filter(pk=quote.pk).update(auto_priced=True)
+        response = self.client.post(reverse('admin:core_quoterequest_changelist'), {
+            'action': 'recompute_estimates', '_selected_action': [quote.pk],
+        }, follow=True)
+        self.assertContains(response, '1 open quote(s) re-priced')
+        quote.refresh_from_db()
+        self.assertEqual(quote.estimated_price, Decimal('22885.43'))
+
+    def test_recompute_action_needs_change_permission(self):
+        quote = self.inquiry([(self.mug, 60)])
+        QuoteRequest.objects.filter(pk=quote.pk).update(estimated_price=Decimal('1.00'), auto_priced=True)
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        staff.user_permissions.add(Permission.objects.get(codename='view_quoterequest'))
+        self.client.force_login(staff)
+        url = reverse('admin:core_quoterequest_changelist')
+        self.assertNotContains(self.client.get(url), 'recompute_estimates')
+        self.client.post(url, {'action': 'recompute_estimates', '_selected_action': [quote.pk]})
+        quote.refresh_from_db()
+        self.assertEqual(quote.estimated_price, Decimal('1.00'))
+
+
+class BulkAdminActionTests(TestCase):
+    def setUp(self):
+        self.category = ServiceCategory.objects.create(name='Mugs', description='Mugs', icon_class='coffee')
+        self.inquiries = [
+            CustomerInquiry.objects.create(
+                name=f'Customer {n}', phone='0712345678', email=f'c{n}@example.com', message='Mugs',
+                service_needed=self.category, status=status,
+            )
+            for n, status in enumerate(['new', 'new', 'contacted', 'closed'])
+        ]
+        QuoteRequest.objects.create(inquiry=self.inquiries[0], estimated_price=Decimal('1500.00'))
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(self.admin)
+
+    def act(self, action, inquiries, model='customerinquiry', **data):
+        return self.client.post(reverse(f'admin:core_{model}_changelist'), {
+            'action': action, '_selected_action': [inquiry.pk for inquiry in inquiries], **data,
+        }, follow=True)
+
+    def rollups(self):
+        return sorted(
+            InquiryRollup.objects.filter(inquiries__gt=0).values_list('status', 'inquiries', 'quotes', 'quote_value')
+        )
+
+    def test_status_action_updates_in_one_statement_and_logs_each_change(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.act('mark_closed', self.inquiries)
+        self.assertContains(response, '3 inquiry(ies) marked &quot;Closed&quot;.')
+        self.assertEqual(set(CustomerInquiry.objects.values_list('status', flat=True)), {'closed'})
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "core_customerinquiry"')]
+        self.assertEqual(len(updates), 1)
+        entries = LogEntry.objects.order_by('object_id')
+        self.assertEqual([entry.object_id for entry in entries], [str(inquiry.pk) for inquiry in self.inquiries[:3]])
+        self.assertEqual(entries[0].get_change_message(), 'Changed Status.')
+        self.assertEqual(entries[0].object_repr, str(self.inquiries[0]))
+        self.assertEqual(self.rollups(), [('closed', 4, 1, Decimal('1500.00'))])
+        expected = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), expected)
+
+    def test_quote_actions_change_their_inquiries(self):
+        quote = self.inquiries[0].quote
+        self.assertContains(self.act('mark_quoted', [quote], model='quoterequest'), '1 inquiry(ies) marked')
+        self.assertEqual(CustomerInquiry.objects.get(pk=self.inquiries[0].pk).status, 'quoted')
+
+    @override_settings(ADMIN_BULK_SYNC_LIMIT=2)
+    def test_large_selections_run_as_admin_jobs(self):
+        response = self.act('mark_contacted', self.inquiries)
+        job = AdminJob.objects.get()
+        self.assertContains(response, f'4 inquiries queued as <a href="{reverse("admin:core_adminjob_changelist")}"')
+        self.assertEqual((job.action, job.params, job.total, job.status), ('set_status', {'status': 'contacted'}, 4, 'pending'))
+        self.assertEqual(CustomerInquiry.objects.filter(status='contacted').count(), 1)
+
+        response = self.client.get(reverse('admin:core_adminjob_changelist'))
+        self.assertContains(response, '0 / 4')
+        self.assertContains(response, 'window.location.reload')
+
+        out = StringIO()
+        call_command('process_admin_jobs', batch_size=3, stdout=out)
+        self.assertIn(f'Job #{job.pk} (Set inquiry status): Done, 4/4', out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.started_at is not None), ('done', 4, True))
+        self.assertEqual(CustomerInquiry.objects.filter(status='contacted').count(), 4)
+        self.assertEqual(LogEntry.objects.count(), 3)
+        self.assertEqual(self.rollups(), [('contacted', 4, 1, Decimal('1500.00'))])
+
+        response = self.client.get(reverse('admin:core_adminjob_changelist'))
+        self.assertContains(response, '4 / 4')
+        self.assertNotContains(response, 'window.location.reload')
+        self.assertIsNone(bulk.claim_job())
+
+    def test_select_across_queues_the_whole_filtered_list(self):
+        self.act('mark_closed', self.inquiries[:1], select_across='1')
+        self.assertEqual(AdminJob.objects.get().total, 4)
+
+    def test_export_streams_csv_or_writes_a_file_for_the_admin(self):
+        response = self.act('export_csv', self.inquiries[:2])
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], bulk.EXPORT_HEADER)
+        self.assertEqual([row[2] for row in rows[1:]], ['Customer 1', 'Customer 0'])
+        self.assertEqual((rows[2][6], rows[2][9]), ('Mugs', '1500.00'))
+
+        CustomerInquiry.objects.filter(pk=self.inquiries[1].pk).update(
+            name='=HYPERLINK("http://example.com")', company='@SUM(A1)', message='-2+3',
+        )
+        response = self.act('export_csv', self.inquiries[1:2])
+        row = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))[1]
+        self.assertEqual((row[2], row[5], row[8]), ('\'=HYPERLINK("http://example.com")', "'@SUM(A1)", "'-2+3"))
+        self.assertEqual(row[3], '0712345678')
+
+        export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_root)
+        with override_settings(ADMIN_EXPORT_ROOT=export_root):
+            self.act('export_csv', self.inquiries, select_across='1')
+            job = bulk.run_job(bulk.claim_job(), batch_size=3)
+            self.assertEqual((job.status, job.processed), ('done', 4))
+            download = reverse('admin:core_adminjob_download', args=[job.pk])
+            self.assertContains(self.client.get(reverse('admin:core_adminjob_changelist')), download)
+            response = self.client.get(download)
+            rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1][2], 'Customer 3')
+        self.assertEqual(rows[3][2], '\'=HYPERLINK("http://example.com")')
+
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(download).status_code, 403)
+
+    def test_failed_jobs_keep_their_error_and_can_run_again(self):
+        job = bulk.queue('set_status', CustomerInquiry.objects.all(), self.admin, status='closed')
+        with mock.patch('core.bulk.set_status', side_effect=ValueError('bad status')), self.assertLogs('core.bulk', 'ERROR'):
+            job = bulk.run_job(bulk.claim_job())
+        self.assertEqual((job.status, job.error), ('failed', 'ValueError: bad status'))
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        staff.user_permissions.add(Permission.objects.get(codename='view_adminjob'))
+        self.client.force_login(staff)
+        self.act('run_again', [job], model='adminjob')
+        self.assertEqual(AdminJob.objects.get().status, 'failed')
+
+        self.client.force_login(self.admin)
+        self.assertContains(self.act('run_again', [job], model='adminjob'), '1 job(s) queued again.')
+        self.assertEqual(AdminJob.objects.get().status, 'pending')
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.category = ServiceCategory.objects.create(name='Mugs', slug='mugs', description='Mugs', icon_class='coffee')
+        self.magic = self.product('Magic Mug', 'Colour changing ceramic mug')
+        self.plain = self.product('Plain Mug', 'White ceramic mug with a magic finish')
+        self.tshirt = self.product('Cotton T-Shirt', 'Screen printed cotton tee')
+
+    def product(self, title, description, **kwargs):
+        return ProductExample.objects.create(
+            category=self.category, title=title, description=description, starting_price=Decimal('500'), **kwargs
+        )
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('The Magic-Mug, for 2 (two) offices!'), ['magic', 'mug', 'two', 'offices'])
+
+    def test_prefix_and_ranking(self):
+        self.assertEqual(list(search('product', 'magic')), [self.magic.pk, self.plain.pk])
+        self.assertEqual(list(search('product', 'cer MUG')), [self.magic.pk, self.plain.pk])
+        self.assertEqual(list(search('product', 'magic cotton')), [])
+        self.assertIsNone(search('product', 'the !'))
+
+    def test_index_follows_saves_and_deletes(self):
+        self.tshirt.title = 'Hoodie'
+        self.tshirt.save()
+        self.assertEqual(list(search('product', 'hood')), [self.tshirt.pk])
+        self.assertEqual(list(search('product', 'shirt')), [])
+        self.tshirt.delete()
+        self.assertFalse(SearchTerm.objects.filter(kind='product', object_id=self.tshirt.pk).exists())
+
+    def test_search_endpoint(self):
+        self.product('Magic Pen', 'Hidden', is_active=False)
+        response = self.client.get(reverse('core:search_products'), {'q': 'magi', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'query': 'magi', 'results': [{
+            'id': self.magic.pk, 'title': 'Magic Mug', 'category': 'Mugs', 'starting_price': 500.0,
+            'image': None, 'url': reverse('core:service_detail', args=['mugs']),
+        }]})
+        self.assertEqual(self.client.get(reverse('core:search_products'), {'limit': 'x'}).status_code, 400)
+
+    def test_admin_search_uses_index(self):
+        inquiry = CustomerInquiry.objects.create(
+            name='Jane Wanjiku', phone='0712345678', email='jane@example.com', message='Need 200 branded mugs',
+        )
+        CustomerInquiry.objects.create(name='Otieno', phone='0722000000', email='o@example.com', message='Banners')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(reverse('admin:core_customerinquiry_changelist'), {'q': 'brand jane'})
+        self.assertEqual(list(response.context['cl'].result_list), [inquiry])
+
+    def test_rebuild_command_indexes_bulk_created_rows(self):
+        seed_catalog(4, categories=1)
+        self.assertEqual(list(search('product', 'synthetic')), [])
+        call_command('rebuild_search_index', 'product', stdout=StringIO())
+        self.assertEqual(len(search('product', 'synthetic')), 4)
+        self.assertEqual(list(search('product', 'magic')), [self.magic.pk, self.plain.pk])
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.clock = mock.patch('core.ratelimit.time').start()
+        self.clock.time.return_value = 1000.0
+        self.addCleanup(mock.patch.stopall)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('60/m'), (60, 1000))
+        self.assertEqual(parse_rate('5/10m'), (5, 120000))
+        for rate in ('60', '60/x', 'x/m', '5/'):
+            with self.assertRaises(ValueError):
+                parse_rate(rate)
+
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(LocMemCache('ratelimit-tests', {}))
+        self.assertEqual([bucket.hit('key', 3, 1000) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(bucket.hit('key', 3, 1000), 1.0)
+        # Refused hits take no token, so the wait does not grow.
+        self.assertEqual(bucket.hit('key', 3, 1000), 1.0)
+        self.assertEqual(bucket.hit('other', 3, 1000), 0)
+        self.clock.time.return_value += 1
+        self.assertEqual(bucket.hit('key', 3, 1000), 0)
+        self.assertEqual(bucket.hit('key', 3, 1000), 1.0)
+        self.clock.time.return_value += 60
+        self.assertEqual([bucket.hit('key', 3, 1000) for _ in range(4)], [0, 0, 0, 1.0])
+
+    def test_buckets_have_their_own_cache(self):
+        self.assertNotEqual(settings.RATE_LIMIT_CACHE, 'default')
+        TokenBucket().hit('bucket-key', 3, 1000)
+        self.assertIsNotNone(caches[settings.RATE_LIMIT_CACHE].get('bucket-key'))
+        self.assertIsNone(cache.get('bucket-key'))
+
+    def test_falls_back_to_local_buckets(self):
+        broken = mock.Mock(**{'add.side_effect': ConnectionError('cache down')})
+        bucket = TokenBucket(broken)
+        with self.assertLogs('core.ratelimit', 'WARNING'):
+            self.assertEqual([bucket.hit('key', 2, 1000) for _ in range(3)], [0, 0, 1.0])
+
+    @override_settings(RATE_LIMITS={'calculate_price': '2/m', 'submit_inquiry': '1/m'})
+    def test_views_answer_429_with_retry_after(self):
+        category = ServiceCategory.objects.create(name='Mugs', description='Mugs', icon_class='coffee')
+        product = ProductExample.objects.create(
+            category=category, title='Mug', description='Mug', starting_price=Decimal('5.00'),
+        )
+        url = reverse('core:calculate_price')
+        params = {'product_id': product.id, 'qty': 1}
+        self.assertEqual([self.client.get(url, params).status_code for _ in range(2)], [200, 200])
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(response.json()['retry_after'], 30)
+        # Buckets are per client address.
+        self.assertEqual(self.client.get(url, params, REMOTE_ADDR='10.0.0.2').status_code, 200)
+        with override_settings(RATE_LIMIT_ENABLED=False):
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+
+        # The inquiry form is limited on POST only, and browsers get text.
+        inquiry = reverse('core:submit_inquiry')
+        data = {'name': 'Jane', 'phone': '0712345678', 'email': 'jane@example.com', 'message': 'Mugs'}
+        self.assertEqual(self.client.post(inquiry, data).status_code, 302)
+        self.client.get(inquiry)
+        response = self.client.post(inquiry, data, HTTP_ACCEPT='text/html,*/*')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertEqual(CustomerInquiry.objects.count(), 1)
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_REAL_IP')
+    def test_client_ip_header(self):
+        factory = RequestFactory()
+        self.assertEqual(client_ip(factory.get('/', HTTP_X_REAL_IP='203.0.113.9')), '203.0.113.9')
+        self.assertEqual(client_ip(factory.get('/')), '127.0.0.1')
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(invalidate_pricing_table)
+        self.categories = seed_catalog(20, categories=2)
+        self.factory = RequestFactory()
+
+    def get(self, view, name, *args, **params):
+        """Call a view directly; async ones through async_to_sync, so queries run on this thread."""
+        request = self.factory.get(reverse(f'core:{name}', args=args), params)
+        if asyncio.iscoroutinefunction(view):
+            return async_to_sync(view)(request, *args)
+        return view(request, *args)
+
+    def test_same_output_and_queries_as_sync_views(self):
+        product = ProductExample.objects.filter(is_active=True).first()
+        pages = [
+            ('products', (), {}),
+            ('service_detail', (self.categories[0].slug,), {}),
+            ('calculate_price', (), {'product_id': product.id, 'qty': 60}),
+        ]
+        for name, args, params in pages:
+            with self.subTest(name):
+                reset_caches()
+                with CaptureQueriesContext(connection) as sync_queries:
+                    expected = self.get(getattr(views, name), name, *args, **params)
+                reset_caches()
+                with CaptureQueriesContext(connection) as async_queries:
+                    response = self.get(getattr(async_views, name), name, *args, **params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(len(async_queries), len(sync_queries))
+
+    @override_settings(DEFERRED_LOADING=False)
+    def test_index_loads_only_uncached_fragments(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.get(async_views.index, 'index')
+        tables = {query['sql'].split(' FROM ')[1].split()[0] for query in cold.captured_queries}
+        self.assertTrue({'"core_carouselimage"', '"core_pricingtier"', '"core_productexample"'} <= tables)
+        # Warm, only the contact form's service choices are queried.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(async_views.index, 'index').status_code, 200)
+
+    def test_conditional_get_and_errors(self):
+        response = self.get(async_views.products, 'products')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        request = self.factory.get(reverse('core:products'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(async_to_sync(async_views.products)(request).status_code, 304)
+        with self.assertRaises(Http404):
+            self.get(async_views.service_detail, 'service_detail', 'no-such-service')
+        self.assertEqual(self.get(async_views.calculate_price, 'calculate_price', product_id='x').status_code, 400)
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=True)
+    async def test_middleware_counts_queries_under_asgi(self):
+        response = await self.async_client.get(reverse('core:products'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+
+class AssetPipelineTests(TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        patcher = mock.patch.object(assets, 'STATIC_DIR', self.root / 'static')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        (self.root / 'static' / 'core' / 'css').mkdir(parents=True)
+        (self.root / 'static' / 'core' / 'img').mkdir(parents=True)
+
+    def test_icon_registry_update(self):
+        registry = self.root / 'feather-icons.json'
+        source = self.root / 'icons.json'
+        source.write_text(json.dumps({'menu': '<line x1="3" y1="12" x2="21" y2="12"></line>'}))
+        with mock.patch.object(assets, 'REGISTRY_FILE', registry), mock.patch('core.icons.REGISTRY_FILE', registry):
+            self.addCleanup(clear_icon_cache)
+            self.assertEqual(assets.update_icon_registry(source), (registry, 1))
+            self.assertEqual(icon_registry(), {'menu': '<line x1="3" y1="12" x2="21" y2="12"></line>'})
+            source.write_text('["menu"]')
+            with self.assertRaisesMessage(assets.AssetError, 'not a Feather icons.json'):
+                assets.update_icon_registry(source)
+            with self.assertRaisesMessage(assets.AssetError, 'npm install'):
+                assets.update_icon_registry(self.root / 'missing.json')
+
+    def test_build_css_reports_cli_errors(self):
+        with self.assertRaisesMessage(assets.AssetError, 'not found'):
+            assets.build_css('no-such-tailwind-cli')
+        with self.assertRaisesMessage(assets.AssetError, 'failed'):
+            assets.build_css('false')
+
+    @override_settings(DEBUG=True)
+    def test_tags_fall_back_to_cdn_until_built(self):
+        self.addCleanup(assets._built.clear)
+        template = Template('{% load assets %}{% stylesheets %}')
+        with mock.patch.object(assets.finders, 'find', return_value=None):
+            html = template.render(Context())
+        self.assertIn('https://cdn.tailwindcss.com', html)
+        with mock.patch.object(assets.finders, 'find', return_value='/found'):
+            html = template.render(Context())
+        self.assertIn('<link rel="stylesheet" href="/static/core/css/site.css">', html)
+        self.assertIn('<link rel="stylesheet" href="/static/core/css/styles.css">', html)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        source = self.root / 'source'
+        (source / 'core').mkdir(parents=True)
+        css = 'body { color: black; }\n' * 40
+        (source / 'core' / 'site.css').write_text(css)
+        (source / 'core' / 'tiny.css').write_text('a{}')
+        static_root = self.root / 'static_root'
+        with override_settings(
+            STATIC_ROOT=static_root, STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'core.storage.CompressedManifestStorage'},
+            },
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = CompressedManifestStorage().stored_name('core/site.css')
+        self.assertRegex(hashed, r'^core/site\.[0-9a-f]{12}\.css$')
+        self.assertEqual(gzip.decompress((static_root / f'{hashed}.gz').read_bytes()).decode(), css)
+        self.assertFalse(list(static_root.glob('core/tiny.*.css.gz')))
+
+
+class IconTests(TestCase):
+    def test_tag_renders_inline_svg(self):
+        category = ServiceCategory.objects.create(name='Mugs', slug='mugs', description='Mugs', icon_class='coffee')
+        html = Template(
+            '{% load icons %}{% icon service.icon_class class="w-8 h-8" id="mug" %}|{% icon "no-such-icon" %}'
+        ).render(Context({'service': category}))
+        svg, unknown = html.split('|')
+        self.assertTrue(svg.startswith('<svg xmlns="http://www.w3.org/2000/svg" width="24" height="24"'))
+        self.assertIn('class="feather feather-coffee w-8 h-8" id="mug"', svg)
+        self.assertIn(icon_registry()['coffee'], svg)
+        self.assertEqual(unknown, '')
+        self.assertIs(render_icon('coffee', **{'class': 'w-8 h-8', 'id': 'mug'}), render_icon('coffee', **{'class': 'w-8 h-8', 'id': 'mug'}))
+
+    def test_pages_need_no_client_side_icons(self):
+        seed_catalog(4, categories=2)
+        for name in ('index', 'products'):
+            html = self.client.get(reverse(f'core:{name}')).content.decode()
+            self.assertNotIn('data-feather', html)
+            self.assertNotIn('feather.min.js', html)
+            self.assertIn('feather feather-menu', html)
+
+    def test_admin_rejects_unknown_icons(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        data = {'name': 'Shirts', 'slug': 'shirts', 'description': 'Shirts', 'icon_class': 'shirt', 'order': 0}
+        for prefix in ('products-', 'carousel_images-'):
+            data.update({f'{prefix}TOTAL_FORMS': 0, f'{prefix}INITIAL_FORMS': 0})
+        response = self.client.post(reverse('admin:core_servicecategory_add'), data)
+        self.assertContains(response, '&quot;shirt&quot; is not a Feather icon')
+        self.assertFalse(ServiceCategory.objects.exists())
+
+        response = self.client.post(reverse('admin:core_socialmedialink_add'), {
+            'name': 'TikTok', 'url': 'https://www.tiktok.com/@printhive.ke', 'icon_class': 'tiktok', 'order': 0,
+        })
+        self.assertContains(response, 'is not a Feather icon')
+        self.assertEqual(self.client.post(reverse('admin:core_socialmedialink_add'), {
+            'name': 'Instagram', 'url': 'https://instagram.com/printhive_kenya', 'icon_class': 'instagram', 'order': 0,
+        }).status_code, 302)
+
+
+class DeferredLoadingTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(invalidate_pricing_table)
+        self.addCleanup(assets._built.clear)
+        self.addCleanup(assets._critical.clear)
+        self.categories = seed_catalog(12, categories=2)
+
+    def test_index_defers_contact_and_estimate_modal(self):
+        url = reverse('core:index')
+        response = self.client.get(url)
+        self.assertContains(response, f'data-fragment="{reverse("core:contact_fragment")}"')
+        self.assertContains(response, f'data-fragment="{reverse("core:estimate_modal_fragment")}"')
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, 'id="pricing-data"')
+        # Nothing left on the page needs a query once cached, and its ETag
+        # no longer depends on the visitor's CSRF cookie.
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_fragments(self):
+        response = self.client.get(reverse('core:contact_fragment'))
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertContains(response, self.categories[0].name)
+
+        url = reverse('core:estimate_modal_fragment')
+        self.assertContains(self.client.get(url), 'id="pricing-data"')
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(url), 'id="estimate-modal"')
+
+    def test_invalid_submission_renders_form_inline(self):
+        response = self.client.post(reverse('core:submit_inquiry'), {'name': ''})
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, f'data-fragment="{reverse("core:contact_fragment")}"')
+
+    @override_settings(DEBUG=True)
+    def test_critical_css_inlined_once_built(self):
+        critical = Path(tempfile.mkdtemp()) / 'critical.css'
+        self.addCleanup(shutil.rmtree, critical.parent)
+        critical.write_text('.hero{min-height:100vh}')
+        with mock.patch.object(assets, 'CRITICAL_CSS', critical), \
+                mock.patch('core.templatetags.assets.built_asset_url', return_value='/static/core/css/site.css'):
+            html = self.client.get(reverse('core:index')).content.decode()
+            self.assertIn('<style>.hero{min-height:100vh}', html)
+            self.assertIn('<link rel="preload" href="/static/core/css/site.css" as="style"', html)
+            # Other pages keep the blocking stylesheet.
+            html = self.client.get(reverse('core:products')).content.decode()
+            self.assertNotIn('<style>', html)
+            self.assertIn('<link rel="stylesheet" href="/static/core/css/site.css">', html)
+
+    def test_page_weight_command(self):
+        output = Path(tempfile.mkdtemp()) / 'weight.json'
+        self.addCleanup(shutil.rmtree, output.parent)
+        call_command('page_weight', output=str(output), stdout=StringIO())
+        results = json.loads(output.read_text())['results']
+        self.assertEqual(list(results), ['index', 'products', 'service_detail', 'inquiry_success'])
+        index = results['index']
+        self.assertGreater(index['deferred_kb'], 0)
+        self.assertGreaterEqual(index['lcp_ms'], index['fcp_ms'])
+        self.assertIn('https://fonts.googleapis.com', ' '.join(index['third_party']))
+        self.assertEqual(index['missing'], [])
+
+        results['index']['initial_kb'] /= 2
+        output.write_text(json.dumps({'meta': {}, 'results': results}))
+        with self.assertRaisesMessage(CommandError, 'regressions'):
+            call_command('page_weight', compare=str(output), fail_on_regression=True, stdout=StringIO())
+
+    def test_parser_follows_the_preload_scanner(self):
+        parser = PageParser()
+        parser.feed(
+            '<head><link rel="stylesheet" href="/a.css"><script src="/a.js" defer></script></head><body>'
+            '<picture><source type="image/webp" srcset="/s.webp 320w, /m.webp 800w" sizes="50vw">'
+            '<img src="/m.jpg" srcset="/s.jpg 320w, /m.jpg 800w" sizes="50vw" fetchpriority="high"></picture>'
+            '<img data-src="/slide.jpg" loading="lazy"><noscript><img src="/fallback.jpg"></noscript>'
+            '<div data-fragment="/fragment/"></div></body>'
+        )
+        self.assertEqual([(r['url'], r['load'], r.get('blocking'), r.get('lcp')) for r in parser.resources], [
+            ('/a.css', 'initial', True, None),
+            ('/a.js', 'initial', False, None),
+            ('/m.webp', 'initial', None, True),
+            ('/slide.jpg', 'deferred', None, False),
+            ('/fragment/', 'deferred', None, None),
+        ])
@@ -0,0 +1,107 @@
+"""
+Streaming upload handling for customer design files.
+
+DesignFileUploadHandler writes the design_file part of a multipart request
+straight to a temporary file chunk by chunk, hashing it as it goes, and
+rejects oversized or disallowed files before reading them. Stored files are
+content-addressed under specifications/, so identical uploads share one file.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+from django.template.defaultfilters import filesizeformat
+
+
+ALLOWED_DESIGN_EXTENSIONS = ['pdf', 'png', 'jpg', 'jpeg', 'ai', 'psd', 'svg']
+
+
+def design_file_max_size():
+    return getattr(settings, 'DESIGN_FILE_MAX_SIZE', 200 * 1024 * 1024)
+
+
+class DesignFileUploadHandler(FileUploadHandler):
+    """
+    Stream the design_file field to disk with constant memory use. Other
+    file fields are passed on to the next handler. Validation problems are
+    left in self.error for the view to show on the form.
+    """
+    field_name = 'design_file'
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.request_too_large = False
+        self.active = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # The whole request body is larger than the file limit allows, so
+        # the file can be rejected without reading any of it.
+        self.request_too_large = content_length > design_file_max_size() + 1024 * 1024
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.active = field_name == self.field_name
+        if not self.active:
+            return
+
+        extension = os.path.splitext(file_name)[1].lower().lstrip('.')
+        if extension not in ALLOWED_DESIGN_EXTENSIONS:
+            self.reject(f"Unsupported file type. Allowed: {', '.join(ALLOWED_DESIGN_EXTENSIONS).upper()}.")
+        if self.request_too_large or (content_length or 0) > design_file_max_size():
+            self.reject_too_large()
+
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        self.file = TemporaryUploadedFile(file_name, content_type, 0, charset, content_type_extra)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        self.size += len(raw_data)
+        if self.size > design_file_max_size():
+            self.file.close()
+            self.reject_too_large()
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hasher.hexdigest()
+        return self.file
+
+    def reject(self, message):
+        self.active = False
+        self.error = message
+        raise SkipFile(message)
+
+    def reject_too_large(self):
+        self.reject(f'File is too large. The maximum size is {filesizeformat(design_file_max_size())}.')
+
+
+def store_design_file(uploaded):
+    """
+    Save an uploaded design file under specifications/<sha256 prefix>/ and
+    return its storage name. A file with the same content is stored once.
+    """
+    digest = getattr(uploaded, 'sha256', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in uploaded.chunks():
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        uploaded.seek(0)
+
+    extension = os.path.splitext(uploaded.name)[1].lower()
+    name = f'specifications/{digest[:2]}/{digest}{extension}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, uploaded)
+    return name
@@ -1,13 +1,22 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'core'
 
+# Under ASGI the read-only catalog views can run async (see core.async_views).
+catalog = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('service/<slug:slug>/', views.service_detail, name='service_detail'),
+    path('', catalog.index, name='index'),
+    path('service/<slug:slug>/', catalog.service_detail, name='service_detail'),
+    path('fragments/contact/', views.contact_fragment, name='contact_fragment'),
+    path('fragments/estimate-modal/', views.estimate_modal_fragment, name='estimate_modal_fragment'),
     path('inquiry/submit/', views.submit_inquiry, name='submit_inquiry'),
     path('inquiry/success/', views.inquiry_success, name='inquiry_success'),
-    path('products/', views.products, name='products'),
-    path('api/calculate-price/', views.calculate_price, name='calculate_price'),
+    path('products/', catalog.products, name='products'),
+    path('api/calculate-price/', catalog.calculate_price, name='calculate_price'),
+    path('api/calculate-prices/', views.calculate_prices, name='calculate_prices'),
+    path('api/products/', views.list_products, name='list_products'),
+    path('api/search/', views.search_products, name='search_products'),
 ]
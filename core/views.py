@@ -1,35 +1,123 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
-from decimal import Decimal
-from django.core.mail import send_mail
+import hashlib
+import json
+
+from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 from django.conf import settings
 from django.contrib import messages
-from .models import ServiceCategory, ProductExample, CustomerInquiry, QuoteRequest, PricingTier, CarouselImage
+from django.db import transaction
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition
+from .models import ServiceCategory, ProductExample, CustomerInquiry, PricingTier, CarouselImage
+from .cache import SITE, SERVICES, PRODUCTS, PRICING, CAROUSEL, cached, get_generations, last_modified
 from .forms import CustomerInquiryForm
+from .notifications import queue_inquiry_emails
+from .pagination import KeysetPage
+from .pricing import get_pricing_table
+from .quotes import create_quote
+from .ratelimit import rate_limit
+from .search import search
+from .uploads import DesignFileUploadHandler, store_design_file
 
 
-def index(request):
-    """Home page with services and featured products."""
-    services = ServiceCategory.objects.filter(is_active=True)
-    products = ProductExample.objects.filter(is_active=True, is_featured=True)[:6]
-    carousel_slides = CarouselImage.objects.filter(is_active=True)
-    form = CustomerInquiryForm()
-    
-    pricing_tiers = PricingTier.objects.filter(is_active=True)
-    
-    context = {
-        'services': services,
-        'products': products,
-        'carousel_slides': carousel_slides,
-        'pricing_tiers': pricing_tiers,
+def catalog_validators(namespaces, vary_on_csrf=False):
+    """
+    The (etag, last_modified) functions of catalog_condition(): the ETag and
+    Last-Modified validators come from the cache generations and change
+    times of namespaces, so computing them costs no queries. vary_on_csrf
+    may be a function, called per request.
+    """
+    def etag(request, *args, **kwargs):
+        parts = [f'{namespace}:{generation}' for namespace, generation in get_generations(*namespaces).items()]
+        if vary_on_csrf() if callable(vary_on_csrf) else vary_on_csrf:
+            parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def modified(request, *args, **kwargs):
+        return last_modified(*namespaces)
+
+    return etag, modified
+
+
+def catalog_condition(*namespaces, vary_on_csrf=False):
+    """
+    Conditional GET support for views whose output only depends on the given
+    cache namespaces, so a 304 costs no queries (see catalog_validators).
+
+    Pages with a form set vary_on_csrf so that a browser whose CSRF cookie
+    changed gets a fresh token instead of a cached page.
+    """
+    etag, modified = catalog_validators(namespaces, vary_on_csrf)
+
+    def decorator(view):
+        # no-cache makes browsers revalidate every time instead of guessing
+        # a freshness lifetime from Last-Modified.
+        return cache_control(no_cache=True)(condition(etag_func=etag, last_modified_func=modified)(view))
+    return decorator
+
+
+def _featured_products():
+    return ProductExample.objects.filter(is_active=True, is_featured=True)[:6]
+
+
+def _index_context(form, defer=None):
+    # Querysets stay lazy: the template only evaluates them when the
+    # {% cache %} fragment that uses them has to be re-rendered.
+    return {
+        'services': ServiceCategory.objects.filter(is_active=True),
+        'products': _featured_products(),
+        'carousel_slides': CarouselImage.objects.filter(is_active=True),
+        'pricing_tiers': PricingTier.objects.filter(is_active=True),
         'form': form,
+        # DEFERRED_LOADING: contact section and estimate modal are fetched
+        # from contact_fragment and estimate_modal_fragment.
+        'defer_fragments': settings.DEFERRED_LOADING if defer is None else defer,
     }
-    return render(request, 'core/index.html', context)
 
 
+def _index_has_form():
+    # With the contact form deferred the page carries no CSRF token.
+    return not settings.DEFERRED_LOADING
+
+
+@catalog_condition(SITE, SERVICES, PRODUCTS, PRICING, CAROUSEL, vary_on_csrf=_index_has_form)
+def index(request):
+    """Home page with services and featured products."""
+    return render(request, 'core/index.html', _index_context(CustomerInquiryForm()))
+
+
+@catalog_condition(SITE, SERVICES, vary_on_csrf=True)
+def contact_fragment(request):
+    """The home page's contact section, fetched by main.js in DEFERRED_LOADING mode."""
+    return render(request, 'core/partials/contact.html', {'form': CustomerInquiryForm()})
+
+
+@catalog_condition(SERVICES, PRODUCTS, PRICING)
+def estimate_modal_fragment(request):
+    """The home page's estimate modal and its pricing data, fetched by main.js in DEFERRED_LOADING mode."""
+    return render(request, 'core/partials/index_estimate_modal.html', {
+        'products': _featured_products(),
+        'pricing_tiers': PricingTier.objects.filter(is_active=True),
+    })
+
+
+def _active_service(slug):
+    # One cached map of the active categories, rather than an entry per
+    # requested slug: unknown slugs would otherwise fill both caches.
+    services = cached(SERVICES, 'active_services', lambda: {
+        service.slug: service for service in ServiceCategory.objects.filter(is_active=True)
+    })
+    return services.get(slug)
+
+
+@catalog_condition(SITE, SERVICES, PRODUCTS, PRICING)
 def service_detail(request, slug):
     """Detail page for a service category."""
-    service = get_object_or_404(ServiceCategory, slug=slug, is_active=True)
+    service = _active_service(slug)
+    if service is None:
+        raise Http404('No ServiceCategory matches the given query.')
     products = service.products.filter(is_active=True)
     
     pricing_tiers = PricingTier.objects.filter(is_active=True)
@@ -42,87 +130,45 @@ def service_detail(request, slug):
     return render(request, 'core/service_detail.html', context)
 
 
+@csrf_exempt
+@rate_limit('submit_inquiry', methods=['POST'])
 def submit_inquiry(request):
     """Handle contact form submission."""
+    # The streaming design file handler has to be installed before anything
+    # reads request.POST, including the CSRF check, which therefore runs in
+    # _submit_inquiry instead.
+    upload_handler = DesignFileUploadHandler(request)
+    request.upload_handlers.insert(0, upload_handler)
+    return _submit_inquiry(request, upload_handler)
+
+
+@csrf_protect
+def _submit_inquiry(request, upload_handler):
     if request.method == 'POST':
         form = CustomerInquiryForm(request.POST, request.FILES)
-        if form.is_valid():
-            # Save the inquiry
-            inquiry = form.save()
-            
-            # Create associated quote request
-            quote = QuoteRequest.objects.create(inquiry=inquiry)
-            
-            # Handle file upload if present
-            if 'design_file' in request.FILES:
-                quote.specifications_file = request.FILES['design_file']
-                quote.save()
-            
-            # Send notification email to admin
-            try:
-                send_mail(
-                    subject=f'New Inquiry from {inquiry.name}',
-                    message=f'''
-New inquiry received on PrintHive Kenya:
-
-Name: {inquiry.name}
-Phone: {inquiry.phone}
-Email: {inquiry.email}
-Company: {inquiry.company or 'N/A'}
-Service: {inquiry.service_needed or 'Not specified'}
-
-Message:
-{inquiry.message}
-
----
-View in admin: /admin/core/customerinquiry/{inquiry.id}/change/
-WhatsApp: {inquiry.whatsapp_link}
-                    ''',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[settings.DEFAULT_FROM_EMAIL],
-                    fail_silently=True,
+        is_valid = form.is_valid()
+        if upload_handler.error:
+            form.add_error('design_file', upload_handler.error)
+            is_valid = False
+        if is_valid:
+            design_file = form.cleaned_data.get('design_file')
+            # The inquiry, its quote request (priced from any line items)
+            # and the queued notification emails are written together;
+            # send_outbox delivers the emails.
+            with transaction.atomic():
+                inquiry = form.save()
+                quote = create_quote(
+                    inquiry, form.cleaned_data['line_items'],
+                    specifications_file=store_design_file(design_file) if design_file else None,
                 )
-            except Exception:
-                pass  # Don't fail if email doesn't work
-            
-            # Send auto-reply to customer
-            try:
-                send_mail(
-                    subject='Thank you for contacting PrintHive Kenya!',
-                    message=f'''
-Dear {inquiry.name},
-
-Thank you for reaching out to PrintHive Kenya! We have received your inquiry and our team will get back to you within 24 hours.
-
-Your inquiry details:
-- Service: {inquiry.service_needed or 'General inquiry'}
-- Message: {inquiry.message[:200]}{'...' if len(inquiry.message) > 200 else ''}
-
-If you need immediate assistance, please call us at +254 700 123 456 or message us on WhatsApp.
-
-Best regards,
-The PrintHive Kenya Team
-                    ''',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[inquiry.email],
-                    fail_silently=True,
-                )
-            except Exception:
-                pass
-            
+                queue_inquiry_emails(inquiry, quote)
+
             return redirect('core:inquiry_success')
         else:
             # Form has errors, return to index with errors
-            services = ServiceCategory.objects.filter(is_active=True)
-            products = ProductExample.objects.filter(is_active=True, is_featured=True)[:6]
-            pricing_tiers = PricingTier.objects.filter(is_active=True)
-            context = {
-                'services': services,
-                'products': products,
-                'pricing_tiers': pricing_tiers,
-                'form': form,
-                'form_errors': True,
-            }
+            # The form is rendered in the page, so its errors show.
+            context = _index_context(form, defer=False)
+            context['form_errors'] = True
             return render(request, 'core/index.html', context)
     
     return redirect('core:index')
@@ -133,50 +179,231 @@ def inquiry_success(request):
     return render(request, 'core/inquiry_success.html')
 
 
+@rate_limit('calculate_price')
+@catalog_condition(SERVICES, PRODUCTS, PRICING)
 def calculate_price(request):
     """API endpoint to calculate price based on quantity and product."""
+    try:
+        product_id, qty = _price_params(request)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    # Tiers and base prices (unit_price, falling back to starting_price) come
+    # from the in-memory pricing table, so this path does no database work.
+    return _price_response(get_pricing_table(), product_id, qty)
+
+
+def _price_params(request):
+    """(product_id, qty) from calculate_price's query string; ValueError with the error message."""
     product_id = request.GET.get('product_id')
-    qty = int(request.GET.get('qty', 1))
-    
     if not product_id:
-        return JsonResponse({'error': 'Product ID required'}, status=400)
-        
-    product = get_object_or_404(ProductExample, id=product_id)
-    
-    # Use unit_price if set, otherwise starting_price (though starting_price is usually for display)
-    # The model says unit_price is "Price per unit for calculator"
-    base_price = product.unit_price if product.unit_price else product.starting_price
-    
-    # Get active pricing tiers
-    tiers = PricingTier.objects.filter(is_active=True).order_by('-min_quantity')
-    
-    discount_percentage = Decimal('0.00')
-    for tier in tiers:
-        if qty >= tier.min_quantity:
-            discount_percentage = tier.discount_percentage
-            break
-            
-    # Calculate total
-    multiplier = (Decimal('100.00') - discount_percentage) / Decimal('100.00')
-    final_unit_price = base_price * multiplier
-    total_price = final_unit_price * qty
-    
+        raise ValueError('Product ID required')
+    try:
+        return int(product_id), int(request.GET.get('qty', 1))
+    except ValueError:
+        raise ValueError('Invalid product ID or quantity') from None
+
+
+def _price_response(table, product_id, qty):
+    quote = table.quote(product_id, qty)
+    if quote is None:
+        raise Http404('No ProductExample matches the given query.')
+
     return JsonResponse({
-        'total_price': float(total_price),
-        'unit_price': float(final_unit_price),
-        'base_unit_price': float(base_price),
-        'discount_percentage': float(discount_percentage),
-        'qty': qty
+        'total_price': float(quote.total_price),
+        'unit_price': float(quote.unit_price),
+        'base_unit_price': float(quote.base_unit_price),
+        'discount_percentage': float(quote.discount_percentage),
+        'qty': qty,
+        'version': table.version,
     })
 
 
+# Upper bounds for calculate_prices; JSON-lines output is streamed, so it
+# only caps the quantity ladder, not the number of products.
+MAX_BATCH_QUANTITIES = 50
+MAX_BATCH_QUOTES = 5000
+
+
+def _parse_id_list(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def _quote_data(quote):
+    return {
+        'product_id': quote.product_id,
+        'qty': quote.qty,
+        'total_price': float(quote.total_price),
+        'unit_price': float(quote.unit_price),
+        'base_unit_price': float(quote.base_unit_price),
+        'discount_percentage': float(quote.discount_percentage),
+    }
+
+
+@rate_limit('calculate_prices')
+def calculate_prices(request):
+    """
+    API endpoint to price many (product, quantity) pairs in one request.
+
+    Products come from ``product_ids`` (comma-separated) and/or every active
+    product in ``category`` (slug). Each product is priced at every quantity
+    in ``qty`` (comma-separated), which defaults to 1 plus each active tier
+    breakpoint. ``format=jsonl`` streams one JSON object per line.
+    """
+    table = get_pricing_table()
+
+    try:
+        product_ids = _parse_id_list(request.GET.get('product_ids', ''))
+        quantities = _parse_id_list(request.GET.get('qty', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid product IDs or quantities'}, status=400)
+
+    category = request.GET.get('category')
+    if category:
+        product_ids.extend(table.products_in_category(category))
+    if not product_ids:
+        return JsonResponse({'error': 'Product IDs or category required'}, status=400)
+
+    if not quantities:
+        quantities = [1] + [qty for qty in table.breakpoints if qty > 1]
+    if len(quantities) > MAX_BATCH_QUANTITIES or min(quantities) < 1:
+        return JsonResponse({'error': f'Between 1 and {MAX_BATCH_QUANTITIES} positive quantities allowed'}, status=400)
+
+    product_ids = list(dict.fromkeys(product_ids))
+    missing = [product_id for product_id in product_ids if product_id not in table.base_prices]
+    found = [product_id for product_id in product_ids if product_id in table.base_prices]
+
+    if request.GET.get('format') == 'jsonl':
+        def stream():
+            for product_id in found:
+                for qty in quantities:
+                    yield json.dumps(_quote_data(table.quote(product_id, qty))) + '\n'
+            for product_id in missing:
+                yield json.dumps({'product_id': product_id, 'error': 'Product not found'}) + '\n'
+
+        return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+
+    if len(found) * len(quantities) > MAX_BATCH_QUOTES:
+        return JsonResponse({'error': f'More than {MAX_BATCH_QUOTES} prices requested; use format=jsonl'}, status=400)
+
+    return JsonResponse({
+        'quotes': [_quote_data(table.quote(product_id, qty)) for product_id in found for qty in quantities],
+        'missing': missing,
+    })
+
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+
+
+@catalog_condition(SERVICES, PRODUCTS)
+def search_products(request):
+    """
+    API endpoint for ranked product search. Every word of ``q`` must match
+    the start of a word in the product's title or description.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(int(request.GET.get('limit', SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit'}, status=400)
+
+    ids = search('product', query)
+    if ids is None or limit < 1:
+        return JsonResponse({'query': query, 'results': []})
+
+    active = ProductExample.objects.filter(is_active=True, category__is_active=True)
+    ranked = list(ids.filter(object_id__in=active.values('id'))[:limit])
+    found = active.select_related('category').in_bulk(ranked)
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'id': product.id,
+                'title': product.title,
+                'category': product.category.name,
+                'starting_price': float(product.starting_price),
+                'image': product.image.url if product.image else None,
+                'url': reverse('core:service_detail', args=[product.category.slug]),
+            }
+            for product in (found[product_id] for product_id in ranked if product_id in found)
+        ],
+    })
+
+
+# The catalog ordering plus id, so every row has a unique position. The
+# listing indexes cover it (InnoDB secondary indexes end in the primary key).
+PRODUCT_ORDERING = ('-is_featured', 'starting_price', 'id')
+PRODUCT_PAGE_SIZE = 12
+MAX_PRODUCT_PAGE_SIZE = 48
+
+
+def _product_page(category=None, cursor=None, page_size=PRODUCT_PAGE_SIZE):
+    products = ProductExample.objects.filter(is_active=True, is_featured=True).select_related('category')
+    if category is None:
+        products = products.filter(category__is_active=True)
+    else:
+        products = products.filter(category=category)
+    return KeysetPage(products, PRODUCT_ORDERING, cursor, page_size)
+
+
+@catalog_condition(SERVICES, PRODUCTS)
+def list_products(request):
+    """
+    API endpoint for the product listing, one keyset page at a time.
+
+    ``category`` filters by service slug, ``limit`` sets the page size and
+    ``cursor`` continues from the ``next`` value of the previous page. With
+    ``format=html`` the page comes back as product card markup, with the
+    next cursor in the X-Next-Cursor header, for the products page's
+    infinite scroll.
+    """
+    slug = request.GET.get('category') or None
+    category = None
+    if slug is not None:
+        category = _active_service(slug)
+        if category is None:
+            return JsonResponse({'error': 'Unknown category'}, status=404)
+    try:
+        limit = min(int(request.GET.get('limit', PRODUCT_PAGE_SIZE)), MAX_PRODUCT_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit'}, status=400)
+    try:
+        page = _product_page(category, request.GET.get('cursor'), limit)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    if request.GET.get('format') == 'html':
+        response = render(request, 'core/partials/product_cards.html', {'products': page})
+        if page.next_cursor:
+            response['X-Next-Cursor'] = page.next_cursor
+        return response
+
+    return JsonResponse({
+        'category': slug,
+        'results': [
+            {
+                'id': product.id,
+                'title': product.title,
+                'description': product.description,
+                'category': product.category.name,
+                'category_slug': product.category.slug,
+                'starting_price': float(product.starting_price),
+                'image': product.image.url if product.image else None,
+                'url': reverse('core:service_detail', args=[product.category.slug]),
+            }
+            for product in page
+        ],
+        'next': page.next_cursor,
+    })
+
+
+@catalog_condition(SITE, SERVICES, PRODUCTS)
 def products(request):
-    """View to display all featured products with filtering."""
-    categories = ServiceCategory.objects.filter(is_active=True)
-    products = ProductExample.objects.filter(is_active=True, is_featured=True)
-    
+    """Product listing; the first page is rendered here, the rest comes from list_products."""
     context = {
-        'categories': categories,
-        'products': products,
+        'categories': ServiceCategory.objects.filter(is_active=True),
+        'products': _product_page(),
     }
     return render(request, 'core/products.html', context)
@@ -2,6 +2,7 @@
 ASGI config for print_hive_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Set DJANGO_ASYNC_VIEWS=True to serve the catalog pages from core.async_views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -58,6 +58,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.performance.PerformanceMiddleware',
+    'core.profiling.QueryProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,7 +73,7 @@ ROOT_URLCONF = 'print_hive_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.performance.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],  # Global templates directory for admin overrides
         'APP_DIRS': True,
         'OPTIONS': {
@@ -109,6 +111,14 @@ if 'PYTHONANYWHERE_DOMAIN' in os.environ or os.environ.get('DJANGO_ENV') == 'pro
             },
         }
     }
+elif os.environ.get('DB_ENGINE') == 'sqlite':
+    # Local SQLite database, e.g. for running benchmarks without MySQL
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+        }
+    }
 else:
     # Local development database settings
     DATABASES = {
@@ -127,6 +137,143 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Cached site and catalog data is invalidated through generation counters
+# kept in this cache (see core/cache.py), so in production every worker
+# process must share it. The file-based backend needs no extra service on
+# PythonAnywhere; local development uses a per-process memory cache.
+
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR', str(BASE_DIR / 'cache')),
+        }
+    }
+
+# Rate limit buckets (core/ratelimit.py) get their own cache: an entry per
+# client and endpoint would otherwise cull catalog data and generation
+# counters out of 'default', and be culled with them, resetting the limits.
+# Set RATE_LIMIT_REDIS_URL (needs the redis package) for atomic increments
+# shared by every worker; the file cache may lose the odd one under load.
+if os.environ.get('RATE_LIMIT_REDIS_URL'):
+    CACHES['ratelimit'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['RATE_LIMIT_REDIS_URL'],
+    }
+elif DEBUG:
+    CACHES['ratelimit'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ratelimit',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+else:
+    CACHES['ratelimit'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('RATE_LIMIT_CACHE_DIR', str(BASE_DIR / 'cache-ratelimit')),
+        # Buckets expire within minutes; this bounds the clients tracked at once.
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+
+# Serve index, products, service_detail and calculate_price from the async
+# views in core/async_views.py. Only worth it under an ASGI server (asgi.py);
+# under WSGI every async view pays for a trip through async_to_sync.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', 'False') == 'True'
+
+# Home page loading mode: inline the critical CSS (once build_assets has
+# built it) and fetch the contact section and estimate modal as fragments
+# when they are needed, instead of sending everything in one document.
+DEFERRED_LOADING = os.environ.get('DJANGO_DEFERRED_LOADING', 'True') == 'True'
+
+
+# Rate limits (core/ratelimit.py): token buckets per client IP and endpoint,
+# 'burst/period'. Over-limit requests get 429 with Retry-After.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True') == 'True'
+# The cache alias holding the buckets; see CACHES['ratelimit'] above.
+RATE_LIMIT_CACHE = 'ratelimit'
+# META key holding the client address behind a proxy (PythonAnywhere: HTTP_X_REAL_IP).
+RATE_LIMIT_IP_HEADER = os.environ.get('RATE_LIMIT_IP_HEADER') or None
+RATE_LIMITS = {
+    'calculate_price': '60/m',
+    'calculate_prices': '20/m',
+    'submit_inquiry': '5/10m',
+}
+
+# Bulk admin actions (core/bulk.py): selections of more than this many
+# inquiries, or "select all" across pages, are queued as admin jobs for
+# `manage.py process_admin_jobs` instead of running in the request.
+ADMIN_BULK_SYNC_LIMIT = int(os.environ.get('ADMIN_BULK_SYNC_LIMIT', '500'))
+# Queued exports are written here, outside MEDIA_ROOT: they hold customer
+# details and are only served through the admin.
+ADMIN_EXPORT_ROOT = os.environ.get('ADMIN_EXPORT_ROOT', str(BASE_DIR / 'exports'))
+
+
+# Performance instrumentation (core/performance.py)
+# With PERFORMANCE_SERVER_TIMING (on in DEBUG only: it shows every visitor
+# query counts and timings) responses get a Server-Timing header with query,
+# template and total times. A sample of requests is also logged as JSON lines
+# to PERFORMANCE_LOG_FILE, which `manage.py perf_report` summarises.
+
+PERFORMANCE_SERVER_TIMING = os.environ.get('PERFORMANCE_SERVER_TIMING', str(DEBUG)) == 'True'
+PERFORMANCE_LOG_SAMPLE_RATE = float(os.environ.get('PERFORMANCE_LOG_SAMPLE_RATE', '0' if DEBUG else '0.1'))
+PERFORMANCE_LOG_FILE = os.environ.get('PERFORMANCE_LOG_FILE', str(BASE_DIR / 'performance.log'))
+
+# SQL query profiler (core/profiling.py), off by default. When enabled, every
+# request's queries are checked for duplicates, N+1 patterns and slow
+# statements (with EXPLAIN) and logged to QUERY_PROFILER_LOG_FILE for
+# `manage.py query_report`.
+QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'False') == 'True'
+QUERY_PROFILER_SLOW_MS = float(os.environ.get('QUERY_PROFILER_SLOW_MS', '100'))
+QUERY_PROFILER_N_PLUS_ONE = 3
+QUERY_PROFILER_LOG_FILE = os.environ.get('QUERY_PROFILER_LOG_FILE', str(BASE_DIR / 'queries.log'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'performance_file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': PERFORMANCE_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 3,
+            'delay': True,
+            'formatter': 'message',
+        },
+        'profiling_file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': QUERY_PROFILER_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 3,
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['performance_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.profiling': {
+            'handlers': ['profiling_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -171,10 +318,33 @@ STATICFILES_DIRS = [
     BASE_DIR / 'core' / 'static',
 ]
 
+# In production collectstatic saves every file under a content-hashed name
+# (served with far-future cache headers) plus .gz/.br copies (core/storage.py).
+# Run it after each deploy: pages need its staticfiles.json manifest.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'core.storage.CompressedManifestStorage'
+        ),
+    },
+}
+
+# Tailwind CLI used by build_assets (core/assets.py); the default runs the
+# copy installed by npm install.
+TAILWIND_COMMAND = os.environ.get('TAILWIND_COMMAND', 'npx tailwindcss')
+
 # Media files (user uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Largest customer design upload accepted by the contact form (bytes).
+# Uploads are streamed to disk, so this bounds disk use, not memory.
+DESIGN_FILE_MAX_SIZE = 200 * 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -243,6 +413,21 @@ UNFOLD = {
                         "icon": "request_quote",
                         "link": reverse_lazy("admin:core_quoterequest_changelist"),
                     },
+                    {
+                        "title": _("Inquiry Analytics"),
+                        "icon": "monitoring",
+                        "link": reverse_lazy("admin:core_inquiryrollup_changelist"),
+                    },
+                    {
+                        "title": _("Email Outbox"),
+                        "icon": "outbox",
+                        "link": reverse_lazy("admin:core_outboundemail_changelist"),
+                    },
+                    {
+                        "title": _("Admin Jobs"),
+                        "icon": "pending_actions",
+                        "link": reverse_lazy("admin:core_adminjob_changelist"),
+                    },
                 ],
             },
             {
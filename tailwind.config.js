@@ -0,0 +1,23 @@
+/** Tailwind build config for `python manage.py build_assets` (see core/assets.py). */
+module.exports = {
+    // Every file that can contain class names; classes found nowhere here are purged.
+    content: [
+        './core/templates/**/*.html',
+        './core/static/core/js/**/*.js',
+        './core/templatetags/**/*.py',
+        './core/forms.py',
+    ],
+    theme: {
+        extend: {
+            colors: {
+                primary: '#000000',
+                accent: '#F1C40F',
+            },
+            fontFamily: {
+                heading: ['Montserrat', 'sans-serif'],
+                body: ['Open Sans', 'sans-serif'],
+            },
+        },
+    },
+    plugins: [],
+};